@@ -1,48 +1,77 @@
-from flask import Flask, jsonify
-from flask_cors import CORS
-from jinja2 import Template
-
-from models.author import Author
-from models.blog import Blog
-from models.message import Message
-from models.world import World
-from models.linkedin_profile import LinkedInProfile
-
-app = Flask(__name__)
-CORS(app)
-
-for model in [Message, World, Author, Blog, LinkedInProfile]:
-    model.add_routes(app)
-
-    template = """<html>
-    <head>
-        <title>LinkedIn Profiles</title>
-    </head>
-    <body>
-        <h1>LinkedIn Profiles</h1>
-        <ul>
-            {% for profile in profiles %}
-            <li>
-                         {% if profile.profilePicture %}
-
-                <img src="{{ profile.profilePicture }}" />
-{% endif %}            
-                <a href="{{ profile.profileLink }}">{{ profile.firstName }} {{ profile.lastName }}</a>
-            </li>
-
-
-            {% endfor %}
-        </ul>
-    </body>
-</html>"""
-
-@app.route("/")
-def show_profiles():
-    profiles = LinkedInProfile.get_all()
-    t = Template(template)
-    print(t.render(profiles=profiles))
-
-    return t.render(profiles=profiles)
+from flask import Flask
+
+
+def create_app() -> Flask:
+    """
+    Builds the WSGI app. Models are imported here rather than at module import,
+    and the Strapi client is only created on the first request in each worker.
+    """
+    from flask_cors import CORS
+    from jinja2 import Template
+
+    from bulk_import import import_command
+    from cache_warmer import start_cache_warmer
+    from hedged_reads import (
+        DeadlineExceeded,
+        deadline_exceeded_response,
+        end_request_deadline,
+        start_request_deadline,
+    )
+    from image_proxy import image_route, image_url
+    from log_config import configure_logging
+    from models.author import Author
+    from models.blog import Blog
+    from models.message import Message
+    from models.world import World
+    from models.linkedin_profile import LinkedInProfile
+    from search_index import IndexNotReady, index_not_ready_response
+    from startup_report import startup_report
+    from strapi_cursor import CursorError, cursor_error_response
+    from strapi_filters import FilterError, filter_error_response
+    from strapi_webhooks import strapi_webhook
+    from templates import profiles_template
+    from upstream_guard import UpstreamUnavailable, upstream_unavailable_response
+
+    configure_logging()
+
+    app = Flask(__name__)
+    CORS(app)
+    app.cli.add_command(startup_report)
+    app.cli.add_command(import_command)
+    app.register_error_handler(UpstreamUnavailable, upstream_unavailable_response)
+    app.register_error_handler(FilterError, filter_error_response)
+    app.register_error_handler(CursorError, cursor_error_response)
+    app.register_error_handler(DeadlineExceeded, deadline_exceeded_response)
+    app.register_error_handler(IndexNotReady, index_not_ready_response)
+    app.before_request(start_request_deadline)
+    app.teardown_request(end_request_deadline)
+
+    for model in [Message, World, Author, Blog, LinkedInProfile]:
+        model.add_routes(app)
+    app.add_url_rule("/webhooks/strapi", "strapi_webhook", strapi_webhook, methods=["POST"])
+    app.add_url_rule("/img/<int:profile_id>", "profile_image", image_route)
+    start_cache_warmer()
+
+    @app.route("/")
+    def show_profiles():
+        profiles = LinkedInProfile.get_all()
+        return Template(profiles_template).render(profiles=profiles, image_url=image_url)
+
+    return app
+
+
+_app = None
+
+
+def __getattr__(name):
+    # `app` is built on first access, so `gunicorn app:app` and `from app import app` keep working
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 if __name__ == "__main__":
-    app.run(debug=True, use_reloader=True)
+    create_app().run(debug=True, use_reloader=True)
@@ -0,0 +1,267 @@
+"""
+ASGI entry point for serving the model routes under uvicorn/hypercorn:
+
+    uvicorn asgi:app --workers 2
+
+The views are coroutines backed by a pooled aiohttp client, so a single process
+can hold thousands of in-flight Strapi requests. The model routes come from the same
+`route_table` as the WSGI app in `app.py`, and CORS is answered the same way.
+"""
+import asyncio
+import contextvars
+import logging
+from typing import Callable, Dict, List, Optional
+
+from jinja2 import Template
+from werkzeug.datastructures import Headers
+from werkzeug.exceptions import HTTPException
+from werkzeug.routing import Map, Rule
+from werkzeug.sansio.request import Request as SansIORequest
+from werkzeug.wrappers import Response
+
+from cache_warmer import start_cache_warmer
+from hedged_reads import DeadlineExceeded, deadline_scope, request_budget
+from image_proxy import image_response, image_url
+from log_config import configure_logging
+from models.author import Author
+from models.blog import Blog
+from models.message import Message
+from models.world import World
+from models.linkedin_profile import LinkedInProfile
+from response_format import compress, dumps
+from search_index import IndexNotReady
+from strapi_cursor import CursorError
+from strapi_filters import FilterError
+from strapi_model_mixin import AsyncStrapiClient, load_settings
+from strapi_webhooks import astrapi_webhook
+from templates import profiles_template
+from upstream_guard import UpstreamUnavailable
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+
+class Request(SansIORequest):
+    """Werkzeug request built from an ASGI scope, with an awaitable body."""
+
+    def __init__(self, scope, receive):
+        headers = Headers(
+            [(k.decode("latin-1"), v.decode("latin-1")) for k, v in scope["headers"]]
+        )
+        super().__init__(
+            method=scope["method"],
+            scheme=scope.get("scheme", "http"),
+            server=scope.get("server"),
+            root_path=scope.get("root_path", ""),
+            path=scope["path"],
+            query_string=scope.get("query_string", b""),
+            headers=headers,
+            remote_addr=(scope.get("client") or (None,))[0],
+        )
+        self._receive = receive
+        self._body: Optional[bytes] = None
+
+    async def get_data(self) -> bytes:
+        if self._body is None:
+            chunks = []
+            more_body = True
+            while more_body:
+                message = await self._receive()
+                chunks.append(message.get("body", b""))
+                more_body = message.get("more_body", False)
+            self._body = b"".join(chunks)
+        return self._body
+
+
+class AsyncApp:
+    """Minimal ASGI application with a Flask-style `add_url_rule`/`route` API."""
+
+    def __init__(self):
+        self.url_map = Map()
+        self.view_functions: Dict[str, Callable] = {}
+        self.startup_funcs: List[Callable] = []
+        self.shutdown_funcs: List[Callable] = []
+
+    def add_url_rule(
+        self, rule: str, endpoint: str, view_func: Callable, methods: List[str]
+    ) -> None:
+        self.url_map.add(Rule(rule, endpoint=endpoint, methods=methods))
+        self.view_functions[endpoint] = view_func
+
+    def route(self, rule: str, methods: Optional[List[str]] = None):
+        def decorator(func):
+            self.add_url_rule(rule, func.__name__, func, methods or ["GET"])
+            return func
+
+        return decorator
+
+    def before_serving(self, func: Callable) -> Callable:
+        self.startup_funcs.append(func)
+        return func
+
+    def after_serving(self, func: Callable) -> Callable:
+        self.shutdown_funcs.append(func)
+        return func
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+        elif scope["type"] == "http":
+            await self._http(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                for func in self.startup_funcs:
+                    await func()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                for func in self.shutdown_funcs:
+                    await func()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _http(self, scope, receive, send):
+        req = Request(scope, receive)
+        adapter = self.url_map.bind(
+            req.host, script_name=req.root_path, url_scheme=req.scheme
+        )
+        if req.method == "OPTIONS":
+            await self._options(req, adapter, send)
+            return
+        headers = []
+        try:
+            endpoint, view_args = adapter.match(req.path, method=req.method)
+            with deadline_scope(request_budget(req.headers, load_settings()["request_deadline"])):
+                rv = await self.view_functions[endpoint](req, **view_args)
+            status = 200
+            if isinstance(rv, tuple):
+                rv, status = rv
+        except UpstreamUnavailable as e:
+            rv, status = {"data": None, "error": {"status": 503, "name": "UpstreamUnavailable", "message": str(e)}}, 503
+            headers.append((b"retry-after", str(e.retry_after).encode()))
+        except IndexNotReady as e:
+            rv, status = {"data": None, "error": {"status": 503, "name": "IndexNotReady", "message": str(e)}}, 503
+            headers.append((b"retry-after", str(e.retry_after).encode()))
+        except DeadlineExceeded as e:
+            rv, status = {"data": None, "error": {"status": 504, "name": "DeadlineExceeded", "message": str(e)}}, 504
+        except (FilterError, CursorError) as e:
+            rv, status = {"data": None, "error": {"status": 400, "name": type(e).__name__, "message": str(e)}}, 400
+        except HTTPException as e:
+            rv, status = {"error": {"status": e.code, "message": e.description}}, e.code
+        except Exception as e:
+            logger.exception("Unhandled error serving %s %s", req.method, req.path)
+            rv, status = {"error": {"status": 500, "message": str(e)}}, 500
+
+        if isinstance(rv, Response):
+            status, content_type = rv.status_code, rv.content_type or ""
+            headers.extend(
+                (name.lower().encode(), value.encode())
+                for name, value in rv.headers.items()
+                if name.lower() not in ("content-type", "content-length")
+            )
+            if rv.is_streamed:
+                await self._stream(send, status, content_type, headers, rv)
+                return
+            body = rv.get_data()
+        elif isinstance(rv, str):
+            body, content_type = rv.encode(), "text/html; charset=utf-8"
+        elif isinstance(rv, bytes):
+            # Already-serialized JSON, e.g. straight from the shared cache
+            body, content_type = rv, "application/json"
+        else:
+            body, content_type = dumps(rv), "application/json"
+        if content_type == "application/json":
+            compressed = compress(body, req.headers.get("Accept-Encoding"))
+            if compressed is not None:
+                body = compressed
+                headers.append((b"content-encoding", b"gzip"))
+            headers.append((b"vary", b"Accept-Encoding"))
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [
+                    (b"content-type", content_type.encode()),
+                    (b"content-length", str(len(body)).encode()),
+                    # Mirror the permissive CORS(app) setup of the WSGI app
+                    (b"access-control-allow-origin", b"*"),
+                    *headers,
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def _stream(self, send, status: int, content_type: str, headers: List, response: Response) -> None:
+        """
+        Sends a streamed response (an export) chunk by chunk. The chunks are produced in a worker
+        thread, all in one context so the generators' context variables stay consistent.
+        """
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", content_type.encode()), (b"access-control-allow-origin", b"*"), *headers],
+            }
+        )
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        chunks = iter(response.response)
+        try:
+            while True:
+                chunk = await loop.run_in_executor(None, context.run, next, chunks, None)
+                if chunk is None:
+                    break
+                if chunk:
+                    await send({"type": "http.response.body", "body": chunk, "more_body": True})
+        finally:
+            response.close()
+        await send({"type": "http.response.body", "body": b""})
+
+    async def _options(self, req: Request, adapter, send) -> None:
+        """Answers OPTIONS and CORS preflight requests, as flask-cors does for the WSGI app."""
+        methods = adapter.allowed_methods(req.path)
+        status, headers = 404, []
+        if methods:
+            allowed = ", ".join(sorted(set(methods) | {"OPTIONS"})).encode()
+            status = 200
+            headers = [(b"allow", allowed), (b"access-control-allow-origin", b"*"), (b"access-control-allow-methods", allowed)]
+            requested = req.headers.get("Access-Control-Request-Headers")
+            if requested:
+                headers.append((b"access-control-allow-headers", requested.encode("latin-1")))
+        await send({"type": "http.response.start", "status": status, "headers": [(b"content-length", b"0"), *headers]})
+        await send({"type": "http.response.body", "body": b""})
+
+
+app = AsyncApp()
+
+for model in [Message, World, Author, Blog, LinkedInProfile]:
+    model.add_async_routes(app)
+
+
+app.add_url_rule("/webhooks/strapi", "strapi_webhook", astrapi_webhook, methods=["POST"])
+
+
+@app.route("/")
+async def show_profiles(req):
+    profiles = await LinkedInProfile.aget_all()
+    return Template(profiles_template).render(profiles=profiles, image_url=image_url)
+
+
+@app.route("/img/<int:profile_id>")
+async def profile_image(req, profile_id: int):
+    # Downloading and resizing block; keep them off the event loop
+    return await asyncio.to_thread(
+        image_response, profile_id, req.args.get("v"), req.headers.get("If-None-Match")
+    )
+
+
+@app.before_serving
+async def warm_cache():
+    start_cache_warmer()
+
+
+@app.after_serving
+async def close_strapi_client():
+    await AsyncStrapiClient.close()
@@ -0,0 +1,74 @@
+"""
+Compares the regular model classes with their `slotted()` variants: memory per instance and
+attribute read time.
+
+    python bench_models.py [instances]
+"""
+import sys
+import timeit
+import tracemalloc
+
+from models.author import Author
+from models.blog import Blog
+from models.linkedin_profile import LinkedInProfile
+from models.message import Message
+from models.world import World
+
+TIMESTAMP = "2023-06-01T12:00:00.000Z"
+
+SAMPLES = {
+    Message: {"content": "Hello World!"},
+    World: {"guid": "b7c1", "intro": "A small world"},
+    Author: {"name": "Ada", "email": "ada@example.com", "avatar": "ada.png"},
+    Blog: {"text": "Notes on the analytical engine"},
+    LinkedInProfile: {
+        "firstName": "Ada",
+        "lastName": "Lovelace",
+        "summary": "Mathematician",
+        "profileLink": "https://www.linkedin.com/in/ada",
+        "profilePicture": "ada.png",
+    },
+}
+# Undeclared fields as they come back for LinkedIn profiles; they land in `extra`
+RAW_LINKEDIN_FIELDS = {f"field{i}": f"value {i}" for i in range(20)}
+
+
+def attributes(model, i, raw):
+    values = {**SAMPLES[model], "id": i, "createdAt": TIMESTAMP, "updatedAt": TIMESTAMP, "publishedAt": TIMESTAMP}
+    if raw and model is LinkedInProfile:
+        values.update(RAW_LINKEDIN_FIELDS)
+    return values
+
+
+def bytes_per_instance(cls, model, count, raw):
+    rows = [attributes(model, i, raw) for i in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.take_snapshot()
+    instances = [cls(**row) for row in rows]
+    after = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, "filename"))
+    del instances
+    return allocated / count
+
+
+def read_time(cls, model):
+    obj = cls(**attributes(model, 1, raw=False))
+    timer = timeit.Timer("obj.createdAt; obj.id; obj.updatedAt; obj.publishedAt", globals={"obj": obj})
+    return min(timer.repeat(number=200_000, repeat=5)) / 800_000 * 1e9
+
+
+def main(count):
+    print(f"{'model':<18}{'raw fields':<12}{'dict B/obj':>12}{'slots B/obj':>13}{'saved':>8}{'dict ns':>10}{'slots ns':>10}")
+    for model in SAMPLES:
+        for raw in (False, True) if model is LinkedInProfile else (False,):
+            regular = bytes_per_instance(model, model, count, raw)
+            slotted = bytes_per_instance(model.slotted(), model, count, raw)
+            print(
+                f"{model.__name__:<18}{'yes' if raw else 'no':<12}{regular:>12.0f}{slotted:>13.0f}"
+                f"{1 - slotted / regular:>8.0%}{read_time(model, model):>10.1f}{read_time(model.slotted(), model):>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,68 @@
+"""
+Compares the response formats of the model routes: bytes on the wire (plain and gzipped) and
+encode time per page, for every available JSON encoder.
+
+    python bench_responses.py [entries]
+"""
+import gzip
+import sys
+import timeit
+
+from response_format import COMPRESS_LEVEL, ENCODERS, compact
+
+TIMESTAMP = "2023-06-01T12:00:00.000Z"
+
+
+def entry(i):
+    """A blog entry populated with its author and worlds, as Strapi returns it."""
+    return {
+        "id": i,
+        "attributes": {
+            "text": f"Notes on the analytical engine, part {i}",
+            "createdAt": TIMESTAMP,
+            "updatedAt": TIMESTAMP,
+            "publishedAt": TIMESTAMP,
+            "locale": None,
+            "author": {
+                "data": {
+                    "id": i % 10,
+                    "attributes": {
+                        "name": "Ada",
+                        "email": "ada@example.com",
+                        "avatar": None,
+                        "createdAt": TIMESTAMP,
+                        "updatedAt": TIMESTAMP,
+                        "publishedAt": TIMESTAMP,
+                    },
+                }
+            },
+            "worlds": {
+                "data": [
+                    {"id": w, "attributes": {"guid": f"w{w}", "intro": None, "createdAt": TIMESTAMP}}
+                    for w in range(i % 4)
+                ]
+            },
+        },
+    }
+
+
+def main(count):
+    response = {"data": [entry(i) for i in range(count)], "meta": {"pagination": {"page": 1, "pageSize": count}}}
+    formats = {
+        "strapi": lambda: response,
+        "compact": lambda: compact(response),
+        "compact inline": lambda: compact(response, "inline"),
+    }
+    print(f"{'format':<16}{'encoder':<9}{'bytes':>10}{'gzip':>9}{'encode ms':>11}")
+    for name, build in formats.items():
+        for encoder, (dumps, _) in ENCODERS.items():
+            body = dumps(build())
+            timer = timeit.Timer(lambda: dumps(build()))
+            runs = 20
+            encode_ms = min(timer.repeat(number=runs, repeat=5)) / runs * 1000
+            zipped = len(gzip.compress(body, COMPRESS_LEVEL))
+            print(f"{name:<16}{encoder:<9}{len(body):>10}{zipped:>9}{encode_ms:>11.2f}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 100)
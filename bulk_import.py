@@ -0,0 +1,234 @@
+"""
+Resumable bulk import into Strapi through the models.
+
+    flask --app app import linked-in-profiles profiles.ndjson --concurrency 8
+
+Reads NDJSON/JSON Lines, CSV or a JSON array (optionally wrapped as `{"data": [...]}` or
+`{"elements": [...]}`) one record at a time. Records with an `id` are updated through
+`Model.update`, the others created through `Model.create`, with at most `--concurrency`
+writes in flight. Only the model's declared fields are sent unless `--all-fields` is given.
+
+Progress is checkpointed to `<file>.checkpoint` (every completed record below `next`, plus
+the few finished out of order above it), so an interrupted run started again with the same
+arguments skips what is already written. Failed records do not stop the run: they are appended
+to `<file>.errors.ndjson` with their position, error and the record itself, and kept in the
+checkpoint's `failed` list, so the next run with the same arguments tries them again.
+"""
+import csv
+import json
+import os
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, Dict, Iterator, Optional, Set, Tuple
+
+import click
+
+from strapi_model_mixin import class_registry
+from upstream_guard import UpstreamUnavailable
+
+# Never sent to Strapi: managed by Strapi itself, or class attributes of the models
+EXCLUDED_FIELDS = {"id", "createdAt", "updatedAt", "publishedAt", "model_path", "model_paths"}
+READ_SIZE = 1 << 16
+SHED_RETRIES = 5
+
+
+def iter_records(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields the records of an NDJSON, CSV or JSON file without loading it whole."""
+    if path.endswith(".csv"):
+        with open(path, newline="") as f:
+            yield from csv.DictReader(f)
+        return
+    with open(path) as f:
+        first = f.read(1)
+        while first and first.isspace():
+            first = f.read(1)
+        f.seek(0)
+        if first == "[":
+            yield from _iter_json_array(f)
+        elif path.endswith(".json") and first == "{":
+            document = json.load(f)
+            yield from document.get("data") or document.get("elements") or [document]
+        else:
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+
+
+def _iter_json_array(f) -> Iterator[Any]:
+    decoder = json.JSONDecoder()
+    buffer = f.read(READ_SIZE).lstrip()[1:]  # past the opening "["
+    while True:
+        buffer = buffer.lstrip().lstrip(",").lstrip()
+        if buffer.startswith("]"):
+            return
+        try:
+            item, end = decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = f.read(READ_SIZE)
+            if not chunk:
+                raise
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+def to_data(model, record: Dict, all_fields: bool = False) -> Tuple[Optional[Any], Dict]:
+    """The entry id (None to create) and the `data` to send for one input record."""
+    if "attributes" in record:  # A raw Strapi entry, e.g. from an export of the API
+        record = {"id": record.get("id"), **(record["attributes"] or {})}
+    _id = record.get("id") or None
+    if all_fields:
+        data = {k: v for k, v in record.items() if k not in EXCLUDED_FIELDS}
+    else:
+        declared = getattr(model, "__annotations__", {})
+        data = {k: v for k, v in record.items() if k in declared and k not in EXCLUDED_FIELDS}
+    return _id, data
+
+
+class Checkpoint:
+    """Which record positions are done, persisted atomically next to the input file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.next = 0
+        self.ahead: Set[int] = set()
+        # Positions passed but not written, retried by the next run
+        self.failed: Set[int] = set()
+        self.stats: Counter = Counter()
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            self.next, self.ahead = state["next"], set(state["ahead"])
+            self.failed = set(state.get("failed", []))
+            self.stats.update(state.get("stats", {}))
+
+    def is_done(self, index: int) -> bool:
+        return (index < self.next or index in self.ahead) and index not in self.failed
+
+    def mark(self, index: int, outcome: str) -> None:
+        if index in self.failed:
+            # A retry: `stats["failed"]` counts the records failed now, not the attempts
+            self.failed.remove(index)
+            self.stats["failed"] -= 1
+        if outcome == "failed":
+            self.failed.add(index)
+        if index >= self.next:
+            self.ahead.add(index)
+        self.stats[outcome] += 1
+        while self.next in self.ahead:
+            self.ahead.remove(self.next)
+            self.next += 1
+
+    def save(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-")
+        with os.fdopen(fd, "w") as f:
+            json.dump(
+                {"next": self.next, "ahead": sorted(self.ahead), "failed": sorted(self.failed), "stats": self.stats}, f
+            )
+        os.replace(tmp_path, self.path)
+
+
+def write_record(model, _id, data: Dict) -> str:
+    """
+    Creates or updates one entry, retrying while the upstream guard sheds load or has the
+    circuit open. Returns the outcome.
+    """
+    for attempt in range(SHED_RETRIES + 1):
+        try:
+            if _id is None:
+                model.create(data)
+                return "created"
+            model.update(_id, data)
+            return "updated"
+        except UpstreamUnavailable as e:
+            if attempt == SHED_RETRIES:
+                raise
+            time.sleep(e.retry_after)
+
+
+def run_import(
+    model,
+    path: str,
+    concurrency: int = 8,
+    checkpoint_path: Optional[str] = None,
+    all_fields: bool = False,
+    progress_every: float = 5.0,
+    echo=click.echo,
+) -> Checkpoint:
+    checkpoint = Checkpoint(checkpoint_path or f"{path}.checkpoint")
+    errors_path = f"{path}.errors.ndjson"
+    started = last_report = time.monotonic()
+    written = 0
+    error_types: Counter = Counter()
+
+    # Only called from this thread, so the checkpoint needs no lock
+    def finish(index: int, record: Dict, future) -> None:
+        nonlocal written, last_report
+        try:
+            outcome = future.result()
+        except Exception as e:
+            outcome = "failed"
+            error_types[type(e).__name__] += 1
+            with open(errors_path, "a") as f:
+                error = {"index": index, "error": f"{type(e).__name__}: {e}", "record": record}
+                f.write(json.dumps(error, default=str) + "\n")
+        checkpoint.mark(index, outcome)
+        # Saved per record: a write costs far more than the rename, and a killed run then
+        # repeats at most the writes that were in flight
+        checkpoint.save()
+        written += 1
+        now = time.monotonic()
+        if now - last_report >= progress_every:
+            last_report = now
+            echo(f"{checkpoint.next} records done, {written / (now - started):.1f}/s, {checkpoint.stats['failed']} failed")
+
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="import") as pool:
+        pending = {}
+        try:
+            for index, record in enumerate(iter_records(path)):
+                if checkpoint.is_done(index):
+                    continue
+                if len(pending) >= concurrency:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        finish(*pending.pop(future), future=future)
+                _id, data = to_data(model, record, all_fields)
+                pending[pool.submit(write_record, model, _id, data)] = index, record
+        finally:
+            for future in list(pending):
+                finish(*pending.pop(future), future=future)
+
+    elapsed = time.monotonic() - started
+    echo(
+        f"Wrote {written} records in {elapsed:.1f}s ({written / elapsed if elapsed else 0:.1f}/s); "
+        "all runs: "
+        + ", ".join(f"{count} {outcome}" for outcome, count in sorted(checkpoint.stats.items()))
+    )
+    for name, count in error_types.most_common():
+        echo(f"  {count} x {name} (see {errors_path})")
+    if checkpoint.failed:
+        echo(f"{len(checkpoint.failed)} failed records are retried when the import is run again")
+    return checkpoint
+
+
+@click.command("import")
+@click.argument("model_path")
+@click.argument("file", type=click.Path(exists=True, dir_okay=False))
+@click.option("--concurrency", default=8, show_default=True, help="Writes in flight at once.")
+@click.option("--checkpoint", "checkpoint_path", default=None, help="Checkpoint file [default: <file>.checkpoint].")
+@click.option("--restart", is_flag=True, help="Ignore an existing checkpoint and start over.")
+@click.option("--all-fields", is_flag=True, help="Send fields the model does not declare too.")
+def import_command(model_path, file, concurrency, checkpoint_path, restart, all_fields) -> None:
+    """Import FILE (NDJSON, CSV or JSON) into MODEL_PATH, resuming an interrupted run."""
+    model = next((m for m in class_registry.values() if m.model_path == model_path), None)
+    if model is None:
+        known = ", ".join(sorted(m.model_path for m in class_registry.values()))
+        raise click.BadParameter(f"unknown model path; expected one of {known}", param_hint="MODEL_PATH")
+    checkpoint_path = checkpoint_path or f"{file}.checkpoint"
+    if restart and os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    run_import(model, file, concurrency, checkpoint_path, all_fields)
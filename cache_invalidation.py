@@ -0,0 +1,125 @@
+"""
+Targeted shared-cache maintenance for a single changed entry.
+
+Used both for writes made through the models and for Strapi lifecycle webhooks, so the
+cache can keep long TTLs: only entries that show the changed row are touched.
+
+- entry.update: cached copies of the entry, and unfiltered lists that contain it, have its
+  scalar attributes patched in place (keeping their expiry). Filtered or sorted lists are
+  dropped, since the row may now match or order differently. Cached entries of other models
+  that embed the row through a relationship are dropped.
+- entry.create / entry.publish / entry.unpublish: every cached list of the model is dropped,
+  as the row can appear on any page, along with the caches of models that relate to it.
+- entry.delete: the entry, the lists that contain it and the entries embedding it are dropped.
+
+Updates that re-link relations are handled like creates, with the entry itself dropped.
+"""
+import json
+from typing import Any, Dict, Iterable, Optional
+
+from shared_cache import SharedCache
+
+CREATE, UPDATE, DELETE = "entry.create", "entry.update", "entry.delete"
+PUBLISH, UNPUBLISH = "entry.publish", "entry.unpublish"
+
+
+def apply_change(
+    cache: SharedCache,
+    model,
+    models: Iterable,
+    event: str,
+    _id: Any,
+    attributes: Optional[Dict] = None,
+    relations_changed: bool = False,
+) -> None:
+    """
+    Updates or drops the cached entries affected by `event` on row `_id` of `model`.
+    `attributes` are the row's new attributes, when known; `relations_changed` marks updates
+    that also re-linked relations, which cannot be patched into populated envelopes.
+    """
+    _id = str(_id)
+    patchable = event == UPDATE and attributes is not None and not relations_changed
+    # Both sides of a re-linked relation change, so that is handled like a create
+    structural = event in (CREATE, PUBLISH, UNPUBLISH) or (event == UPDATE and relations_changed)
+
+    one_parts = (model.model_path, "one", _id)
+    if patchable:
+        for path in cache.entry_paths(one_parts):
+            _patch_entry(cache, path, _id, attributes)
+    else:
+        cache.delete(one_parts)
+
+    for path in cache.entry_paths((model.model_path, "all")):
+        entry = cache.read_path(path)
+        if entry is None:
+            continue
+        if structural:
+            cache.remove_path(path)
+            continue
+        key, payload, _ = entry
+        filtered = _is_filtered(key)
+        rows = json.loads(payload).get("data") or []
+        if not any(str(row.get("id")) == _id for row in rows):
+            if event == UPDATE and filtered:
+                cache.remove_path(path)
+        elif patchable and not filtered:
+            _patch_entry(cache, path, _id, attributes)
+        else:
+            cache.remove_path(path)
+
+    # Compared by model_path: the registry and the relationships may hold the slotted variants
+    for other in models:
+        if other.model_path == model.model_path:
+            continue
+        rel_names = [
+            name for name, rel in other._extract_relationships().items() if rel.model_path == model.model_path
+        ]
+        if not rel_names:
+            continue
+        if structural:
+            cache.delete((other.model_path,))
+            continue
+        for path in cache.entry_paths((other.model_path,), recursive=True):
+            entry = cache.read_path(path)
+            if entry is not None and _embeds(json.loads(entry[1]), rel_names, _id):
+                cache.remove_path(path)
+
+
+def _is_filtered(key: str) -> bool:
+    """Whether a cached list's query can change membership or order when a row changes."""
+    params = json.loads(key)
+    sort = params.get("sort") or []
+    return bool(params.get("filters")) or any(not s.startswith("id") for s in sort)
+
+
+def _patch_entry(cache: SharedCache, path: str, _id: str, attributes: Dict) -> None:
+    # Under the entry's lock, so a concurrent patch or refill cannot overwrite this one with stale data
+    with cache.lock_path(path):
+        entry = cache.read_path(path)
+        if entry is None:
+            return
+        key, payload, expires_at = entry
+        response = json.loads(payload)
+        data = response.get("data")
+        for row in data if isinstance(data, list) else [data]:
+            if row and str(row.get("id")) == _id:
+                cached = row.setdefault("attributes", {})
+                for name, value in attributes.items():
+                    # Relations are skipped: the cached envelope depends on the query's populate
+                    if isinstance(value, (dict, list)) or isinstance(cached.get(name), dict):
+                        continue
+                    if name in cached:
+                        cached[name] = value
+        cache.write_path(path, key, json.dumps(response).encode(), expires_at)
+
+
+def _embeds(response: Dict, rel_names, _id: str) -> bool:
+    data = response.get("data")
+    for row in data if isinstance(data, list) else [data]:
+        attributes = (row or {}).get("attributes") or {}
+        for name in rel_names:
+            related = (attributes.get(name) or {}).get("data") if isinstance(attributes.get(name), dict) else None
+            for item in related if isinstance(related, list) else [related]:
+                if item and str(item.get("id")) == _id:
+                    return True
+    return False
@@ -0,0 +1,72 @@
+"""
+Cache warm-up for the shared response cache.
+
+At boot every model in `class_registry` has its hot queries (the model's `warm_queries`, or
+the per-model lists in `STRAPI_WARM_QUERIES`) fetched into the shared cache. A daemon thread
+then re-reads them every half refresh-ahead window, so each entry is hit while close to expiry
+and gets refreshed in the background by whichever worker takes its lock first. The first
+visitors after a deploy, and everyone after them, are served from cache.
+Enable with `STRAPI_WARM_UP=true`.
+
+    STRAPI_WARM_QUERIES='{"linked-in-profiles": [{"populate": "*"}], "messages": [{}]}'
+"""
+import json
+import logging
+import threading
+import time
+from typing import Dict, List, Optional
+
+from strapi_model_mixin import class_registry, get_shared_cache, load_settings
+
+logger = logging.getLogger(__name__)
+
+_warmer: Optional[threading.Thread] = None
+
+
+def warm_queries_for(model) -> List[Dict]:
+    """The `fetch_all` keyword arguments to keep warm for `model`."""
+    configured = load_settings()["warm_queries"]
+    if configured:
+        return json.loads(configured).get(model.model_path, [])
+    return list(getattr(model, "warm_queries", ({},)))
+
+
+def warm_up() -> int:
+    """Reads every hot query through the shared cache, filling or refreshing it. Returns the count."""
+    warmed = 0
+    for model in list(class_registry.values()):
+        for query in warm_queries_for(model):
+            try:
+                model.fetch_all(**query)
+                warmed += 1
+            except Exception as e:
+                logger.warning(f"Warm-up of {model.model_path} {query} failed: {e}")
+    return warmed
+
+
+def _keep_warm(interval: float) -> None:
+    while True:
+        warmed = warm_up()
+        logger.info(f"Warmed {warmed} queries; next warm-up in {interval:.0f}s")
+        time.sleep(interval)
+
+
+def start_cache_warmer() -> bool:
+    """
+    Starts the warm-up thread for this process if `STRAPI_WARM_UP` is set and the shared cache
+    is enabled.
+    """
+    global _warmer
+    settings = load_settings()
+    if not settings["warm_up"]:
+        return False
+    if get_shared_cache() is None:
+        logger.warning("STRAPI_WARM_UP is set but STRAPI_CACHE_DIR is not; nothing to warm")
+        return False
+    if _warmer is None or not _warmer.is_alive():
+        interval = max(1.0, settings["cache_refresh_ahead"] / 2)
+        _warmer = threading.Thread(
+            target=_keep_warm, args=(interval,), name="cache-warmer", daemon=True
+        )
+        _warmer.start()
+    return True
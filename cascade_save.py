@@ -0,0 +1,93 @@
+"""
+Graph-aware save for `upsert(cascade=True)`.
+
+Starting from one object, follows the relation fields declared on the models (the same
+annotations `_extract_relationships` reads) to every related model object, then writes:
+
+- every object without an id (it has to be created before anything can point at it),
+- every saved object that points at one of those, so the new link is stored,
+- the object `upsert` was called on.
+
+Writes run in dependency order with `graphlib`: children before the parents that reference
+them, and independent siblings concurrently on a thread pool. After each create the object's
+`id` is set, so a parent's relations are sent as ids. On failure no further writes start and
+the first error is raised; objects already written keep their ids, so calling again only
+writes what is left.
+"""
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from graphlib import CycleError, TopologicalSorter
+from typing import Dict, List, Set
+
+
+def related_objects(obj) -> List:
+    """The model objects `obj` refers to through its declared relation fields."""
+    related = []
+    for rel_name in type(obj)._extract_relationships():
+        value = getattr(obj, rel_name, None)
+        for item in value if isinstance(value, list) else [value]:
+            if hasattr(item, "_extract_relationships"):
+                related.append(item)
+    return related
+
+
+def collect(root) -> Dict[int, object]:
+    """Every model object reachable from `root`, by `id()`."""
+    nodes, stack = {}, [root]
+    while stack:
+        obj = stack.pop()
+        if id(obj) not in nodes:
+            nodes[id(obj)] = obj
+            stack.extend(related_objects(obj))
+    return nodes
+
+
+def plan(root, nodes: Dict[int, object]) -> Dict[int, Set[int]]:
+    """Maps each object to write, by `id()`, to the objects it has to wait for."""
+    depends = {key: {id(child) for child in related_objects(obj)} for key, obj in nodes.items()}
+    to_write = {key for key, obj in nodes.items() if obj is root or getattr(obj, "id", None) is None}
+    # Saved objects linking to new ones need rewriting too, transitively
+    changed = True
+    while changed:
+        changed = False
+        for key in nodes.keys() - to_write:
+            if depends[key] & to_write:
+                to_write.add(key)
+                changed = True
+    return {key: depends[key] & to_write for key in to_write}
+
+
+def cascade_upsert(root, max_workers: int = 8, **kwargs) -> bool:
+    """Saves `root` and the related objects it needs; `kwargs` override `root`'s fields."""
+    nodes = collect(root)
+    sorter = TopologicalSorter(plan(root, nodes))
+    try:
+        sorter.prepare()
+    except CycleError as e:
+        names = " -> ".join(type(nodes[key]).__name__ for key in e.args[1])
+        raise ValueError(f"Cannot cascade-save a relation cycle between unsaved objects: {names}") from None
+
+    def write(obj) -> bool:
+        return obj.upsert(**kwargs) if obj is root else obj.upsert()
+
+    error = None
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="cascade") as pool:
+        pending = {}
+        while sorter.is_active():
+            if error is None:
+                for key in sorter.get_ready():
+                    pending[pool.submit(write, nodes[key])] = key
+            if not pending:
+                break
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                key = pending.pop(future)
+                try:
+                    if not future.result():
+                        raise RuntimeError(f"Strapi returned no entry for {type(nodes[key]).__name__}")
+                except Exception as e:
+                    error = error or e
+                    continue
+                sorter.done(key)
+    if error is not None:
+        raise error
+    return True
@@ -1,6 +1,14 @@
 import pytest
 from app import app
 
+import strapi_model_mixin
+
+
+@pytest.fixture(autouse=True)
+def fresh_upstream_guard(monkeypatch):
+    # The guard's breakers are process-wide; a breaker opened by one test must not fail the next
+    monkeypatch.setattr(strapi_model_mixin, "_upstream_guard", None)
+
 
 @pytest.fixture
 def client():
@@ -0,0 +1,389 @@
+"""
+Per-request deadlines and hedged GETs for the Strapi client.
+
+Every request to the WSGI or ASGI app gets a deadline: `STRAPI_REQUEST_DEADLINE` seconds
+(default 25, under gunicorn's 30s worker timeout), or less if the client sends
+`X-Request-Timeout: <seconds>`. Strapi calls made while serving it are sent with the time
+that is left as their timeout and are not sent at all once it has passed, so a slow Strapi
+costs a request its budget and no more. Background work (cache refreshes, warm-up) has no
+deadline, and neither do whole-collection reads (`strapi_export.iter_entries`, used by exports
+and search index builds), which clear it with `deadline_scope(None)`.
+
+With `STRAPI_HEDGE_READS=true`, a GET still unanswered after the observed p95 latency
+(`STRAPI_HEDGE_QUANTILE`, at least `STRAPI_HEDGE_MIN_DELAY` seconds) is sent a second time,
+and whichever response comes back first is used. The first copy is sent on the caller's
+thread; only the second one runs on the connector's pool, and whichever copy loses has its
+connection shut so neither thread waits on it. The extra load is about 1 - quantile of the
+reads; `HedgedConnector.stats` counts reads, hedges sent and hedges that won.
+"""
+import heapq
+import itertools
+import json
+import logging
+import socket
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEADLINE_HEADER = "X-Request-Timeout"
+# Latencies needed before hedging starts, and how often the hedge delay is recomputed
+MIN_SAMPLES = 20
+RECOMPUTE_EVERY = 20
+
+_deadline: ContextVar[Optional[float]] = ContextVar("strapi_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The current request ran out of time for a Strapi call; `sent` if it was already in flight."""
+
+    def __init__(self, message: str, sent: bool = False):
+        super().__init__(message)
+        self.sent = sent
+
+
+def deadline_exceeded_response(error: DeadlineExceeded):
+    """Flask error handler turning `DeadlineExceeded` into a 504."""
+    body = {"data": None, "error": {"status": 504, "name": "DeadlineExceeded", "message": str(error)}}
+    return json.dumps(body), 504, {"Content-Type": "application/json"}
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one."""
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+
+def request_budget(headers, default: float) -> Optional[float]:
+    """The seconds a request may take: its `X-Request-Timeout` header, capped at `default`."""
+    try:
+        asked = float(headers.get(DEADLINE_HEADER) or 0)
+    except ValueError:
+        asked = 0
+    budgets = [b for b in (asked, default) if b > 0]
+    return min(budgets) if budgets else None
+
+
+@contextmanager
+def deadline_scope(seconds: Optional[float]):
+    """
+    Runs the block under a deadline `seconds` from now, never later than an enclosing one.
+    `None` runs it without any deadline, lifting an enclosing one.
+    """
+    deadline = None
+    if seconds is not None:
+        deadline = time.monotonic() + seconds
+        current = _deadline.get()
+        if current is not None:
+            deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def start_request_deadline() -> None:
+    """Flask `before_request` hook; paired with `end_request_deadline`."""
+    from flask import g, request
+
+    from strapi_model_mixin import load_settings
+
+    seconds = request_budget(request.headers, load_settings()["request_deadline"])
+    g.strapi_deadline = _deadline.set(None if seconds is None else time.monotonic() + seconds)
+
+
+def end_request_deadline(error: Optional[BaseException] = None) -> None:
+    from flask import g
+
+    token = g.pop("strapi_deadline", None)
+    if token is not None:
+        _deadline.reset(token)
+
+
+_flights = threading.local()
+
+
+class _Flight:
+    """The connection one copy of a hedged GET is using, so the copy that loses can be cut off."""
+
+    def __init__(self):
+        self.connection = None
+        self.cancelled = False
+
+    def cancel(self) -> None:
+        self.cancelled = True
+        sock = getattr(self.connection, "sock", None)
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _Race:
+    """State shared by the two copies of a hedged GET."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.primary, self.hedge = _Flight(), _Flight()
+        self.primary_done = self.hedge_started = False
+        self.winner: Optional[str] = None
+        self.hedge_response = None
+        self.hedge_done = threading.Event()
+
+
+class _Timer:
+    """One daemon thread running each scheduled callback when due, unless it was cancelled."""
+
+    def __init__(self):
+        self._queue: List = []
+        self._order = itertools.count()
+        self._cond = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+
+    def schedule(self, delay: float, callback) -> List:
+        entry = [callback]
+        with self._cond:
+            heapq.heappush(self._queue, (time.monotonic() + delay, next(self._order), entry))
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="hedge-timer", daemon=True)
+                self._thread.start()
+            self._cond.notify()
+        return entry
+
+    @staticmethod
+    def cancel(entry: List) -> None:
+        entry[0] = None
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while True:
+                    if not self._queue:
+                        self._cond.wait()
+                        continue
+                    due, _, entry = self._queue[0]
+                    if entry[0] is None or due <= time.monotonic():
+                        heapq.heappop(self._queue)
+                        if entry[0] is not None:
+                            callback = entry[0]
+                            break
+                        continue
+                    self._cond.wait(due - time.monotonic())
+            try:
+                callback()
+            except Exception:
+                logger.exception("Hedge timer callback failed")
+
+
+def _tracking_session(pool_size: int):
+    """A requests session whose connections register with the calling thread's `_Flight`."""
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+    def track(connection) -> None:
+        flight = getattr(_flights, "current", None)
+        if flight is not None:
+            flight.connection = connection
+
+    class TrackedHTTPConnection(HTTPConnection):
+        def request(self, *args, **kwargs):
+            track(self)
+            return super().request(*args, **kwargs)
+
+    class TrackedHTTPSConnection(HTTPSConnection):
+        def request(self, *args, **kwargs):
+            track(self)
+            return super().request(*args, **kwargs)
+
+    class TrackedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = TrackedHTTPConnection
+
+    class TrackedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = TrackedHTTPSConnection
+
+    class TrackingAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": TrackedHTTPConnectionPool,
+                "https": TrackedHTTPSConnectionPool,
+            }
+
+    session = requests.Session()
+    adapter = TrackingAdapter(pool_maxsize=pool_size)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+class HedgedConnector:
+    """Sync pystrapi connector applying the request deadline and, optionally, hedging GETs."""
+
+    def __init__(
+        self,
+        hedge: bool = False,
+        quantile: float = 0.95,
+        min_delay: float = 0.05,
+        window: int = 200,
+        max_workers: int = 32,
+    ):
+        self.hedge = hedge
+        self.quantile = quantile
+        self.min_delay = min_delay
+        self.max_workers = max_workers
+        self.stats: Dict[str, int] = {"reads": 0, "hedged": 0, "hedge_wins": 0, "deadline_exceeded": 0}
+        self._latencies: deque = deque(maxlen=window)
+        self._delay: Optional[float] = None
+        self._new_samples = 0
+        self._lock = threading.Lock()
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._timer = _Timer()
+        self._session = None
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> "HedgedConnector":
+        return cls(
+            hedge=settings["hedge_reads"],
+            quantile=settings["hedge_quantile"],
+            min_delay=settings["hedge_min_delay"],
+        )
+
+    def request(self, method: str, url: str, *, reqargs: Optional[Dict] = None, session=None):
+        reqargs = dict(reqargs or {})
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                self._count("deadline_exceeded")
+                raise DeadlineExceeded(f"Request deadline passed before sending {method} to {url}")
+            reqargs["timeout"] = left
+        if method != "GET":
+            return self._send(method, url, reqargs, session)
+        self._count("reads")
+        delay = self._hedge_delay() if self.hedge else None
+        if delay is None or (left is not None and left <= delay):
+            return self._send(method, url, reqargs, session)
+        return self._hedged(url, reqargs, session, delay)
+
+    def _send(self, method: str, url: str, reqargs: Dict, session, flight: Optional[_Flight] = None):
+        import requests
+        from pystrapi.errors import StrapiError
+        from pystrapi.help import requests_helpers
+
+        action = f"send {method} to {url}"
+        started = time.monotonic()
+        _flights.current = flight
+        try:
+            response = (session or requests).request(method=method, url=url, **reqargs)
+        except requests.Timeout as e:
+            if "timeout" not in reqargs:
+                raise StrapiError(f"Unable to {action}, error: {e})") from e
+            self._count("deadline_exceeded")
+            raise DeadlineExceeded(f"Request deadline passed waiting to {action}", sent=True) from e
+        except Exception as e:
+            raise StrapiError(f"Unable to {action}, error: {e})") from e
+        finally:
+            _flights.current = None
+            # A copy cut off for losing the race would report a latency Strapi never had
+            if method == "GET" and not (flight and flight.cancelled):
+                self._observe(time.monotonic() - started)
+        requests_helpers.raise_for_response(response, action)
+        return response
+
+    def _hedged(self, url: str, reqargs: Dict, session, delay: float):
+        """Sends the GET on this thread, and a second copy from the pool if it is not answered in `delay`."""
+        race = _Race()
+        session = session or self._get_session()
+        timer = self._timer.schedule(delay, lambda: self._start_hedge(race, url, reqargs, session, delay))
+        response, error = None, None
+        try:
+            response = self._send("GET", url, reqargs, session, flight=race.primary)
+        except Exception as e:
+            error = e
+        finally:
+            self._timer.cancel(timer)
+        with race.lock:
+            race.primary_done = True
+            if error is None and race.winner is None:
+                race.winner = "primary"
+            hedge_started = race.hedge_started
+        if race.winner == "primary":
+            race.hedge.cancel()
+            return response
+        if race.winner is None:
+            if not hedge_started:
+                raise error
+            race.hedge_done.wait()
+            if race.winner is None:
+                raise error
+        self._count("hedge_wins")
+        logger.debug("Hedged GET %s answered first after %.3fs", url, delay)
+        return race.hedge_response
+
+    def _start_hedge(self, race: _Race, url: str, reqargs: Dict, session, delay: float) -> None:
+        with race.lock:
+            if race.primary_done:
+                return
+            race.hedge_started = True
+        self._count("hedged")
+        hedge_args = dict(reqargs)
+        if "timeout" in reqargs:
+            hedge_args["timeout"] = max(reqargs["timeout"] - delay, 0.001)
+        self._get_pool().submit(self._run_hedge, race, url, hedge_args, session)
+
+    def _run_hedge(self, race: _Race, url: str, reqargs: Dict, session) -> None:
+        try:
+            response = self._send("GET", url, reqargs, session, flight=race.hedge)
+        except Exception:
+            response = None
+        with race.lock:
+            won = response is not None and race.winner is None
+            if won:
+                race.winner, race.hedge_response = "hedge", response
+        if won:
+            # Frees the caller's thread, still waiting on the first copy
+            race.primary.cancel()
+        race.hedge_done.set()
+
+    def _observe(self, latency: float) -> None:
+        with self._lock:
+            self._latencies.append(latency)
+            self._new_samples += 1
+
+    def _hedge_delay(self) -> Optional[float]:
+        """The `quantile` of recent GET latencies, or None until enough have been seen."""
+        with self._lock:
+            if len(self._latencies) < MIN_SAMPLES:
+                return None
+            if self._delay is None or self._new_samples >= RECOMPUTE_EVERY:
+                ordered = sorted(self._latencies)
+                index = min(int(len(ordered) * self.quantile), len(ordered) - 1)
+                self._delay = max(ordered[index], self.min_delay)
+                self._new_samples = 0
+            return self._delay
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def _get_session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = _tracking_session(self.max_workers)
+        return self._session
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="hedge")
+        return self._pool
@@ -0,0 +1,327 @@
+"""
+Thumbnails of the LinkedIn profile pictures, served from this host.
+
+`GET /img/<profile_id>` looks up the profile's `profilePicture`, downloads it once, shrinks
+it to fit in `IMAGE_THUMBNAIL_SIZE` pixels (default 128) and keeps the result in a disk
+cache under `IMAGE_CACHE_DIR`, shared by the workers on the host:
+
+    <dir>/blobs/<ab>/<sha256 of thumbnail>    thumbnail bytes, stored once however many URLs share them
+    <dir>/sources/<sha256 of size and URL>    the blob and content type a picture URL maps to
+
+When the blobs outgrow `IMAGE_CACHE_MAX_BYTES` (default 100 MB), the least recently served
+ones are deleted. The profiles page links to `/img/<id>?v=<hash of the picture URL>`, so
+browsers may keep those responses for a year: a new picture gets a new URL.
+
+Pictures are only fetched from hosts resolving to public addresses, redirects included, and
+with `IMAGE_ALLOWED_HOSTS` (e.g. `licdn.com`) only from those hosts and their subdomains. The
+connection goes to the address that was checked, so a host resolving differently the second
+time (DNS rebinding) cannot steer it elsewhere; for the same reason no HTTP proxy is used.
+Resizing needs Pillow; without it the original image is cached and served as-is.
+"""
+import fcntl
+import hashlib
+import io
+import ipaddress
+import logging
+import os
+import socket
+import tempfile
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+logger = logging.getLogger(__name__)
+
+CACHE_CONTROL = "public, max-age=86400"
+CACHE_CONTROL_VERSIONED = "public, max-age=31536000, immutable"
+MAX_SOURCE_BYTES = 10 * 1024 * 1024
+FETCH_TIMEOUT = 10
+MAX_REDIRECTS = 3
+# Eviction deletes down to this fraction of the budget, so the next writes do not each delete a blob
+EVICT_TO = 0.9
+
+_thumbnail_cache: Optional["ThumbnailCache"] = None
+
+
+def version(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+def image_url(profile) -> Optional[str]:
+    """Where the profiles page loads `profile`'s picture from, or None without one."""
+    if not getattr(profile, "profilePicture", None):
+        return None
+    return f"/img/{profile.id}?v={version(profile.profilePicture)}"
+
+
+def check_url(url: str, allowed_hosts: Optional[List[str]] = None) -> List[str]:
+    """
+    The addresses of `url`'s host; raises ValueError unless it is http(s) on an allowed host
+    whose addresses are all public. Picture URLs come from Strapi records, so without this anyone
+    who can edit a profile could make the server fetch from its own network (cloud metadata,
+    internal services).
+    """
+    parsed = urlsplit(url)
+    host = (parsed.hostname or "").lower()
+    if parsed.scheme not in ("http", "https") or not host:
+        raise ValueError(f"Not an http(s) URL: {url!r}")
+    if allowed_hosts and not any(host == h or host.endswith("." + h) for h in allowed_hosts):
+        raise ValueError(f"{host} is not in IMAGE_ALLOWED_HOSTS")
+    try:
+        infos = socket.getaddrinfo(host, parsed.port or (443 if parsed.scheme == "https" else 80), proto=socket.IPPROTO_TCP)
+    except (socket.gaierror, UnicodeError) as e:
+        raise ValueError(f"Cannot resolve {host}: {e}") from e
+    addresses = []
+    for info in infos:
+        address = ipaddress.ip_address(info[4][0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise ValueError(f"{host} resolves to non-public address {address}")
+        addresses.append(str(address))
+    return addresses
+
+
+def _pinned_session(address: str):
+    """
+    A requests session connecting to `address` whatever the URL's host is, which still names the
+    server in the Host header, TLS SNI and certificate check. The name is not resolved again.
+    """
+    import requests
+    from requests.adapters import HTTPAdapter
+    from urllib3.connection import HTTPConnection, HTTPSConnection
+    from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+    from urllib3.exceptions import NewConnectionError
+    from urllib3.util.connection import create_connection
+
+    def new_conn(connection):
+        # urllib3 opens every socket here (HTTPS wraps it afterwards), otherwise resolving `host`
+        try:
+            return create_connection(
+                (address, connection.port),
+                connection.timeout,
+                source_address=connection.source_address,
+                socket_options=connection.socket_options,
+            )
+        except OSError as e:
+            raise NewConnectionError(connection, f"Failed to connect to {address}: {e}") from e
+
+    class PinnedHTTPConnection(HTTPConnection):
+        _new_conn = new_conn
+
+    class PinnedHTTPSConnection(HTTPSConnection):
+        _new_conn = new_conn
+
+    class PinnedHTTPConnectionPool(HTTPConnectionPool):
+        ConnectionCls = PinnedHTTPConnection
+
+    class PinnedHTTPSConnectionPool(HTTPSConnectionPool):
+        ConnectionCls = PinnedHTTPSConnection
+
+    class PinnedAdapter(HTTPAdapter):
+        def init_poolmanager(self, *args, **kwargs):
+            super().init_poolmanager(*args, **kwargs)
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": PinnedHTTPConnectionPool,
+                "https": PinnedHTTPSConnectionPool,
+            }
+
+    session = requests.Session()
+    # A proxy would resolve the host itself
+    session.trust_env = False
+    adapter = PinnedAdapter()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def download(url: str, allowed_hosts: Optional[List[str]] = None) -> Tuple[bytes, str]:
+    """The image at `url` and its content type; raises ValueError for anything else."""
+    for _ in range(MAX_REDIRECTS + 1):
+        # Redirects are followed by hand so that every hop is checked, not just the first URL
+        addresses = check_url(url, allowed_hosts)
+        with _pinned_session(addresses[0]) as session:
+            with session.get(url, timeout=FETCH_TIMEOUT, stream=True, allow_redirects=False) as response:
+                if not response.is_redirect:
+                    return _read_image(url, response)
+                url = urljoin(url, response.headers["Location"])
+    raise ValueError(f"More than {MAX_REDIRECTS} redirects fetching {url}")
+
+
+def _read_image(url: str, response) -> Tuple[bytes, str]:
+    response.raise_for_status()
+    content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+    # SVG can carry scripts, which would run on this origin
+    if not content_type.startswith("image/") or content_type == "image/svg+xml":
+        raise ValueError(f"{url} is {content_type or 'untyped'}, not a raster image")
+    chunks, total = [], 0
+    for chunk in response.iter_content(64 * 1024):
+        total += len(chunk)
+        if total > MAX_SOURCE_BYTES:
+            raise ValueError(f"{url} is larger than {MAX_SOURCE_BYTES} bytes")
+        chunks.append(chunk)
+    return b"".join(chunks), content_type
+
+
+def thumbnail(body: bytes, content_type: str, size: int) -> Tuple[bytes, str]:
+    """`body` scaled down to fit `size` x `size` pixels, as JPEG (PNG if it has transparency)."""
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return body, content_type
+    with Image.open(io.BytesIO(body)) as image:
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((size, size))
+        out = io.BytesIO()
+        if image.mode in ("RGBA", "LA", "P"):
+            image.save(out, "PNG", optimize=True)
+            return out.getvalue(), "image/png"
+        image.convert("RGB").save(out, "JPEG", quality=85, optimize=True)
+        return out.getvalue(), "image/jpeg"
+
+
+class ThumbnailCache:
+    def __init__(self, directory: str, max_bytes: int, size: int, allowed_hosts: Optional[List[str]] = None):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.size = size
+        self.allowed_hosts = allowed_hosts
+        os.makedirs(os.path.join(directory, "blobs"), exist_ok=True)
+        os.makedirs(os.path.join(directory, "sources"), exist_ok=True)
+
+    def _source_path(self, url: str) -> str:
+        digest = hashlib.sha256(f"{self.size}:{url}".encode()).hexdigest()
+        return os.path.join(self.directory, "sources", digest)
+
+    def _blob_path(self, digest: str) -> str:
+        return os.path.join(self.directory, "blobs", digest[:2], digest)
+
+    def get(self, url: str) -> Optional[Tuple[bytes, str, str]]:
+        """The cached thumbnail for `url`: its bytes, content type and digest."""
+        try:
+            with open(self._source_path(url)) as f:
+                digest, content_type = f.read().split()
+            blob_path = self._blob_path(digest)
+            with open(blob_path, "rb") as f:
+                body = f.read()
+            # The blobs' mtime orders eviction
+            os.utime(blob_path)
+        except (OSError, ValueError):
+            return None
+        return body, content_type, digest
+
+    def put(self, url: str, body: bytes, content_type: str) -> str:
+        digest = hashlib.sha256(body).hexdigest()
+        blob_path = self._blob_path(digest)
+        if os.path.exists(blob_path):
+            os.utime(blob_path)
+        else:
+            self._write(blob_path, body)
+        self._write(self._source_path(url), f"{digest} {content_type}".encode())
+        self.evict(keep=blob_path)
+        return digest
+
+    def fetch(self, url: str) -> Tuple[bytes, str, str]:
+        """Like `get`, downloading and shrinking the picture first on a miss."""
+        cached = self.get(url)
+        if cached is not None:
+            return cached
+        with self.lock(url):
+            # Another worker may have stored it while this one waited for the lock
+            cached = self.get(url)
+            if cached is not None:
+                return cached
+            body, content_type = thumbnail(*download(url, self.allowed_hosts), self.size)
+            digest = self.put(url, body, content_type)
+            return body, content_type, digest
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Deletes the least recently served blobs, other than `keep`, once they outgrow `max_bytes`."""
+        blobs, total = [], 0
+        for root, _, names in os.walk(os.path.join(self.directory, "blobs")):
+            for name in names:
+                if name.startswith("."):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                blobs.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+        if total <= self.max_bytes:
+            return
+        blobs.sort()
+        for _, size, path in blobs:
+            if total <= self.max_bytes * EVICT_TO:
+                break
+            if path == keep:
+                continue
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        # Sources pointing at deleted blobs are misses in `get` and get rewritten on the next fetch
+
+    @contextmanager
+    def lock(self, url: str):
+        """Cross-process lock held while one worker downloads a picture."""
+        with open(self._source_path(url) + ".lock", "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _write(path: str, data: bytes) -> None:
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+
+def get_thumbnail_cache() -> ThumbnailCache:
+    global _thumbnail_cache
+    if _thumbnail_cache is None:
+        from strapi_model_mixin import load_settings
+
+        settings = load_settings()
+        _thumbnail_cache = ThumbnailCache(
+            settings["image_cache_dir"],
+            settings["image_cache_max_bytes"],
+            settings["image_thumbnail_size"],
+            settings["image_allowed_hosts"],
+        )
+    return _thumbnail_cache
+
+
+def image_response(profile_id: int, requested_version: Optional[str] = None, if_none_match: Optional[str] = None):
+    """The thumbnail of a profile's picture as a werkzeug `Response`, for both apps."""
+    from werkzeug.wrappers import Response
+
+    from models.linkedin_profile import LinkedInProfile
+
+    profile = LinkedInProfile.get_one(profile_id, populate=None, fields=["profilePicture"])
+    url = getattr(profile, "profilePicture", None)
+    if not url:
+        return Response(status=404)
+    try:
+        body, content_type, digest = get_thumbnail_cache().fetch(url)
+    except Exception as e:
+        logger.warning("Could not fetch the picture of profile %s: %s", profile_id, e)
+        return Response(status=502)
+
+    cache_control = CACHE_CONTROL_VERSIONED if requested_version == version(url) else CACHE_CONTROL
+    headers = {"Cache-Control": cache_control, "ETag": f'"{digest}"', "X-Content-Type-Options": "nosniff"}
+    if if_none_match and f'"{digest}"' in if_none_match:
+        return Response(status=304, headers=headers)
+    return Response(body, content_type=content_type, headers=headers)
+
+
+def image_route(profile_id: int):
+    """Flask view for `GET /img/<profile_id>`."""
+    from flask import request
+
+    return image_response(profile_id, request.args.get("v"), request.headers.get("If-None-Match"))
@@ -0,0 +1,140 @@
+"""
+Logging setup for the WSGI and ASGI apps.
+
+Request threads only put records on a queue; a listener thread formats and writes them, so a
+slow stderr or log collector never adds latency to a request. On top of that:
+
+- `LOG_FORMAT=json` writes one JSON object per line, with the `extra={...}` fields the model
+  layer attaches (`model`, `id`, `event`, `latency_ms`, ...) as top-level keys,
+- `LOG_SAMPLE_RATE=0.01` keeps 1% of the per-call INFO/DEBUG records of the hot-path loggers;
+  warnings and errors are always kept,
+- payloads are logged through `Truncated`, which formats (and cuts at `LOG_MAX_PAYLOAD`
+  characters) only if the record is actually written.
+
+    LOG_LEVEL=INFO LOG_FORMAT=json LOG_SAMPLE_RATE=0.1 gunicorn app:app
+"""
+import atexit
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+from typing import Any, Optional, TextIO
+
+# Loggers emitting a record per Strapi call; only these are sampled
+SAMPLED_LOGGERS = ("strapi_model_mixin", "upstream_guard", "shared_cache", "cache_invalidation")
+
+_max_payload = int(os.getenv("LOG_MAX_PAYLOAD", "200"))
+_listener: Optional[logging.handlers.QueueListener] = None
+
+# Attributes every LogRecord has; anything else came from `extra=` and goes into the JSON
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class Truncated:
+    """Lazily formatted log argument, cut to `LOG_MAX_PAYLOAD` characters."""
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value: Any, limit: Optional[int] = None):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self) -> str:
+        try:
+            text = self.value if isinstance(self.value, str) else repr(self.value)
+        except RuntimeError:  # Mutated by the request thread while the listener formats it
+            return "<changed while logging>"
+        limit = _max_payload if self.limit is None else self.limit
+        if len(text) > limit:
+            return f"{text[:limit]}... ({len(text)} chars)"
+        return text
+
+    __repr__ = __str__
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps a `rate` fraction of the INFO and DEBUG records of the hot-path loggers."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        if not record.name.startswith(SAMPLED_LOGGERS):
+            return True
+        return random.random() < self.rate
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update({k: v for k, v in vars(record).items() if k not in _RECORD_ATTRS})
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The stock handler formats the message here, on the request thread, so that records
+        # can cross processes. This queue stays in-process: leave formatting to the listener.
+        return record
+
+
+def configure_logging(stream: Optional[TextIO] = None) -> None:
+    """
+    Routes the root logger through a queue to a thread writing to `stream` (stderr by default).
+    Safe to call repeatedly.
+    """
+    global _listener
+    if _listener is not None:
+        return
+    level = os.getenv("LOG_LEVEL", "INFO").upper()
+    stream = logging.StreamHandler(stream or sys.stderr)
+    if os.getenv("LOG_FORMAT", "text") == "json":
+        stream.setFormatter(JsonFormatter())
+    else:
+        stream.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+
+    records: queue.SimpleQueue = queue.SimpleQueue()
+    handler = _QueueHandler(records)
+    handler.addFilter(SamplingFilter(float(os.getenv("LOG_SAMPLE_RATE", "1"))))
+    root = logging.getLogger()
+    root.setLevel(level)
+    for existing in root.handlers[:]:
+        if isinstance(existing, _QueueHandler):
+            root.removeHandler(existing)
+    root.addHandler(handler)
+
+    _listener = logging.handlers.QueueListener(records, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def _stop() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_after_fork() -> None:
+    # The listener thread does not survive fork; give each worker its own
+    global _listener
+    if _listener is not None:
+        _listener = None
+        configure_logging()
+
+
+atexit.register(_stop)
+os.register_at_fork(after_in_child=_restart_after_fork)
+
@@ -0,0 +1,183 @@
+"""
+Column-oriented container for large `get_all` results.
+
+`Model.get_all(as_frame=True)` returns a `ModelFrame` instead of a list of model objects: one
+list per annotated field of the model, rather than one object (and `__dict__`) per row holding
+every raw field Strapi returned. Short strings are interned, so repeated values such as names
+or enum-like fields are stored once. For analytics and sync jobs over 100k profiles this cuts
+memory severalfold.
+
+    >>> frame = LinkedInProfile.get_all(get_all=True, as_frame=True)
+    >>> recent = frame.filter({"createdAt": {"$gte": "2023-01-01"}}).sort("lastName")
+    >>> recent["lastName"][:3], recent[0].profileLink, recent.select("id", "profileLink")
+
+With `get_all=True` the collection is read one keyset page at a time (see `strapi_export.iter_entries`)
+and each page is added to the columns before the next is fetched, so the whole response never sits
+in memory as dicts. Filters take the same expressions as `get_all(filters=...)` and are evaluated a
+column at a time. `to_numpy()` turns numeric columns into NumPy arrays when NumPy is installed.
+"""
+import sys
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Union
+
+from strapi_filters import CompiledFilter, as_compiled
+
+# Longer strings (summaries, URLs) are rarely repeated, so interning them only costs lookups
+INTERN_MAX_LENGTH = 64
+
+
+def frame_fields(model) -> List[str]:
+    """The annotated fields of `model` that become columns, `id` first."""
+    names = []
+    for klass in reversed(model.__mro__):
+        for name in getattr(klass, "__annotations__", {}):
+            if name != "model_path" and name not in names:
+                names.append(name)
+    if "id" in names:
+        names.remove("id")
+    return ["id"] + names
+
+
+def _intern(value: Any) -> Any:
+    if isinstance(value, str) and len(value) <= INTERN_MAX_LENGTH:
+        return sys.intern(value)
+    return value
+
+
+def _take(column: Sequence[Any], indices: List[int]) -> Sequence[Any]:
+    if hasattr(column, "take"):  # NumPy array
+        return column.take(indices)
+    return [column[i] for i in indices]
+
+
+class Row:
+    """A view of one row of a `ModelFrame`; attribute access reads from the columns."""
+
+    __slots__ = ("_frame", "_index")
+
+    def __init__(self, frame: "ModelFrame", index: int):
+        self._frame = frame
+        self._index = index
+
+    def __getattr__(self, name: str) -> Any:
+        try:
+            return self._frame.columns[name][self._index]
+        except KeyError:
+            raise AttributeError(name) from None
+
+    def __repr__(self) -> str:
+        return f"Row({self._frame.model.__name__}, {self.as_dict()!r})"
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: column[self._index] for name, column in self._frame.columns.items()}
+
+    def to_object(self):
+        """A regular model object for this row, e.g. to `upsert` it."""
+        values = self.as_dict()
+        return self._frame.model._from_entry({"id": values.pop("id", None), "attributes": values})
+
+
+class ModelFrame:
+    """Struct-of-arrays result of `get_all(as_frame=True)`: one column per annotated field."""
+
+    __slots__ = ("model", "columns", "next_cursor", "_length")
+
+    def __init__(self, model, columns: Dict[str, Sequence[Any]], next_cursor: Optional[str] = None):
+        self.model = model
+        self.columns = columns
+        self.next_cursor = next_cursor
+        self._length = len(next(iter(columns.values()))) if columns else 0
+
+    @classmethod
+    def from_entries(cls, model, entries: Sequence[Dict], next_cursor: Optional[str] = None) -> "ModelFrame":
+        """Builds a frame from the `data` of a Strapi list response."""
+        return cls.from_pages(model, [entries], next_cursor)
+
+    @classmethod
+    def from_pages(cls, model, pages: Iterable[Sequence[Dict]], next_cursor: Optional[str] = None) -> "ModelFrame":
+        """Builds a frame from pages of entries, consuming them one at a time."""
+        fields = frame_fields(model)
+        columns: Dict[str, List[Any]] = {name: [] for name in fields}
+        appends = [(name, columns[name].append) for name in fields[1:]]
+        ids = columns["id"].append
+        for entries in pages:
+            for entry in entries:
+                attributes = model._normalize_attributes(entry.get("attributes") or {})
+                ids(entry.get("id"))
+                for name, append in appends:
+                    append(_intern(attributes.get(name)))
+        return cls(model, columns, next_cursor)
+
+    @property
+    def fields(self) -> List[str]:
+        return list(self.columns)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __iter__(self) -> Iterator[Row]:
+        return (Row(self, i) for i in range(self._length))
+
+    def __getitem__(self, item: Union[int, slice, str]):
+        """`frame["name"]` is a column, `frame[i]` a row view and `frame[a:b]` a sub-frame."""
+        if isinstance(item, str):
+            return self.columns[item]
+        if isinstance(item, slice):
+            return self.take(range(self._length)[item])
+        if item < 0:
+            item += self._length
+        if not 0 <= item < self._length:
+            raise IndexError("ModelFrame index out of range")
+        return Row(self, item)
+
+    def __repr__(self) -> str:
+        return f"ModelFrame({self.model.__name__}, {self._length} rows, fields={self.fields})"
+
+    def take(self, indices: Sequence[int]) -> "ModelFrame":
+        """A new frame with the rows at `indices`, in that order."""
+        indices = list(indices)
+        columns = {name: _take(column, indices) for name, column in self.columns.items()}
+        return ModelFrame(self.model, columns)
+
+    def filter(self, where: Union[None, str, Dict, CompiledFilter, Sequence[bool], Callable[[Row], bool]]) -> "ModelFrame":
+        """
+        Keeps the rows matching `where`: a filter expression as accepted by `get_all`, a
+        boolean mask, or a predicate called with each `Row`.
+        """
+        if callable(where):
+            mask = [bool(where(row)) for row in self]
+        elif where is None or isinstance(where, (str, dict, CompiledFilter)):
+            mask = as_compiled(where).mask(self.columns, self._length)
+        else:
+            mask = list(where)
+        return self.take(i for i, keep in enumerate(mask) if keep)
+
+    def sort(self, field: str, reverse: bool = False) -> "ModelFrame":
+        """Rows ordered by one column; missing values go last."""
+        column = self.columns[field]
+        present = [i for i in range(self._length) if column[i] is not None]
+        missing = [i for i in range(self._length) if column[i] is None]
+        present.sort(key=column.__getitem__, reverse=reverse)
+        return self.take(present + missing)
+
+    def select(self, *fields: str) -> "ModelFrame":
+        """A frame with only the given columns; they are shared, not copied."""
+        return ModelFrame(self.model, {name: self.columns[name] for name in fields}, self.next_cursor)
+
+    def records(self) -> List[Dict[str, Any]]:
+        return [row.as_dict() for row in self]
+
+    def to_objects(self) -> List[Any]:
+        return [row.to_object() for row in self]
+
+    def to_numpy(self) -> "ModelFrame":
+        """
+        A frame whose fully populated int, float and bool columns are NumPy arrays; other
+        columns are shared as-is. Requires NumPy.
+        """
+        import numpy
+
+        columns = {}
+        for name, column in self.columns.items():
+            numeric = all(isinstance(v, (int, float, bool)) for v in column)
+            columns[name] = numpy.asarray(column) if numeric and self._length else column
+        return ModelFrame(self.model, columns, self.next_cursor)
@@ -23,3 +23,4 @@ class Blog(StrapiModelMixin):
     model_path: str = "blogs"
     author: Author = None
     worlds: List[World] = field(default_factory=list)
+    search_fields = ("text",)
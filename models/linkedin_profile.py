@@ -24,14 +24,20 @@ class LinkedInProfile(StrapiModelMixin):
     updatedAt: str = None
     publishedAt: str = None
     model_path: str = "linked-in-profiles"
+    # The list route, and get_all() as used by the profiles page
+    warm_queries = ({}, {"populate": "*"})
+    search_fields = ("firstName", "lastName", "summary")
     # author: Author = None
     # worlds: List[World] = field(default_factory=list)
 
     def __init__(self, **kwargs):
-        self.__dict__.update(kwargs)
+        self.__dict__.update(self._normalize_attributes(kwargs))
 
-        if self.profileLink is None:
-            urn =  self.__dict__['entityUrn'].split(":")[3]
+    @classmethod
+    def _normalize_attributes(cls, attributes):
+        if attributes.get("profileLink") is None and "entityUrn" in attributes:
+            urn = attributes["entityUrn"].split(":")[3]
             urn = urn.replace("(", "")
             urn = urn.replace(")", "")
-            self.__dict__['profileLink'] = f"https://www.linkedin.com/sales/lead/{urn}"
+            attributes = {**attributes, "profileLink": f"https://www.linkedin.com/sales/lead/{urn}"}
+        return attributes
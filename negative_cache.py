@@ -0,0 +1,76 @@
+"""
+Short-lived memory of the ids Strapi answered "not found" for.
+
+`fetch_one` (and with it `get_one` and the detail routes) records a 404 per
+`(model_path, id)` and, for `STRAPI_NEGATIVE_CACHE_TTL` seconds (default 10), answers
+repeated requests for that id without calling Strapi. At most `STRAPI_NEGATIVE_CACHE_SIZE`
+ids are kept, least recently used first out. A create, update or delete of the id made
+through the models or reported by a Strapi webhook forgets it right away.
+
+The memory is per process: other workers learn about a 404 on their own and forget it when
+the TTL runs out.
+"""
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+
+def is_not_found(error: Exception) -> bool:
+    from pystrapi.errors import NotFoundError
+
+    return isinstance(error, NotFoundError)
+
+
+def not_found_response(model_path: str, _id) -> Dict:
+    """Strapi-style error body for a detail route."""
+    return {
+        "data": None,
+        "error": {"status": 404, "name": "NotFoundError", "message": f"No {model_path} entry with id {_id}"},
+    }
+
+
+class NegativeCache:
+    def __init__(self, ttl: float = 10.0, max_entries: int = 10_000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        # Only the error type and args are kept; the exception itself would pin its traceback
+        self._entries: "OrderedDict[Tuple[str, str], Tuple[float, type, tuple]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_path: str, _id) -> Optional[Exception]:
+        """A fresh copy of the error remembered for the id, or None."""
+        key = (model_path, str(_id))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, error_type, args = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return error_type(*args)
+
+    def add(self, model_path: str, _id, error: Exception) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            return
+        key = (model_path, str(_id))
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, type(error), error.args)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, model_path: str, _id) -> None:
+        with self._lock:
+            self._entries.pop((model_path, str(_id)), None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
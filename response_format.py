@@ -0,0 +1,143 @@
+"""
+Serialization of the model routes' JSON responses.
+
+By default the list and detail routes return Strapi's own response shape. With
+`?format=compact` they return one flat object per entry instead:
+
+    {"data": [{"id": 1, "text": "...", "author": 9, "worlds": [3, 4]}], "meta": {...}}
+
+- `id` and the attributes share one object; attributes that are null are left out,
+- relations are sent as ids, or with `&relations=inline` as flat objects of their own
+  (whose relations are ids in turn).
+
+Encoding uses orjson when it is installed and the standard library otherwise; set
+`JSON_ENCODER=json` to force the latter. Responses of at least `MIN_COMPRESS_SIZE` bytes are
+gzipped for clients that accept it.
+"""
+import gzip
+import json
+import os
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from werkzeug.exceptions import BadRequest
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional speed-up
+    orjson = None
+
+FORMATS = ("strapi", "compact")
+RELATIONS = ("ids", "inline")
+MIN_COMPRESS_SIZE = 1024
+COMPRESS_LEVEL = 6
+
+
+def _json_dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+ENCODERS: Dict[str, Tuple[Callable[[Any], bytes], Callable[[Any], Any]]] = {"json": (_json_dumps, json.loads)}
+if orjson is not None:
+    ENCODERS["orjson"] = (lambda obj: orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS), orjson.loads)
+
+_dumps, _loads = ENCODERS[os.getenv("JSON_ENCODER", "orjson" if orjson is not None else "json")]
+
+
+def use_encoder(name: str) -> None:
+    """Switches the encoder used for responses and shared cache entries, e.g. `"json"`."""
+    global _dumps, _loads
+    if name not in ENCODERS:
+        raise ValueError(f"Unknown JSON encoder {name!r}; available: {', '.join(ENCODERS)}")
+    _dumps, _loads = ENCODERS[name]
+
+
+def dumps(obj: Any) -> bytes:
+    return _dumps(obj)
+
+
+def loads(payload: bytes) -> Any:
+    return _loads(payload)
+
+
+def _is_envelope(value: Dict) -> bool:
+    # Relation and media fields: {"data": {...} | [...] | None}
+    return "data" in value and set(value) <= {"data", "meta"}
+
+
+def _without_nulls(value: Any) -> Any:
+    if isinstance(value, dict):
+        return {k: _without_nulls(v) for k, v in value.items() if v is not None}
+    if isinstance(value, list):
+        return [_without_nulls(v) for v in value]
+    return value
+
+
+def compact_entry(entry: Dict, inline: bool = False) -> Dict[str, Any]:
+    """A Strapi entry as one flat object; relations become ids, or flat objects with `inline`."""
+    row = {"id": entry.get("id")}
+    for name, value in (entry.get("attributes") or {}).items():
+        if value is None:
+            continue
+        if isinstance(value, dict) and _is_envelope(value):
+            related = value["data"]
+            if related is None:
+                continue
+            if isinstance(related, list):
+                row[name] = [compact_entry(r) if inline else r.get("id") for r in related]
+            else:
+                row[name] = compact_entry(related) if inline else related.get("id")
+        else:
+            row[name] = _without_nulls(value)
+    return row
+
+
+def compact(response: Dict, relations: str = "ids") -> Dict:
+    """A list or detail response with its entries compacted; `meta` is kept when not empty."""
+    inline = relations == "inline"
+    data = response.get("data")
+    if isinstance(data, list):
+        data = [compact_entry(entry, inline) for entry in data]
+    elif isinstance(data, dict):
+        data = compact_entry(data, inline)
+    result = {"data": data}
+    for key, value in response.items():
+        if key != "data" and value:
+            result[key] = value
+    return result
+
+
+def render(rv: Any, query) -> bytes:
+    """
+    Serializes a route's return value in the format the query asks for. `rv` may already be
+    Strapi-format JSON bytes (e.g. from the shared cache), which are passed through as-is.
+    """
+    response_format = query.get("format") or "strapi"
+    if response_format not in FORMATS:
+        raise BadRequest(f"Unsupported response format {response_format!r}; use one of {', '.join(FORMATS)}")
+    if response_format == "strapi":
+        return rv if isinstance(rv, bytes) else dumps(rv)
+    relations = query.get("relations") or "ids"
+    if relations not in RELATIONS:
+        raise BadRequest(f"Unsupported relations mode {relations!r}; use one of {', '.join(RELATIONS)}")
+    return dumps(compact(loads(rv) if isinstance(rv, bytes) else rv, relations))
+
+
+def compress(body: bytes, accept_encoding: Optional[str]) -> Optional[bytes]:
+    """The gzipped body if the client accepts gzip and the body is worth compressing."""
+    if len(body) < MIN_COMPRESS_SIZE or not accept_encoding or "gzip" not in accept_encoding:
+        return None
+    return gzip.compress(body, COMPRESS_LEVEL, mtime=0)
+
+
+def json_response(rv: Any, status: int = 200):
+    """Flask response for a model route's return value, see `render` and `compress`."""
+    from flask import Response, request
+
+    body = render(rv, request.args)
+    response = Response(body, status=status, mimetype="application/json")
+    compressed = compress(body, request.headers.get("Accept-Encoding"))
+    if compressed is not None:
+        response.set_data(compressed)
+        response.headers["Content-Encoding"] = "gzip"
+    response.vary.add("Accept-Encoding")
+    return response
@@ -0,0 +1,251 @@
+"""
+In-process full-text search over the models' text fields.
+
+Models opt in with a `search_fields` class attribute, e.g. `("text",)` on `Blog`. The first
+`GET /<model_path>/search?q=...` in a worker reads those fields for the whole collection
+(keyset pages, see strapi_export.py) into an inverted index; queries are then answered from
+memory in well under a millisecond for collections of this size:
+
+- text is lower-cased, accent-folded and split into word tokens,
+- every query token also matches the indexed words it is a prefix of, so "lov" finds
+  "Lovelace" while typing (exact matches weigh more),
+- results are ranked with BM25.
+
+The build runs in a background thread, one per model, so no request waits for it: until the
+index is ready, searches get a 503 with `Retry-After`. Creates, updates and deletes made
+through the models (including `upsert` and Strapi webhooks) update the index as they happen. Writes seen only by other workers are picked up
+by a background rebuild every `STRAPI_SEARCH_REBUILD_INTERVAL` seconds (default 300).
+"""
+import bisect
+import heapq
+import json
+import logging
+import math
+import re
+import threading
+import time
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from cache_invalidation import DELETE
+from strapi_export import iter_entries
+from strapi_model_mixin import load_settings, on_change
+
+logger = logging.getLogger(__name__)
+
+TOKEN = re.compile(r"\w+")
+K1, B = 1.2, 0.75
+# Indexed words a query token may expand to, and how much a prefix match counts
+MAX_EXPANSIONS = 50
+PREFIX_WEIGHT = 0.5
+
+# Seconds a search waiting for the first build is told to wait
+BUILD_RETRY_AFTER = 5
+
+_indexes: Dict[str, "SearchIndex"] = {}
+_indexes_lock = threading.Lock()
+
+
+class IndexNotReady(Exception):
+    """Raised for searches while the model's index is still being built for the first time."""
+
+    def __init__(self, message: str, retry_after: int = BUILD_RETRY_AFTER):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def index_not_ready_response(error: IndexNotReady):
+    """Flask error handler turning `IndexNotReady` into a 503."""
+    body = {"data": None, "error": {"status": 503, "name": "IndexNotReady", "message": str(error)}}
+    return json.dumps(body), 503, {"Content-Type": "application/json", "Retry-After": str(error.retry_after)}
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    if not text:
+        return []
+    folded = unicodedata.normalize("NFKD", str(text).lower())
+    return TOKEN.findall("".join(c for c in folded if not unicodedata.combining(c)))
+
+
+class SearchIndex:
+    def __init__(self, model):
+        self.model = model
+        self.fields = tuple(model.search_fields)
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.documents: Dict[int, Tuple[Counter, int, Dict]] = {}  # id -> (terms, length, fields)
+        self.total_length = 0
+        self.built_at = 0.0
+        self._vocabulary: List[str] = []
+        self._vocabulary_stale = False
+        self._lock = threading.RLock()
+        self._rebuilding = False
+        self._ready = threading.Event()
+
+    def build(self) -> "SearchIndex":
+        """Reads the search fields of every entry from Strapi and replaces the index contents."""
+        started = time.monotonic()
+        fresh = SearchIndex(self.model)
+        for entries in iter_entries(self.model, fields=list(self.fields)):
+            for entry in entries:
+                fresh.add(entry["id"], entry.get("attributes") or {})
+        with self._lock:
+            self.postings, self.documents = fresh.postings, fresh.documents
+            self.total_length = fresh.total_length
+            self._vocabulary_stale = True
+            self.built_at = time.time()
+        self._ready.set()
+        logger.info(
+            f"Indexed {len(self.documents)} {self.model.model_path} for search in {time.monotonic() - started:.2f}s"
+        )
+        return self
+
+    def add(self, _id, attributes: Dict) -> None:
+        """Indexes or re-indexes one entry; fields missing from `attributes` keep their old text."""
+        _id = int(_id)
+        with self._lock:
+            previous = self.documents.get(_id)
+            values = dict(previous[2]) if previous else {}
+            values.update({f: attributes[f] for f in self.fields if f in attributes})
+            self.remove(_id)
+            terms = Counter(token for f in self.fields for token in tokenize(values.get(f)))
+            for term, count in terms.items():
+                if term not in self.postings:
+                    self.postings[term] = {}
+                    self._vocabulary_stale = True
+                self.postings[term][_id] = count
+            length = sum(terms.values())
+            self.documents[_id] = (terms, length, values)
+            self.total_length += length
+
+    def remove(self, _id) -> None:
+        _id = int(_id)
+        with self._lock:
+            document = self.documents.pop(_id, None)
+            if document is None:
+                return
+            terms, length, _ = document
+            for term in terms:
+                postings = self.postings[term]
+                postings.pop(_id, None)
+                if not postings:
+                    del self.postings[term]
+                    self._vocabulary_stale = True
+            self.total_length -= length
+
+    def _expand(self, token: str) -> List[Tuple[str, float]]:
+        if self._vocabulary_stale:
+            self._vocabulary = sorted(self.postings)
+            self._vocabulary_stale = False
+        start = bisect.bisect_left(self._vocabulary, token)
+        expansions = []
+        for term in self._vocabulary[start:start + MAX_EXPANSIONS]:
+            if not term.startswith(token):
+                break
+            expansions.append((term, 1.0 if term == token else PREFIX_WEIGHT))
+        return expansions
+
+    def search(self, query: str, limit: int = 20) -> Tuple[List[Dict], int]:
+        """The best `limit` matches as Strapi-style entries with a `score`, and the match count."""
+        with self._lock:
+            count = len(self.documents)
+            if not count:
+                return [], 0
+            average_length = self.total_length / count
+            scores: Dict[int, float] = {}
+            for token in set(tokenize(query)):
+                for term, weight in self._expand(token):
+                    postings = self.postings[term]
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for _id, tf in postings.items():
+                        length = self.documents[_id][1]
+                        score = idf * tf * (K1 + 1) / (tf + K1 * (1 - B + B * length / average_length))
+                        scores[_id] = scores.get(_id, 0.0) + weight * score
+            best = heapq.nsmallest(limit, scores.items(), key=lambda item: (-item[1], item[0]))
+            hits = [
+                {"id": _id, "attributes": dict(self.documents[_id][2]), "score": round(score, 4)}
+                for _id, score in best
+            ]
+            return hits, len(scores)
+
+    @property
+    def ready(self) -> bool:
+        """Whether the first build has finished."""
+        return self._ready.is_set()
+
+    def wait_until_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def rebuild_if_due(self, interval: float) -> None:
+        """
+        Starts a background rebuild when the index is older than `interval` seconds, which an
+        index that was never built always is.
+        """
+        with self._lock:
+            if self._rebuilding or time.time() - self.built_at < interval:
+                return
+            self._rebuilding = True
+
+        def rebuild():
+            try:
+                self.build()
+            except Exception as e:
+                logger.warning(f"Rebuilding the {self.model.model_path} search index failed: {e}")
+            finally:
+                self._rebuilding = False
+
+        threading.Thread(target=rebuild, name=f"search-{self.model.model_path}", daemon=True).start()
+
+
+def get_index(model) -> SearchIndex:
+    """
+    The worker's index for `model`, whose build starts in the background on first use (see
+    `SearchIndex.ready`). Each model's index builds independently of the others.
+    """
+    index = _indexes.get(model.model_path)
+    if index is None:
+        with _indexes_lock:
+            index = _indexes.setdefault(model.model_path, SearchIndex(model))
+    # Also retries a first build that failed
+    index.rebuild_if_due(load_settings()["search_rebuild_interval"])
+    return index
+
+
+@on_change
+def _update_indexes(model, event: str, _id, attributes: Optional[Dict]) -> None:
+    index = _indexes.get(model.model_path)
+    if index is None:
+        return
+    if event == DELETE:
+        index.remove(_id)
+    elif attributes is not None:
+        index.add(_id, attributes)
+
+
+def search_response(model, query) -> Dict:
+    """The results for the query args `query` (`q`, `limit`), for both apps."""
+    from werkzeug.exceptions import BadRequest
+
+    started = time.perf_counter()
+    try:
+        limit = min(max(int(query.get("limit", 20)), 1), 100)
+    except ValueError:
+        raise BadRequest(f"limit must be an integer, got {query.get('limit')!r}") from None
+    index = get_index(model)
+    if not index.ready:
+        raise IndexNotReady(f"The {model.model_path} search index is being built")
+    hits, total = index.search(query.get("q", ""), limit)
+    took_ms = round((time.perf_counter() - started) * 1000, 3)
+    return {"data": hits, "meta": {"total": total, "took_ms": took_ms}}
+
+
+def search_route(model):
+    """Flask view for `GET /<model_path>/search?q=...&limit=20`."""
+    from flask import request
+
+    return search_response(model, request.args)
+
+
+async def asearch_route(model, req):
+    """ASGI view for `GET /<model_path>/search`; index builds run in their own threads."""
+    return search_response(model, req.args)
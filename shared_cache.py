@@ -0,0 +1,269 @@
+"""
+Host-wide cache for Strapi responses, shared by every gunicorn/uvicorn worker on the machine
+and surviving restarts.
+
+Entries are files under `STRAPI_CACHE_DIR`, laid out so related entries can be dropped together:
+
+    <dir>/<model_path>/all/<sha256 of query>        fetch_all results
+    <dir>/<model_path>/one/<id>/<sha256 of query>   fetch_one results
+
+Each file holds an expiry timestamp and the entry's key, followed by the already-serialized
+JSON response, so a hit can be written to the socket as-is. Writes go to a temp file and are renamed into
+place, so readers never see partial entries; an flock per entry lets one worker refill a
+missing entry while the others wait for it instead of all calling Strapi.
+
+At most every `prune_interval` seconds a write starts `prune` in a background thread, in one
+worker at a time: it deletes expired entries, unused lock files and leftover temp files, then
+the least recently written entries until the cache fits in `max_bytes`. Entries being read
+stay recent, as hits close to expiry get refreshed (rewritten) by the model layer.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import shutil
+import struct
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct("!dI")  # expiry timestamp, length of the key that follows
+# Pruning deletes down to this fraction of `max_bytes`, so the next writes do not each trigger it
+PRUNE_TO = 0.9
+# Temp files older than this belong to writers that died before renaming them
+STALE_TMP_AGE = 3600
+
+
+class SharedCache:
+    def __init__(
+        self,
+        directory: str,
+        default_ttl: float = 60.0,
+        max_bytes: Optional[int] = None,
+        prune_interval: float = 60.0,
+    ):
+        self.directory = directory
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+        self.prune_interval = prune_interval
+        self._next_prune = time.monotonic() + prune_interval
+        self._pruning = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _dir(self, parts: Sequence[str]) -> str:
+        # Path parts come from model paths and ids; keep them inside the cache directory
+        safe = [str(p).replace(os.sep, "_").replace("..", "_") for p in parts]
+        return os.path.join(self.directory, *safe)
+
+    def _path(self, parts: Sequence[str], key: str) -> str:
+        return os.path.join(self._dir(parts), hashlib.sha256(key.encode()).hexdigest())
+
+    def get_entry(self, parts: Sequence[str], key: str) -> Optional[Tuple[bytes, float]]:
+        """The cached payload and its expiry time, or None on a miss or an expired entry."""
+        entry = self.read_path(self._path(parts, key))
+        if entry is None:
+            return None
+        _, payload, expires_at = entry
+        return payload, expires_at
+
+    def get(self, parts: Sequence[str], key: str) -> Optional[bytes]:
+        entry = self.get_entry(parts, key)
+        return entry[0] if entry else None
+
+    def set(self, parts: Sequence[str], key: str, payload: bytes, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        self.write_path(self._path(parts, key), key, payload, expires_at)
+
+    def entry_paths(self, parts: Sequence[str], recursive: bool = False) -> Iterator[str]:
+        """Files of the entries under `parts`, for scanning with `read_path`."""
+        for root, dirs, names in os.walk(self._dir(parts)):
+            for name in names:
+                if not name.startswith(".") and not name.endswith(".lock"):
+                    yield os.path.join(root, name)
+            if not recursive:
+                return
+
+    def read_path(self, path: str) -> Optional[Tuple[str, bytes, float]]:
+        """The key, payload and expiry stored in an entry file, or None if missing or expired."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if len(data) < HEADER.size:
+            return None
+        expires_at, key_length = HEADER.unpack_from(data)
+        if expires_at < time.time():
+            return None
+        body = data[HEADER.size:]
+        return body[:key_length].decode(), body[key_length:], expires_at
+
+    def write_path(self, path: str, key: str, payload: bytes, expires_at: float) -> None:
+        directory = os.path.dirname(path)
+        key_bytes = key.encode()
+        try:
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-")
+            with os.fdopen(fd, "wb") as f:
+                f.write(HEADER.pack(expires_at, len(key_bytes)))
+                f.write(key_bytes)
+                f.write(payload)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write cache entry under {directory}: {e}")
+        self._maybe_prune()
+
+    def remove_path(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def delete(self, parts: Sequence[str], key: Optional[str] = None) -> None:
+        """Drops one entry, or every entry under `parts` when no key is given."""
+        try:
+            if key is None:
+                shutil.rmtree(self._dir(parts))
+            else:
+                os.remove(self._path(parts, key))
+        except FileNotFoundError:
+            pass
+
+    @contextmanager
+    def lock(self, parts: Sequence[str], key: str, blocking: bool = True):
+        """
+        Exclusive cross-process lock on one entry, held while it is being refilled.
+        Yields whether the lock was acquired, which is always True when blocking.
+        """
+        with self.lock_path(self._path(parts, key), blocking) as acquired:
+            yield acquired
+
+    @contextmanager
+    def lock_path(self, path: str, blocking: bool = True):
+        """`lock` for an entry file, e.g. one found with `entry_paths`."""
+        lock_path = path + ".lock"
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        while True:
+            f = open(lock_path, "a")
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                f.close()
+                yield False
+                return
+            # `prune` may have deleted the lock file before it was locked; lock the new one then
+            try:
+                if os.stat(lock_path).st_ino == os.fstat(f.fileno()).st_ino:
+                    break
+            except FileNotFoundError:
+                pass
+            f.close()
+        try:
+            yield True
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
+            f.close()
+
+    def _maybe_prune(self) -> None:
+        if time.monotonic() < self._next_prune or not self._pruning.acquire(blocking=False):
+            return
+        self._next_prune = time.monotonic() + self.prune_interval
+
+        def run():
+            try:
+                self.prune()
+            except Exception as e:
+                logger.warning(f"Pruning the shared cache failed: {e}")
+            finally:
+                self._pruning.release()
+
+        threading.Thread(target=run, name="cache-prune", daemon=True).start()
+
+    def prune(self) -> Dict[str, int]:
+        """
+        Deletes expired entries, unused lock files and stale temp files, then the least recently
+        written entries beyond `max_bytes`. Skipped while another worker is pruning. Returns counts.
+        """
+        removed = {"expired": 0, "evicted": 0, "locks": 0, "tmp": 0}
+        with self.lock_path(os.path.join(self.directory, ".prune"), blocking=False) as acquired:
+            if not acquired:
+                return removed
+            now = time.time()
+            entries, total = [], 0
+            for root, dirs, names in os.walk(self.directory):
+                for name in names:
+                    path = os.path.join(root, name)
+                    if name.startswith(".tmp-"):
+                        if self._older_than(path, now - STALE_TMP_AGE) and self._remove(path):
+                            removed["tmp"] += 1
+                    elif name.endswith(".lock"):
+                        if root != self.directory and self._remove_unused_lock(path):
+                            removed["locks"] += 1
+                    elif not name.startswith("."):
+                        stat = self._expiry_and_stat(path)
+                        if stat is None:
+                            continue
+                        expires_at, mtime, size = stat
+                        if expires_at < now:
+                            if self._remove(path):
+                                removed["expired"] += 1
+                        else:
+                            entries.append((mtime, size, path))
+                            total += size
+            if self.max_bytes is not None and total > self.max_bytes:
+                entries.sort()
+                for _, size, path in entries:
+                    if total <= self.max_bytes * PRUNE_TO:
+                        break
+                    if self._remove(path):
+                        removed["evicted"] += 1
+                    total -= size
+        logger.info(f"Pruned the shared cache: {removed}")
+        return removed
+
+    @staticmethod
+    def _expiry_and_stat(path: str) -> Optional[Tuple[float, float, int]]:
+        try:
+            with open(path, "rb") as f:
+                header = f.read(HEADER.size)
+                stat = os.fstat(f.fileno())
+        except OSError:
+            return None
+        if len(header) < HEADER.size:
+            return 0.0, stat.st_mtime, stat.st_size
+        return HEADER.unpack(header)[0], stat.st_mtime, stat.st_size
+
+    @staticmethod
+    def _older_than(path: str, cutoff: float) -> bool:
+        try:
+            return os.stat(path).st_mtime < cutoff
+        except FileNotFoundError:
+            return False
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def _remove_unused_lock(self, path: str) -> bool:
+        """Deletes a lock file nobody holds; `lock_path` notices and relocks a fresh file."""
+        try:
+            f = open(path, "a")
+        except OSError:
+            return False
+        with f:
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                return False
+            try:
+                return self._remove(path)
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
@@ -0,0 +1,96 @@
+"""
+`__slots__` variants of the model classes.
+
+`Model.slotted()` builds, once per model, a class with the same name, annotations and methods
+but with one slot per annotated field instead of an instance `__dict__`. Attributes Strapi
+returns that the model does not declare (LinkedIn profiles carry dozens) go to an explicit
+`extra` dict, created only when there are any: `profile.extra["entityUrn"]`. There is no
+`__getattr__` fallback to it, as that would slow down every attribute read.
+
+With `STRAPI_SLOTTED_MODELS=true`, `add_routes` registers the slotted classes and `get_all` /
+`get_one` hydrate into them, relations included. `bench_models.py` compares both layouts.
+"""
+import dataclasses
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Generated by dataclasses or tied to the instance __dict__; rebuilt for the slotted class
+_SKIPPED = {
+    "__dict__",
+    "__weakref__",
+    "__init__",
+    "__repr__",
+    "__eq__",
+    "__hash__",
+    "__match_args__",
+    "__dataclass_fields__",
+    "__dataclass_params__",
+    "__slots__",
+}
+
+
+def slot_fields(model) -> List[Tuple[str, Any, Optional[Callable]]]:
+    """The (name, default, default_factory) of each annotated field except `model_path`."""
+    if dataclasses.is_dataclass(model):
+        return [
+            (
+                f.name,
+                None if f.default is dataclasses.MISSING else f.default,
+                None if f.default_factory is dataclasses.MISSING else f.default_factory,
+            )
+            for f in dataclasses.fields(model)
+            if f.name != "model_path"
+        ]
+    names = []
+    for klass in reversed(model.__mro__):
+        for name in getattr(klass, "__annotations__", {}):
+            if name != "model_path" and name not in names:
+                names.append(name)
+    return [(name, getattr(model, name, None), None) for name in names]
+
+
+def make_slotted(model):
+    """Builds the slotted variant of `model`; use `model.slotted()`, which caches it."""
+    fields = slot_fields(model)
+    names = tuple(name for name, _, _ in fields)
+    known = set(names)
+
+    def __init__(self, **kwargs):
+        attributes = type(self)._normalize_attributes(kwargs)
+        for name, default, factory in fields:
+            if name in attributes:
+                setattr(self, name, attributes[name])
+            else:
+                setattr(self, name, factory() if factory else default)
+        unknown = {k: v for k, v in attributes.items() if k not in known}
+        self.extra = unknown or None
+
+    def __repr__(self):
+        values = ", ".join(f"{name}={getattr(self, name)!r}" for name in names)
+        return f"{type(self).__name__}({values})"
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in names)
+
+    namespace: Dict[str, Any] = {
+        name: value
+        for name, value in vars(model).items()
+        if name not in _SKIPPED and name not in names and name != "model_path"
+    }
+    namespace.update(
+        __slots__=names + ("extra",),
+        __init__=__init__,
+        __repr__=__repr__,
+        __eq__=__eq__,
+        __hash__=None,
+        # Same module, so get_type_hints resolves relation annotations as for the model
+        __module__=model.__module__,
+        __qualname__=model.__qualname__,
+        __annotations__=dict(getattr(model, "__annotations__", {})),
+        model_path=getattr(model, "model_path"),
+        is_slotted=True,
+    )
+    # Keep the model's mixin bases; StrapiModelMixin itself declares empty __slots__
+    bases = tuple(base for base in model.__bases__ if base is not object)
+    return type(model.__name__, bases, namespace)
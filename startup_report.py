@@ -0,0 +1,82 @@
+"""
+Cold-start breakdown for the app, in the spirit of `python -X importtime`.
+
+    flask --app app startup-report --top 20
+"""
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+import click
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)")
+
+# Imports the app module, builds the WSGI app and the Strapi client, timing each step
+PROBE = """
+import time
+t0 = time.perf_counter()
+import app
+t1 = time.perf_counter()
+app.app
+t2 = time.perf_counter()
+from strapi_model_mixin import StrapiModelMixin
+StrapiModelMixin.client
+t3 = time.perf_counter()
+print(f"import app: {(t1 - t0) * 1000:.1f} ms")
+print(f"create_app(): {(t2 - t1) * 1000:.1f} ms")
+print(f"first Strapi client: {(t3 - t2) * 1000:.1f} ms")
+"""
+
+
+def parse_importtime(stderr: str) -> List[Tuple[str, int, int, int]]:
+    """
+    Parses `-X importtime` output into (module, self_us, cumulative_us, depth) rows.
+    """
+    rows = []
+    for line in stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            rows.append((module, int(self_us), int(cumulative_us), len(indent) // 2))
+    return rows
+
+
+def group_by_package(rows: List[Tuple[str, int, int, int]]) -> Dict[str, int]:
+    """
+    Sums the self time of every module per top-level package.
+    """
+    totals: Dict[str, int] = {}
+    for module, self_us, _, _ in rows:
+        package = module.split(".")[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+@click.command("startup-report")
+@click.option("--top", default=15, show_default=True, help="Rows to show per table.")
+def startup_report(top: int) -> None:
+    """Show where cold-start time goes: imports, app factory and client construction."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", PROBE],
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        # -X importtime output comes first on stderr; the traceback's last line says what failed
+        lines = [line for line in result.stderr.splitlines() if not IMPORTTIME_LINE.match(line)]
+        raise click.ClickException(lines[-1] if lines else f"probe exited with status {result.returncode}")
+    rows = parse_importtime(result.stderr)
+
+    click.echo(result.stdout.strip())
+    click.echo(f"\nmodules imported: {len(rows)}")
+
+    click.echo(f"\nTop {top} top-level imports by cumulative time:")
+    top_level = sorted((r for r in rows if r[3] == 0), key=lambda r: r[2], reverse=True)
+    for module, _, cumulative_us, _ in top_level[:top]:
+        click.echo(f"  {cumulative_us / 1000:8.1f} ms  {module}")
+
+    click.echo(f"\nTop {top} packages by self time:")
+    packages = sorted(group_by_package(rows).items(), key=lambda r: r[1], reverse=True)
+    for package, self_us in packages[:top]:
+        click.echo(f"  {self_us / 1000:8.1f} ms  {package}")
@@ -0,0 +1,143 @@
+"""
+Keyset (cursor) pagination over Strapi collections.
+
+Instead of `pagination[page]=N`, which makes the database skip N * pageSize rows, each page
+asks for rows strictly after the last one seen in `(sort field, id)` order:
+
+    filters[$or][0][createdAt][$gt]=<last createdAt>
+    filters[$or][1][createdAt][$eq]=<last createdAt>&filters[$or][1][id][$gt]=<last id>
+
+so the last page of a large collection costs the same as the first, given an index on the
+sort field. The position is handed to clients as an opaque `next_cursor`.
+
+Pages are capped at Strapi's `api.rest.maxLimit` (`STRAPI_MAX_LIMIT`, default 100), which
+Strapi would otherwise apply silently. Every full page gets a `next_cursor`, so when the
+collection ends on a page boundary the last page is empty.
+"""
+import base64
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+# Strapi's default `api.rest.maxLimit`
+DEFAULT_MAX_LIMIT = 100
+
+
+class CursorError(ValueError):
+    """Raised for cursors that cannot be decoded or do not match the requested sort, and bad page sizes."""
+
+
+def cursor_error_response(error: CursorError):
+    """Flask error handler turning `CursorError` into a 400."""
+    body = {"data": None, "error": {"status": 400, "name": "CursorError", "message": str(error)}}
+    return json.dumps(body), 400, {"Content-Type": "application/json"}
+
+
+class CursorPage(list):
+    """A page of `get_all` results that also carries the cursor of the following page."""
+
+    def __init__(self, items=(), next_cursor: Optional[str] = None):
+        super().__init__(items)
+        self.next_cursor = next_cursor
+
+
+def parse_page_size(value: Optional[str], default: int = 100) -> int:
+    """The `page_size` query argument as a positive integer, `default` when absent."""
+    if not value:
+        return default
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise CursorError(f"page_size must be an integer, got {value!r}") from None
+    if page_size < 1:
+        raise CursorError(f"page_size must be at least 1, got {page_size}")
+    return page_size
+
+
+def parse_sort(sort: Optional[List[str]]) -> Tuple[str, str]:
+    """
+    The keyset is the first sort key plus `id` as a tie-breaker, e.g. ["createdAt:desc"].
+    """
+    if not sort:
+        return "id", "asc"
+    field, _, direction = sort[0].partition(":")
+    direction = (direction or "asc").lower()
+    if direction not in ("asc", "desc"):
+        raise CursorError(f"Invalid sort direction {direction!r}")
+    return field, direction
+
+
+def encode_cursor(field: str, direction: str, value: Any, _id: Any) -> str:
+    payload = json.dumps({"f": field, "d": direction, "v": value, "id": _id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, field: str, direction: str) -> Tuple[Any, Any]:
+    """Returns the (sort value, id) of the last row of the previous page."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        position = payload["f"], payload["d"], payload["v"], payload["id"]
+    except (ValueError, KeyError, TypeError):
+        raise CursorError("Invalid cursor") from None
+    if position[:2] != (field, direction):
+        raise CursorError(f"Cursor was issued for sort {position[0]}:{position[1]}")
+    return position[2], position[3]
+
+
+def keyset_filters(field: str, direction: str, value: Any, _id: Any) -> Dict:
+    """Filters selecting the rows strictly after `(value, _id)` in the keyset order."""
+    op = "$gt" if direction == "asc" else "$lt"
+    if field == "id":
+        return {"id": {op: _id}}
+    return {
+        "$or": [
+            {field: {op: value}},
+            {field: {"$eq": value}, "id": {op: _id}},
+        ]
+    }
+
+
+def keyset_params(
+    cursor: str,
+    sort: Optional[List[str]],
+    filters: Optional[Dict],
+    fields: Optional[List[str]],
+    page_size: int,
+    max_limit: int = DEFAULT_MAX_LIMIT,
+) -> Tuple[Dict, str, str]:
+    """
+    The `fetch_all` arguments for the page after `cursor` ("" for the first page), plus the
+    keyset field and direction needed to build the next cursor. The page size asked for is
+    `params["pagination"]["limit"]`, at most `max_limit`.
+    """
+    field, direction = parse_sort(sort)
+    if cursor:
+        after = keyset_filters(field, direction, *decode_cursor(cursor, field, direction))
+        filters = {"$and": [filters, after]} if filters else after
+    if fields and field not in fields and field != "id":
+        fields = list(fields) + [field]
+    params = dict(
+        sort=[f"{field}:{direction}"] + ([] if field == "id" else [f"id:{direction}"]),
+        filters=filters,
+        fields=fields,
+        # Never above Strapi's maxLimit: a silently capped page would look like the last one
+        pagination={"start": 0, "limit": min(page_size, max_limit), "withCount": False},
+        get_all=False,
+    )
+    return params, field, direction
+
+
+def finish_page(response: Dict, field: str, direction: str, page_size: int) -> Dict:
+    """
+    Replaces the offset pagination meta with `next_cursor`, set whenever the page is full
+    (`page_size` rows, the limit that was asked for).
+    """
+    rows = (response.get("data") or [])[:page_size]
+    next_cursor = None
+    if rows and len(rows) == page_size:
+        last = rows[-1]
+        value = last["id"] if field == "id" else (last.get("attributes") or {}).get(field)
+        next_cursor = encode_cursor(field, direction, value, last["id"])
+    meta = {k: v for k, v in (response.get("meta") or {}).items() if k != "pagination"}
+    meta["next_cursor"] = next_cursor
+    return {**response, "data": rows, "meta": meta}
@@ -0,0 +1,180 @@
+"""
+Streaming export of a whole collection as NDJSON or CSV.
+
+    GET /<model_path>/export?format=ndjson|csv&fields=firstName,lastName&filters[...]=...&sort=...
+
+Rows are read page by page with keyset pagination (see strapi_cursor.py) and written out as
+soon as each page arrives, so memory stays bounded by one page however large the collection.
+Each Strapi entry becomes one flat row: `id`, then its attributes, with nested objects such
+as components or media flattened to dotted keys (`avatar.url`). With `Accept-Encoding: gzip`
+the stream is compressed on the fly. Pages bypass the shared cache, so an export does not
+evict the entries the site is serving.
+
+The status line is sent before the first page is read, so a failure halfway cannot become an
+error status. An NDJSON export then ends with an `{"error": {...}}` line. A CSV export has no
+room for one, so the connection is aborted and the client sees an incomplete response.
+"""
+import csv
+import io
+import json
+import logging
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from hedged_reads import deadline_scope
+from model_frame import frame_fields
+from strapi_cursor import finish_page, keyset_params, parse_sort
+from strapi_filters import as_compiled
+
+logger = logging.getLogger(__name__)
+
+FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+MAX_PAGE_SIZE = 1000
+
+
+def flatten_entry(entry: Dict) -> Dict[str, Any]:
+    """A Strapi entry as one flat row: `id` plus its attributes, nested objects as dotted keys."""
+    row = {"id": entry.get("id")}
+    _flatten(entry.get("attributes") or {}, "", row)
+    return row
+
+
+def _flatten(value: Dict, prefix: str, row: Dict[str, Any]) -> None:
+    for name, item in value.items():
+        key = f"{prefix}{name}"
+        if isinstance(item, dict):
+            # Relation and media envelopes: {"data": {"id": .., "attributes": {..}}}
+            if set(item) <= {"data", "meta"} and "data" in item:
+                item = item["data"]
+                if isinstance(item, dict):
+                    item = {"id": item.get("id"), **(item.get("attributes") or {})}
+                elif isinstance(item, list):
+                    row[key] = [i.get("id") for i in item]
+                    continue
+                elif item is None:
+                    row[key] = None
+                    continue
+            _flatten(item, f"{key}.", row)
+        else:
+            row[key] = item
+
+
+def iter_entries(
+    model,
+    sort: Optional[List[str]] = None,
+    filters=None,
+    fields: Optional[List[str]] = None,
+    publication_state: Optional[str] = None,
+    page_size: int = 100,
+    populate=None,
+) -> Iterator[List[Dict]]:
+    """
+    Yields the collection one page of raw entries at a time, in keyset order. Pages are read
+    without the request deadline: a long walk is expected, and cutting it short would
+    silently truncate exports and search indexes.
+    """
+    from strapi_model_mixin import get_upstream_guard, load_settings
+
+    filters = as_compiled(filters).to_dict()
+    max_limit = load_settings()["max_limit"]
+    cursor = ""
+    while cursor is not None:
+        params, field, direction = keyset_params(cursor, sort, filters, fields, page_size, max_limit)
+        params.pop("get_all")
+        params["filters"] = as_compiled(params["filters"]).to_strapi()
+        with deadline_scope(None):
+            response = get_upstream_guard().call(
+                model.model_path,
+                lambda: model.client.get_entries(
+                    plural_api_id=str(model.model_path),
+                    publication_state=publication_state,
+                    populate=populate,
+                    **params,
+                ),
+            )
+        page = finish_page(response, field, direction, params["pagination"]["limit"])
+        cursor = page["meta"]["next_cursor"]
+        yield page["data"]
+
+
+def ndjson_chunks(pages: Iterable[List[Dict]]) -> Iterator[bytes]:
+    for entries in pages:
+        yield "".join(json.dumps(flatten_entry(e), default=str) + "\n" for e in entries).encode()
+
+
+def csv_chunks(pages: Iterable[List[Dict]], columns: List[str]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    for entries in pages:
+        for entry in entries:
+            row = flatten_entry(entry)
+            writer.writerow({k: json.dumps(v) if isinstance(v, list) else v for k, v in row.items()})
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def gzip_chunks(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    """Gzips a stream, flushing after every chunk so each page reaches the client as it is read."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def _logged(chunks: Iterator[bytes], model, export_format: str) -> Iterator[bytes]:
+    # Headers are already sent once streaming starts; the body has to say it is incomplete
+    try:
+        yield from chunks
+    except Exception as e:
+        logger.error(f"Export of {model.model_path} stopped early: {e}")
+        if export_format != "ndjson":
+            raise
+        error = {"error": {"name": type(e).__name__, "message": str(e)}}
+        yield (json.dumps(error) + "\n").encode()
+
+
+def export_response(model, query, accept_encoding: Optional[str] = None):
+    """The streamed export for the query args `query` as a werkzeug `Response`, for both apps."""
+    from werkzeug.exceptions import BadRequest
+    from werkzeug.wrappers import Response
+
+    export_format = query.get("format", "ndjson")
+    if export_format not in FORMATS:
+        raise BadRequest(f"Unsupported export format {export_format!r}; use one of {', '.join(FORMATS)}")
+    fields = [f for value in query.getlist("fields") for f in value.split(",") if f] or None
+    args = model._extract_request_args(query, b"")
+    page_size = min(max(args["page_size"], 1), MAX_PAGE_SIZE)
+    # Compiled before streaming so that bad filters or sorts still get a 400
+    parse_sort(args["sort"])
+    pages = iter_entries(model, args["sort"], args["filters"], fields, args["publication_state"], page_size)
+
+    if export_format == "csv":
+        relations = model._extract_relationships()
+        columns = ["id"] + (fields or [f for f in frame_fields(model)[1:] if f not in relations])
+        chunks = csv_chunks(pages, columns)
+    else:
+        chunks = ndjson_chunks(pages)
+    chunks = _logged(chunks, model, export_format)
+    headers = {"Content-Disposition": f'attachment; filename="{model.model_path}.{export_format}"'}
+    if "gzip" in (accept_encoding or ""):
+        chunks = gzip_chunks(chunks)
+        headers.update({"Content-Encoding": "gzip", "Vary": "Accept-Encoding"})
+    return Response(chunks, mimetype=FORMATS[export_format], headers=headers)
+
+
+def export_route(model):
+    """Flask view for `GET /<model_path>/export`."""
+    from flask import request, stream_with_context
+
+    response = export_response(model, request.args, request.headers.get("Accept-Encoding"))
+    response.response = stream_with_context(response.response)
+    return response
+
+
+async def aexport_route(model, req):
+    """ASGI view for `GET /<model_path>/export`; `asgi.AsyncApp` reads the pages in a worker thread."""
+    return export_response(model, req.args, req.headers.get("Accept-Encoding"))
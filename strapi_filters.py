@@ -0,0 +1,401 @@
+"""
+Parser for Strapi filter expressions.
+
+Filters arrive as JSON (`{"content": {"$eq": "Hello"}}`), as Strapi's bracket query params
+(`filters[content][$eq]=Hello`), or in the short `content='Hello'` form. All of them compile
+into the same validated tree, which renders back to the `filters` dict pystrapi sends to
+Strapi and can also be evaluated locally against hydrated model objects.
+
+    >>> f = compile_filters('{"author": {"name": {"$containsi": "ada"}}}')
+    >>> f.to_strapi()
+    {'author': {'name': {'$containsi': 'ada'}}}
+    >>> [blog for blog in blogs if f.matches(blog)]
+"""
+from __future__ import annotations
+
+import json
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+FIELD_NAME = re.compile(r"^[A-Za-z_][\w-]*$")
+BRACKET_KEY = re.compile(r"\[([^\]]*)\]")
+
+COMPARISON_OPERATORS = {
+    "$eq", "$eqi", "$ne", "$nei", "$lt", "$lte", "$gt", "$gte",
+    "$in", "$notIn", "$contains", "$notContains", "$containsi", "$notContainsi",
+    "$null", "$notNull", "$between", "$startsWith", "$startsWithi", "$endsWith", "$endsWithi",
+}
+
+
+class FilterError(ValueError):
+    """Raised for filter expressions that cannot be parsed or use unknown operators."""
+
+
+def filter_error_response(error: FilterError):
+    """Flask error handler turning `FilterError` into a 400."""
+    body = {"data": None, "error": {"status": 400, "name": "FilterError", "message": str(error)}}
+    return json.dumps(body), 400, {"Content-Type": "application/json"}
+
+
+@dataclass(frozen=True)
+class Condition:
+    path: Tuple[str, ...]
+    op: str
+    value: Any
+
+
+@dataclass(frozen=True)
+class BoolOp:
+    op: str  # "$and" or "$or"
+    children: Tuple[Any, ...]
+
+
+@dataclass(frozen=True)
+class Not:
+    child: Any
+
+
+Node = Union[Condition, BoolOp, Not]
+
+
+class CompiledFilter:
+    """A validated filter tree; immutable, so one instance is shared by every request using it."""
+
+    def __init__(self, tree: Optional[Node]):
+        self.tree = tree
+        self._strapi = _render(tree) if tree is not None else None
+
+    def __bool__(self) -> bool:
+        return self.tree is not None
+
+    def __repr__(self) -> str:
+        return f"CompiledFilter({self.tree!r})"
+
+    def to_strapi(self) -> Optional[Dict]:
+        """The filters dict for `StrapiClientSync.get_entries`, with lists as index maps for qs."""
+        return _to_query_shape(self._strapi) if self._strapi is not None else None
+
+    def to_dict(self) -> Optional[Dict]:
+        """The filters in Strapi's JSON notation, e.g. for combining with other filters."""
+        return json.loads(json.dumps(self._strapi)) if self._strapi is not None else None
+
+    def matches(self, obj: Any) -> bool:
+        return self.tree is None or _evaluate(self.tree, obj)
+
+    def filter(self, objs: Iterable[Any]) -> List[Any]:
+        return [obj for obj in objs if self.matches(obj)]
+
+    def mask(self, columns: Dict[str, Sequence[Any]], length: int) -> List[bool]:
+        """
+        Evaluates the filter over column-oriented data (see model_frame.py), one column at a
+        time. Paths into relations are resolved on the column's values.
+        """
+        if self.tree is None:
+            return [True] * length
+        return _evaluate_columns(self.tree, columns, length)
+
+
+# ---- parsing -------------------------------------------------------------------------
+
+
+@lru_cache(maxsize=512)
+def compile_filters(filter_str: Optional[str]) -> CompiledFilter:
+    """
+    Compiles a `filters` query string (JSON or `field=value` shorthand), cached by the raw string.
+    """
+    if not filter_str or not filter_str.strip():
+        return CompiledFilter(None)
+    filter_str = filter_str.strip()
+    if filter_str.startswith("{"):
+        try:
+            spec = json.loads(filter_str)
+        except json.JSONDecodeError as e:
+            raise FilterError(f"Invalid filters JSON: {e}") from None
+    else:
+        spec = _parse_shorthand(filter_str)
+    return compile_spec(spec)
+
+
+@lru_cache(maxsize=512)
+def _compile_bracket_items(items: Tuple[Tuple[str, str], ...]) -> CompiledFilter:
+    spec: Dict = {}
+    for key, value in items:
+        parts = BRACKET_KEY.findall(key[len("filters"):])
+        if not parts or BRACKET_KEY.sub("", key[len("filters"):]):
+            raise FilterError(f"Invalid filter parameter {key!r}")
+        node = spec
+        for part in parts[:-1]:
+            node = node.setdefault(part, {})
+            if not isinstance(node, dict):
+                raise FilterError(f"Conflicting filter parameter {key!r}")
+        if parts[-1] in node:
+            # Repeated params (filters[id][$in]=1&filters[id][$in]=2) collect into a list
+            previous = node[parts[-1]]
+            node[parts[-1]] = (previous if isinstance(previous, list) else [previous]) + [value]
+        else:
+            node[parts[-1]] = value
+    return compile_spec(_index_maps_to_lists(spec))
+
+
+def compile_request_filters(args) -> CompiledFilter:
+    """
+    Compiles the filters of a request's query args: either a single `filters=<json>` argument
+    or Strapi-style `filters[field][$op]=value` arguments.
+    """
+    if args.get("filters"):
+        return compile_filters(args.get("filters"))
+    items = tuple(
+        sorted(
+            (key, value)
+            for key in args.keys()
+            if key.startswith("filters[")
+            for value in args.getlist(key)
+        )
+    )
+    return _compile_bracket_items(items) if items else CompiledFilter(None)
+
+
+def compile_spec(spec: Any) -> CompiledFilter:
+    """Compiles a filters dict in Strapi's JSON notation."""
+    if spec is None or spec == {}:
+        return CompiledFilter(None)
+    if isinstance(spec, CompiledFilter):
+        return spec
+    if not isinstance(spec, dict):
+        raise FilterError("Filters must be an object")
+    return CompiledFilter(_parse_object(spec, ()))
+
+
+def as_compiled(filters: Union[None, str, Dict, CompiledFilter]) -> CompiledFilter:
+    """Compiles a query string or Strapi filters dict; compiled filters pass through."""
+    if isinstance(filters, CompiledFilter):
+        return filters
+    if not filters:
+        return CompiledFilter(None)
+    if isinstance(filters, dict):
+        filters = json.dumps(filters, sort_keys=True)
+    return compile_filters(filters)
+
+
+def to_strapi_filters(filters: Union[None, str, Dict, CompiledFilter]) -> Optional[Dict]:
+    """
+    Normalizes the `filters` argument of `fetch_all`: a query string, a Strapi filters dict
+    or a compiled filter all become the validated dict pystrapi expects.
+    """
+    return as_compiled(filters).to_strapi()
+
+
+def _parse_shorthand(filter_str: str) -> Dict:
+    # Legacy form accepted by convert_filters_to_dict: content='Hello World!' or content=Hello
+    field, sep, value = filter_str.partition("=")
+    field = field.strip().strip("'\"")
+    if not sep or not field:
+        raise FilterError(f"Invalid filters string {filter_str!r}")
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        value = value[1:-1]
+    return {field: {"$eq": value}}
+
+
+def _parse_object(spec: Dict, path: Tuple[str, ...]) -> Node:
+    if not spec:
+        raise FilterError(f"Empty filter for {'.'.join(path) or 'filters'}")
+    nodes = [_parse_entry(key, value, path) for key, value in spec.items()]
+    return nodes[0] if len(nodes) == 1 else BoolOp("$and", tuple(nodes))
+
+
+def _parse_entry(key: str, value: Any, path: Tuple[str, ...]) -> Node:
+    if key in ("$and", "$or"):
+        if isinstance(value, dict):
+            value = _index_maps_to_lists(value)
+        if not isinstance(value, list) or not value or not all(isinstance(v, dict) for v in value):
+            raise FilterError(f"{key} expects a non-empty list of filters")
+        return BoolOp(key, tuple(_parse_object(v, path) for v in value))
+    if key == "$not":
+        if not isinstance(value, dict):
+            raise FilterError("$not expects a filter object")
+        return Not(_parse_object(value, path))
+    if key.startswith("$"):
+        if not path:
+            raise FilterError(f"Operator {key} must be applied to a field")
+        return _parse_condition(path, key, value)
+    if not FIELD_NAME.match(key):
+        raise FilterError(f"Invalid field name {key!r}")
+    if isinstance(value, dict):
+        return _parse_object(value, path + (key,))
+    # A bare value is an equality test, as in Strapi's filters[field]=value
+    return _parse_condition(path + (key,), "$eq", value)
+
+
+def _parse_condition(path: Tuple[str, ...], op: str, value: Any) -> Condition:
+    if op not in COMPARISON_OPERATORS:
+        raise FilterError(f"Unknown filter operator {op}")
+    if isinstance(value, dict):
+        value = _index_maps_to_lists(value)
+    if op in ("$in", "$notIn"):
+        if not isinstance(value, list):
+            value = [value]
+        value = tuple(value)
+    elif op == "$between":
+        if not isinstance(value, list) or len(value) != 2:
+            raise FilterError("$between expects a list of two values")
+        value = tuple(value)
+    elif op in ("$null", "$notNull"):
+        value = _as_bool(value)
+    elif isinstance(value, (list, dict)):
+        raise FilterError(f"{op} expects a single value")
+    return Condition(path, op, value)
+
+
+def _as_bool(value: Any) -> bool:
+    if isinstance(value, str):
+        return value.lower() not in ("false", "0", "")
+    return bool(value)
+
+
+def _index_maps_to_lists(value: Any) -> Any:
+    """Turns qs-style {"0": a, "1": b} maps (from bracket params) back into lists."""
+    if isinstance(value, dict):
+        value = {k: _index_maps_to_lists(v) for k, v in value.items()}
+        if value and all(k.isdigit() for k in value):
+            return [value[k] for k in sorted(value, key=int)]
+    return value
+
+
+# ---- rendering -----------------------------------------------------------------------
+
+
+def _render(node: Node) -> Dict:
+    if isinstance(node, BoolOp):
+        return {node.op: [_render(child) for child in node.children]}
+    if isinstance(node, Not):
+        return {"$not": _render(node.child)}
+    value = list(node.value) if isinstance(node.value, tuple) else node.value
+    rendered: Dict = {node.op: value}
+    for part in reversed(node.path):
+        rendered = {part: rendered}
+    return rendered
+
+
+def _to_query_shape(value: Any) -> Any:
+    # pystrapi flattens nested dicts into filters[a][b]=v but passes lists through untouched,
+    # so lists become index maps: filters[id][$in][0]=1&filters[id][$in][1]=2
+    if isinstance(value, dict):
+        return {k: _to_query_shape(v) for k, v in value.items()}
+    if isinstance(value, list):
+        return {str(i): _to_query_shape(v) for i, v in enumerate(value)}
+    if isinstance(value, bool):
+        return str(value).lower()
+    return value
+
+
+# ---- local evaluation ----------------------------------------------------------------
+
+
+def _evaluate(node: Node, obj: Any) -> bool:
+    if isinstance(node, BoolOp):
+        results = (_evaluate(child, obj) for child in node.children)
+        return all(results) if node.op == "$and" else any(results)
+    if isinstance(node, Not):
+        return not _evaluate(node.child, obj)
+    return any(_compare(node.op, actual, node.value) for actual in _resolve(obj, node.path))
+
+
+def _evaluate_columns(node: Node, columns: Dict[str, Sequence[Any]], length: int) -> List[bool]:
+    if isinstance(node, BoolOp):
+        masks = [_evaluate_columns(child, columns, length) for child in node.children]
+        combine = all if node.op == "$and" else any
+        return [combine(row) for row in zip(*masks)]
+    if isinstance(node, Not):
+        return [not m for m in _evaluate_columns(node.child, columns, length)]
+    column = columns.get(node.path[0])
+    if column is None:
+        column = [None] * length
+    if len(node.path) == 1:
+        return [_compare(node.op, actual, node.value) for actual in column]
+    return [
+        any(_compare(node.op, actual, node.value) for actual in _resolve(value, node.path[1:]))
+        for value in column
+    ]
+
+
+def _resolve(obj: Any, path: Tuple[str, ...]) -> List[Any]:
+    """All values at `path`, fanning out over to-many relations."""
+    values = [obj]
+    for part in path:
+        values = [
+            item.get(part) if isinstance(item, dict) else getattr(item, part, None)
+            for value in values
+            for item in _unwrap(value)
+        ]
+    return values or [None]
+
+
+def _unwrap(value: Any) -> List[Any]:
+    """Hydrated objects as-is; raw Strapi entries and relation envelopes as flat dicts."""
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [item for v in value for item in _unwrap(v)]
+    if isinstance(value, dict):
+        if "attributes" in value:
+            return [{"id": value.get("id"), **(value["attributes"] or {})}]
+        if set(value) <= {"data", "meta"} and "data" in value:
+            return _unwrap(value["data"])
+    return [value]
+
+
+def _coerce(actual: Any, expected: Any) -> Any:
+    """Query-string values are strings; compare them in the type of the stored value."""
+    if isinstance(expected, str) and actual is not None and not isinstance(actual, str):
+        try:
+            if isinstance(actual, bool):
+                return _as_bool(expected)
+            return type(actual)(expected)
+        except (TypeError, ValueError):
+            return expected
+    return expected
+
+
+def _compare(op: str, actual: Any, expected: Any) -> bool:
+    if op == "$null":
+        return (actual is None) == expected
+    if op == "$notNull":
+        return (actual is not None) == expected
+    if op in ("$in", "$notIn"):
+        found = any(actual == _coerce(actual, e) for e in expected)
+        return found if op == "$in" else not found
+    if actual is None:
+        return op in ("$ne", "$nei", "$notContains", "$notContainsi")
+    if op == "$between":
+        low, high = (_coerce(actual, e) for e in expected)
+        return low <= actual <= high
+    expected = _coerce(actual, expected)
+    if op == "$eq":
+        return actual == expected
+    if op == "$ne":
+        return actual != expected
+    if op in ("$lt", "$lte", "$gt", "$gte"):
+        try:
+            return {
+                "$lt": actual < expected,
+                "$lte": actual <= expected,
+                "$gt": actual > expected,
+                "$gte": actual >= expected,
+            }[op]
+        except TypeError:
+            return False
+    actual, expected = str(actual), str(expected)
+    if op.endswith("i"):
+        actual, expected = actual.lower(), expected.lower()
+        op = op[:-1]
+    return {
+        "$eq": actual == expected,
+        "$ne": actual != expected,
+        "$contains": expected in actual,
+        "$notContains": expected not in actual,
+        "$startsWith": actual.startswith(expected),
+        "$endsWith": actual.endswith(expected),
+    }[op]
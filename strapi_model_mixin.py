@@ -2,38 +2,111 @@ from __future__ import annotations
 
 import json
 import logging
+import tempfile
+import threading
+import time
 from abc import abstractmethod
-from functools import partial
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
 
-from dotenv import load_dotenv
 from flask import Flask, request
-from typing import Dict, Type, Optional, TypeVar, List, Union, get_type_hints
+from typing import Callable, Dict, Type, Optional, TypeVar, List, Tuple, Union, TYPE_CHECKING, get_type_hints
 import os
 
-from pystrapi import StrapiClientSync, PublicationState
-from pystrapi.types import (
-    StrapiEntriesResponse,
-    StrapiEntryResponse,
-    PopulationParameter,
-    PaginationParameter,
+from cache_invalidation import CREATE, DELETE, UPDATE, apply_change
+from cascade_save import cascade_upsert
+from hedged_reads import DeadlineExceeded, HedgedConnector, remaining
+from log_config import Truncated
+from model_frame import ModelFrame
+from negative_cache import NegativeCache, is_not_found, not_found_response
+from response_format import dumps, json_response, loads, render
+from shared_cache import SharedCache
+from slotted_models import make_slotted
+from strapi_export import aexport_route, export_route
+from strapi_cursor import CursorPage, finish_page, keyset_params, parse_page_size
+from strapi_filters import (
+    CompiledFilter,
+    FilterError,
+    as_compiled,
+    compile_filters,
+    compile_request_filters,
+    to_strapi_filters,
 )
+from upstream_guard import UpstreamGuard
 
-class_registry = {}
+# pystrapi pulls in requests and aiohttp; it is imported when the first client is built
+if TYPE_CHECKING:
+    from pystrapi import StrapiClientSync, StrapiClient as StrapiClientAsync, PublicationState
+    from pystrapi.types import (
+        StrapiEntriesResponse,
+        StrapiEntryResponse,
+        PopulationParameter,
+        PaginationParameter,
+    )
 
-# Load environment variables
-load_dotenv(".env")
+class_registry = {}
+# Slotted variants of the models, by class name
+_slotted_classes = {}
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-# Retrieve API URL and token from environment variables
-# api_url = os.getenv("STRAPI_API_URL", "http://127.0.0.1:5000")
-api_url = os.getenv("STRAPI_API_URL", "https://strapi-27bu.onrender.com/api/")
-api_token = os.getenv(
-    "STRAPI_API_TOKEN",
-    "727064f5093e4f6d1a381ccf8ebedce57e39bce40fd58d551858c9743e5f1723a7c52e289b776742cbd9b11c7bba50c085b22a7a743e6744d73ce76662eea7cf9d06cb07378260a55ffe7e7fc7d095cee763935f8fe38a617dcf1c9b87ee59c7772c84d35a333e7d3c4ef70bd246720f9b59310aea602dfdf86bc817fbc7ff45",
-)
+
+@lru_cache(maxsize=None)
+def load_settings() -> Dict:
+    """
+    Loads `.env` and reads the Strapi settings. Deferred until the first client is built.
+    """
+    from dotenv import load_dotenv
+
+    load_dotenv(".env")
+    return {
+        # "api_url": os.getenv("STRAPI_API_URL", "http://127.0.0.1:5000"),
+        "api_url": os.getenv("STRAPI_API_URL", "https://strapi-27bu.onrender.com/api/"),
+        "api_token": os.getenv(
+            "STRAPI_API_TOKEN",
+            "727064f5093e4f6d1a381ccf8ebedce57e39bce40fd58d551858c9743e5f1723a7c52e289b776742cbd9b11c7bba50c085b22a7a743e6744d73ce76662eea7cf9d06cb07378260a55ffe7e7fc7d095cee763935f8fe38a617dcf1c9b87ee59c7772c84d35a333e7d3c4ef70bd246720f9b59310aea602dfdf86bc817fbc7ff45",
+        ),
+        # Max open connections to Strapi per process for the async (ASGI) client
+        "async_pool_size": int(os.getenv("STRAPI_ASYNC_POOL_SIZE", "100")),
+        # Strapi's `api.rest.maxLimit`: the most rows one request returns (see strapi_cursor.py)
+        "max_limit": int(os.getenv("STRAPI_MAX_LIMIT", "100")),
+        # Upstream guard: adaptive in-flight limit, circuit breaker and stale-on-error reads
+        "guard_initial_limit": int(os.getenv("STRAPI_GUARD_INITIAL_LIMIT", "16")),
+        "guard_max_limit": int(os.getenv("STRAPI_GUARD_MAX_LIMIT", "256")),
+        "guard_target_latency": float(os.getenv("STRAPI_GUARD_TARGET_LATENCY", "1.0")),
+        "breaker_failure_threshold": int(os.getenv("STRAPI_BREAKER_FAILURES", "5")),
+        "breaker_reset_timeout": float(os.getenv("STRAPI_BREAKER_RESET_TIMEOUT", "30")),
+        "serve_stale": os.getenv("STRAPI_SERVE_STALE", "false").lower() in ("1", "true", "yes"),
+        # Host-wide response cache shared by all workers; disabled unless a directory is set
+        "cache_dir": os.getenv("STRAPI_CACHE_DIR"),
+        "cache_ttl": float(os.getenv("STRAPI_CACHE_TTL", "60")),
+        "cache_max_bytes": int(os.getenv("STRAPI_CACHE_MAX_BYTES", str(256 * 1024 * 1024))),
+        "cache_prune_interval": float(os.getenv("STRAPI_CACHE_PRUNE_INTERVAL", "60")),
+        # Hits this close to expiry are served and refreshed in the background
+        "cache_refresh_ahead": float(os.getenv("STRAPI_CACHE_REFRESH_AHEAD", "10")),
+        # Shared secret Strapi webhooks must send to /webhooks/strapi (see strapi_webhooks.py)
+        "webhook_secret": os.getenv("STRAPI_WEBHOOK_SECRET"),
+        # Preload each model's `warm_queries` at boot and keep them fresh (see cache_warmer.py)
+        "warm_up": os.getenv("STRAPI_WARM_UP", "false").lower() in ("1", "true", "yes"),
+        "warm_queries": os.getenv("STRAPI_WARM_QUERIES"),
+        # Hydrate get_all/get_one results into __slots__ classes (see slotted_models.py)
+        "slotted_models": os.getenv("STRAPI_SLOTTED_MODELS", "false").lower() in ("1", "true", "yes"),
+        # Seconds before a worker's search index is rebuilt from Strapi (see search_index.py)
+        "search_rebuild_interval": float(os.getenv("STRAPI_SEARCH_REBUILD_INTERVAL", "300")),
+        # Per-process memory of 404s from fetch_one (see negative_cache.py); a TTL of 0 disables it
+        "negative_cache_ttl": float(os.getenv("STRAPI_NEGATIVE_CACHE_TTL", "10")),
+        "negative_cache_size": int(os.getenv("STRAPI_NEGATIVE_CACHE_SIZE", "10000")),
+        # Seconds a request may spend on Strapi calls, and hedged GETs (see hedged_reads.py)
+        "request_deadline": float(os.getenv("STRAPI_REQUEST_DEADLINE", "25")),
+        "hedge_reads": os.getenv("STRAPI_HEDGE_READS", "false").lower() in ("1", "true", "yes"),
+        "hedge_quantile": float(os.getenv("STRAPI_HEDGE_QUANTILE", "0.95")),
+        "hedge_min_delay": float(os.getenv("STRAPI_HEDGE_MIN_DELAY", "0.05")),
+        # Profile picture thumbnails served by /img/<profile_id> (see image_proxy.py)
+        "image_cache_dir": os.getenv("IMAGE_CACHE_DIR", os.path.join(tempfile.gettempdir(), "profile-images")),
+        "image_cache_max_bytes": int(os.getenv("IMAGE_CACHE_MAX_BYTES", str(100 * 1024 * 1024))),
+        "image_thumbnail_size": int(os.getenv("IMAGE_THUMBNAIL_SIZE", "128")),
+        "image_allowed_hosts": [h.strip().lower() for h in os.getenv("IMAGE_ALLOWED_HOSTS", "").split(",") if h.strip()],
+    }
 
 
 def convert_filters_to_dict(filter_str):
@@ -43,36 +116,218 @@ def convert_filters_to_dict(filter_str):
     if not filter_str:
         return None
     try:
-        # If there's an equal sign, wrap the string in curlies to form a valid JSON object
-        if "=" in filter_str:
-            filter_str = '{"' + filter_str + "}"
-
-        # Replace the equal sign with a colon for JSON compatibility
-        filter_str = filter_str.replace("=", '":')
-
-        # Replace single quotes with double quotes for JSON compatibility
-        json_compatible_str = filter_str.replace("'", '"')
-
-        # Parse the JSON-compatible string into a Python dictionary
-        return json.loads(json_compatible_str)
-
-    except json.JSONDecodeError:
-        # Handle parsing exceptions
+        return compile_filters(filter_str).to_dict()
+    except FilterError as e:
         logger.error(
-            f"An error occurred while converting filters string to dict: Invalid string {filter_str}"
+            f"An error occurred while converting filters string to dict: {e}"
         )
         return None
 
 
 class StrapiClient:
+    """Per-process StrapiClientSync, built on first use so gunicorn workers never share one across a fork."""
+
     _instance: StrapiClientSync = None
+    # Its `stats` count hedged reads and missed deadlines
+    connector: Optional[HedgedConnector] = None
 
     def __new__(cls):
         if cls._instance is None:
-            logger.info("Initializing StrapiClientSync instance.")
-            cls._instance = StrapiClientSync(api_url=api_url, token=api_token)
+            from pystrapi import StrapiClientSync
+
+            settings = load_settings()
+            logger.info(f"Initializing StrapiClientSync instance in process {os.getpid()}.")
+            cls.connector = HedgedConnector.from_settings(settings)
+            cls._instance = StrapiClientSync(
+                api_url=settings["api_url"], token=settings["api_token"], connector=cls.connector
+            )
         return cls._instance
 
+    @classmethod
+    def reset(cls):
+        cls._instance = None
+        cls.connector = None
+
+
+class PooledConnector:
+    """Async connector that reuses one aiohttp session (and its keep-alive pool) per event loop."""
+
+    def __init__(self, limit: int = 100):
+        self._limit = limit
+        self._session = None
+
+    def _get_session(self):
+        import aiohttp
+
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self._limit)
+            )
+        return self._session
+
+    async def request(self, method, url, *, reqargs=None, session=None):
+        from pystrapi.errors import StrapiError
+        from pystrapi.help import aiohttp_helpers
+
+        import asyncio
+
+        import aiohttp
+
+        session = session or self._get_session()
+        action = f"send {method} to {url}"
+        reqargs = dict(reqargs or {})
+        left = remaining()
+        if left is not None:
+            if left <= 0:
+                raise DeadlineExceeded(f"Request deadline passed before sending {method} to {url}")
+            reqargs["timeout"] = aiohttp.ClientTimeout(total=left)
+        try:
+            response = await session.request(method=method, url=url, **reqargs)
+        except asyncio.TimeoutError as e:
+            if left is None:
+                raise StrapiError(f"Unable to {action}, error: {e})") from e
+            raise DeadlineExceeded(f"Request deadline passed waiting to {action}", sent=True) from e
+        except Exception as e:
+            raise StrapiError(f"Unable to {action}, error: {e})") from e
+        await aiohttp_helpers.raise_for_response(response, action)
+        return response
+
+    async def close(self):
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+
+
+class AsyncStrapiClient:
+    """One async Strapi client per event loop, sharing a pooled aiohttp session."""
+
+    _instances: Dict[int, StrapiClientAsync] = {}
+
+    def __new__(cls):
+        import asyncio
+
+        loop_id = id(asyncio.get_running_loop())
+        if loop_id not in cls._instances:
+            from pystrapi import StrapiClient as StrapiClientAsync
+
+            settings = load_settings()
+            logger.info("Initializing async StrapiClient instance.")
+            cls._instances[loop_id] = StrapiClientAsync(
+                api_url=settings["api_url"],
+                token=settings["api_token"],
+                connector=PooledConnector(limit=settings["async_pool_size"]),
+            )
+        return cls._instances[loop_id]
+
+    @classmethod
+    async def close(cls):
+        import asyncio
+
+        client = cls._instances.pop(id(asyncio.get_running_loop()), None)
+        if client is not None:
+            await client._connector._connector.close()
+
+    @classmethod
+    def reset(cls):
+        cls._instances = {}
+
+
+_upstream_guard: Optional[UpstreamGuard] = None
+
+
+def get_upstream_guard() -> UpstreamGuard:
+    global _upstream_guard
+    if _upstream_guard is None:
+        _upstream_guard = UpstreamGuard.from_settings(load_settings())
+    return _upstream_guard
+
+
+_shared_cache: Optional[SharedCache] = None
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    global _shared_cache
+    settings = load_settings()
+    if _shared_cache is None and settings["cache_dir"]:
+        _shared_cache = SharedCache(
+            settings["cache_dir"],
+            default_ttl=settings["cache_ttl"],
+            max_bytes=settings["cache_max_bytes"],
+            prune_interval=settings["cache_prune_interval"],
+        )
+    return _shared_cache
+
+
+_negative_cache: Optional[NegativeCache] = None
+
+
+def get_negative_cache() -> NegativeCache:
+    global _negative_cache
+    if _negative_cache is None:
+        settings = load_settings()
+        _negative_cache = NegativeCache(settings["negative_cache_ttl"], settings["negative_cache_size"])
+    return _negative_cache
+
+
+_refresh_executor: Optional[ThreadPoolExecutor] = None
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+_background_tasks = set()
+
+
+def _schedule_refresh(parts: tuple, key: str, refresh) -> None:
+    """Runs `refresh()` in the background unless this key is already being refreshed."""
+    global _refresh_executor
+    with _refreshing_lock:
+        if (parts, key) in _refreshing:
+            return
+        _refreshing.add((parts, key))
+        if _refresh_executor is None:
+            _refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+    def run():
+        try:
+            refresh()
+        except Exception as e:
+            logger.warning("Background refresh of %s failed: %s", "/".join(parts), e)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard((parts, key))
+
+    _refresh_executor.submit(run)
+
+
+# Callables notified as listener(model, event, _id, attributes) after every entry change
+change_listeners: List = []
+
+
+def on_change(listener):
+    """Registers a change listener; usable as a decorator."""
+    change_listeners.append(listener)
+    return listener
+
+
+def _reset_after_fork():
+    global _upstream_guard, _refresh_executor, _refreshing_lock
+    StrapiClient.reset()
+    AsyncStrapiClient.reset()
+    _upstream_guard = None
+    # Threads do not survive a fork; the child starts its own pool on first use
+    _refresh_executor = None
+    _refreshing.clear()
+    _refreshing_lock = threading.Lock()
+
+
+# A forked worker must open its own connections and guard state instead of reusing the parent's
+os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+class _LazyClient:
+    """Class attribute that resolves to the current process' StrapiClientSync on access."""
+
+    def __get__(self, obj, owner) -> StrapiClientSync:
+        return StrapiClient()
+
 
 class StrapiModelMixin:
     pass
@@ -82,7 +337,24 @@ T = TypeVar("T", bound=StrapiModelMixin)
 
 
 class StrapiModelMixin:
-    client: StrapiClientSync = StrapiClient()  # Reference to StrapiClientSync instance
+    # Resolves to the per-process StrapiClientSync (unannotated so get_type_hints never imports pystrapi)
+    client = _LazyClient()
+    # fetch_all keyword arguments kept warm in the shared cache (unannotated, so not a dataclass field)
+    warm_queries = ({},)
+    # Text fields served by GET /<model_path>/search (see search_index.py); none by default
+    search_fields = ()
+    # No instance __dict__ of its own, so the classes built by `slotted()` can be fully slotted
+    __slots__ = ()
+    is_slotted = False
+
+    @classmethod
+    def slotted(cls):
+        """The `__slots__` variant of this model (see slotted_models.py), built once."""
+        if cls.is_slotted:
+            return cls
+        if cls.__name__ not in _slotted_classes:
+            _slotted_classes[cls.__name__] = make_slotted(cls)
+        return _slotted_classes[cls.__name__]
 
     @property
     @abstractmethod
@@ -98,18 +370,47 @@ class StrapiModelMixin:
         fields: Optional[List[str]] = None,
         **kwargs,
     ) -> Optional[T]:
-        response = cls.fetch_one(_id, populate, fields)
+        try:
+            response = cls.fetch_one(_id, populate, fields)
+        except Exception as e:
+            if is_not_found(e):
+                return None
+            raise
         if response:
             try:
-                obj = cls(**response["data"]["attributes"])
-                obj.id = response["data"]["id"]
-                cls._populate_relationships(obj)
-                return obj
+                return cls._from_entry(response["data"])
             except Exception as e:
                 logger.error(f"An error occurred while parsing response: {e}")
                 return None
         return None
 
+    @classmethod
+    def _document_id(cls, _id: str | int) -> int:
+        """
+        `_id` as Strapi's integer id. Checked before calling Strapi, so a malformed id is a 404
+        from the routes and never counts as an upstream failure.
+        """
+        from pystrapi.errors import NotFoundError
+
+        try:
+            return int(_id)
+        except (TypeError, ValueError):
+            raise NotFoundError(f"No {cls.model_path} entry with id {_id!r}") from None
+
+    @classmethod
+    def _from_entry(cls: Type[T], entry: Dict) -> T:
+        if load_settings()["slotted_models"]:
+            cls = cls.slotted()
+        obj = cls(**entry["attributes"])
+        obj.id = entry["id"]
+        cls._populate_relationships(obj)
+        return obj
+
+    @classmethod
+    def _normalize_attributes(cls, attributes: Dict) -> Dict:
+        """Hook for models that derive attributes from the raw entry; used by `ModelFrame` too."""
+        return attributes
+
     @classmethod
     def _extract_relationships(cls) -> Dict[str, Type]:
         relationships = {}
@@ -131,7 +432,6 @@ class StrapiModelMixin:
     @classmethod
     def _populate_relationships(cls, obj):
         for rel_name, rel_cls in cls._extract_relationships().items():
-            print(rel_name, rel_cls)
             inst_list = []
             rel_attr = getattr(obj, rel_name)
             if rel_attr is None:
@@ -154,15 +454,37 @@ class StrapiModelMixin:
     def get_all(
         cls: Type[T],
         sort: Optional[List[str]] = None,
-        filters: Optional[dict] = None,
+        filters: Optional[Union[dict, str, CompiledFilter]] = None,
         populate: Optional[PopulationParameter] = "*",
         fields: Optional[List[str]] = None,
         pagination: Optional[PaginationParameter] = None,
         publication_state: Optional[Union[str, PublicationState]] = None,
         get_all: bool = False,
         batch_size: int = 100,
+        cursor: Optional[str] = None,
+        page_size: int = 100,
+        as_frame: bool = False,
         **kwargs,
-    ) -> List[T]:
+    ) -> Union[List[T], ModelFrame]:
+        """
+        Pass `cursor=""` for keyset pagination: the result is then a `CursorPage` whose
+        `next_cursor` fetches the following page (None on the last one).
+        With `as_frame=True` the rows come back as a column-oriented `ModelFrame`; with
+        `get_all=True` too, it is built a keyset page at a time, in the order of the first sort key.
+        """
+        if as_frame and get_all and cursor is None:
+            from strapi_export import iter_entries
+
+            pages = iter_entries(
+                cls,
+                sort=sort,
+                filters=filters,
+                fields=fields,
+                publication_state=publication_state,
+                page_size=batch_size,
+                populate=populate,
+            )
+            return ModelFrame.from_pages(cls, pages)
         responses = cls.fetch_all(
             sort=sort,
             filters=filters,
@@ -172,19 +494,27 @@ class StrapiModelMixin:
             publication_state=publication_state,
             get_all=get_all,
             batch_size=batch_size,
+            cursor=cursor,
+            page_size=page_size,
             **kwargs,
         )
+        if as_frame:
+            next_cursor = (responses or {}).get("meta", {}).get("next_cursor")
+            return ModelFrame.from_entries(cls, (responses or {}).get("data") or [], next_cursor)
         if responses:
-            objs = []
-            for response in responses["data"]:
-                obj = cls(**response["attributes"])
-                obj.id = response["id"]
-                cls._populate_relationships(obj)
-                objs.append(obj)
+            objs = [cls._from_entry(response) for response in responses["data"]]
+            if cursor is not None:
+                return CursorPage(objs, responses["meta"]["next_cursor"])
             return objs
-        return []
+        return CursorPage() if cursor is not None else []
 
-    def upsert(self, **kwargs) -> bool:
+    def upsert(self, cascade: bool = False, max_workers: int = 8, **kwargs) -> bool:
+        """
+        Creates the entry, or updates it when it has an id. With `cascade=True` unsaved related
+        objects are created first, concurrently where independent (see cascade_save.py).
+        """
+        if cascade:
+            return cascade_upsert(self, max_workers=max_workers, **kwargs)
         excluded_attrs = [
             "createdAt",
             "updatedAt",
@@ -209,7 +539,15 @@ class StrapiModelMixin:
         if response:
             # Update object with response data, the id is in the response["data"]["id"] field
             setattr(self, "id", response["data"]["id"])
-            for attr, value in response["data"]["attributes"].items():
+            attributes = response["data"]["attributes"]
+            if self.is_slotted:
+                # No __dict__ to take undeclared fields; they go to `extra`, as in the slotted __init__
+                known = set(self.__slots__) - {"extra"}
+                unknown = {k: v for k, v in attributes.items() if k not in known}
+                if unknown:
+                    self.extra = {**(self.extra or {}), **unknown}
+                attributes = {k: v for k, v in attributes.items() if k in known}
+            for attr, value in attributes.items():
                 setattr(self, attr, value)
             return True
         return False
@@ -223,64 +561,97 @@ class StrapiModelMixin:
         return False
 
     @classmethod
-    def _extract_request_args(cls):
+    def _extract_request_args(cls, query=None, body: Optional[bytes] = None):
         """
         Helper function to extract request arguments and set them to None if not provided.
+        Reads the current Flask request unless the query args and body are passed explicitly.
         """
-        filters = None
-        if request.args.get("filters"):
-            convert_filters_to_dict(request.args.get("filters"))
+        if query is None:
+            query = request.args
+            body = request.data
+        filters = compile_request_filters(query)
         args = {
-            "sort": request.args.getlist("sort") if request.args.get("sort") else None,
-            "filters": filters if request.args.get("filters") else None,
-            "populate": request.args.get("populate")
-            if request.args.get("populate")
-            else None,
-            "fields": request.args.getlist("fields")
-            if request.args.get("fields")
-            else None,
-            "pagination": json.loads(request.args.get("pagination"))
-            if request.args.get("pagination")
-            else None,
-            "publication_state": request.args.get("publication_state")
-            if request.args.get("publication_state")
+            "sort": query.getlist("sort") if query.get("sort") else None,
+            "filters": filters if filters else None,
+            "populate": query.get("populate") if query.get("populate") else None,
+            "fields": query.getlist("fields") if query.get("fields") else None,
+            "pagination": json.loads(query.get("pagination"))
+            if query.get("pagination")
             else None,
-            "_id": request.args.get("id") if request.args.get("id") else None,
-            "get_all": bool(request.args.get("get_all"))
-            if request.args.get("get_all")
+            "publication_state": query.get("publication_state")
+            if query.get("publication_state")
             else None,
+            "_id": query.get("id") if query.get("id") else None,
+            "get_all": bool(query.get("get_all")) if query.get("get_all") else None,
+            # `?cursor=` (empty) starts keyset pagination, `?cursor=<next_cursor>` continues it
+            "cursor": query.get("cursor"),
+            "page_size": parse_page_size(query.get("page_size")),
         }
-        if request.data:
-            args["data"] = json.loads(request.data)
+        if body:
+            args["data"] = json.loads(body)
         return args
 
+    @classmethod
+    def _stale_key(cls, kind: str, params: Dict) -> tuple:
+        return cls.model_path, kind, json.dumps(params, sort_keys=True, default=str)
+
     @classmethod
     def fetch_all(
         cls,
         sort: Optional[List[str]] = None,
-        filters: Optional[dict] = None,
+        filters: Optional[Union[dict, str, CompiledFilter]] = None,
         populate: Optional[PopulationParameter] = None,
         fields: Optional[List[str]] = None,
         pagination: Optional[PaginationParameter] = None,
         publication_state: Optional[Union[str, PublicationState]] = None,
         get_all: bool = False,
         batch_size: int = 100,
+        cursor: Optional[str] = None,
+        page_size: int = 100,
+        raw: bool = False,
+        refresh: bool = False,
         **kwargs,
     ) -> StrapiEntriesResponse:
-        logger.info(f"Fetching all entries from {cls.model_path}")
-        response = cls.client.get_entries(
-            plural_api_id=str(cls.model_path),
+        """
+        With `raw=True` the response is returned as serialized JSON bytes, straight from the
+        shared cache on a hit. `refresh=True` bypasses the cache and rewrites the entry.
+        """
+        if cursor is not None:
+            params, field, direction = keyset_params(
+                cursor, sort, as_compiled(filters).to_dict(), fields, page_size, load_settings()["max_limit"]
+            )
+            response = cls.fetch_all(
+                populate=populate, publication_state=publication_state, **params
+            )
+            response = finish_page(response, field, direction, params["pagination"]["limit"])
+            return dumps(response) if raw else response
+
+        params = dict(
             sort=sort,
-            filters=filters,
+            filters=to_strapi_filters(filters),
             populate=populate,
             fields=fields,
             pagination=pagination,
             publication_state=publication_state,
-            get_all=get_all,
+            get_all=bool(get_all),
             batch_size=batch_size,
         )
-        logger.debug(f"Retrieved {len(response)} entries from {cls.model_path}")
-        return response
+        stale_key = cls._stale_key("all", params)
+
+        def load():
+            logger.info("Fetching all entries from %s", cls.model_path, extra={"model": cls.model_path})
+            response = get_upstream_guard().call(
+                cls.model_path,
+                lambda: cls.client.get_entries(plural_api_id=str(cls.model_path), **params),
+                stale_key=stale_key,
+            )
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("Retrieved %d entries from %s", len(response.get("data") or []), cls.model_path)
+            return response
+
+        return cls._through_cache(
+            (cls.model_path, "all"), stale_key[2], load, raw=raw, refresh=refresh
+        )
 
     @classmethod
     def fetch_one(
@@ -288,26 +659,145 @@ class StrapiModelMixin:
         _id: str | int,
         populate: Optional[PopulationParameter] = None,
         fields: Optional[List[str]] = None,
+        raw: bool = False,
+        refresh: bool = False,
         **kwargs,
     ) -> StrapiEntryResponse:
-        logger.info(f"Fetching entry with ID {_id} from {cls.model_path}")
+        document_id = cls._document_id(_id)
+        stale_key = cls._stale_key("one", dict(_id=_id, populate=populate, fields=fields))
 
-        response = cls.client.get_entry(
-            plural_api_id=str(cls.model_path),
-            document_id=int(_id),
-            populate=populate,
-            fields=fields,
-        )
-        logger.debug(f"Retrieved entry from {cls.model_path}: {response}")
-        return response
+        def load():
+            logger.info(
+                "Fetching entry with ID %s from %s", _id, cls.model_path,
+                extra={"model": cls.model_path, "id": _id},
+            )
+            response = get_upstream_guard().call(
+                cls.model_path,
+                lambda: cls.client.get_entry(
+                    plural_api_id=str(cls.model_path),
+                    document_id=document_id,
+                    populate=populate,
+                    fields=fields,
+                ),
+                stale_key=stale_key,
+            )
+            logger.debug("Retrieved entry from %s: %s", cls.model_path, Truncated(response))
+            return response
+
+        misses = get_negative_cache()
+        error = misses.get(cls.model_path, _id)
+        if error is not None:
+            raise error
+        try:
+            return cls._through_cache(
+                (cls.model_path, "one", str(_id)), stale_key[2], load, raw=raw, refresh=refresh
+            )
+        except Exception as e:
+            if is_not_found(e):
+                misses.add(cls.model_path, _id, e)
+            raise
+
+    @classmethod
+    def _through_cache(cls, parts: tuple, key: str, load, raw: bool = False, refresh: bool = False):
+        """
+        Serves `load()` through the shared cache. Only one worker refills a missing entry;
+        the others wait on its lock and then read what it wrote. Hits close to expiry are
+        returned as-is while a background refresh rewrites them (stale-while-revalidate).
+        """
+        cache = get_shared_cache()
+        if cache is None:
+            response = load()
+            return dumps(response) if raw else response
+
+        entry = None if refresh else cache.get_entry(parts, key)
+        if entry is None:
+            with cache.lock(parts, key):
+                entry = None if refresh else cache.get_entry(parts, key)
+                if entry is None:
+                    response = load()
+                    payload = cls._store(cache, parts, key, response)
+                    return payload if raw else response
+
+        payload, expires_at = entry
+        if expires_at - time.time() < load_settings()["cache_refresh_ahead"]:
+            _schedule_refresh(parts, key, lambda: cls._refresh_entry(cache, parts, key, load))
+        return payload if raw else loads(payload)
+
+    @staticmethod
+    def _store(cache: SharedCache, parts: tuple, key: str, response) -> bytes:
+        payload = dumps(response)
+        # Stale fallbacks from the upstream guard must not be stored as fresh
+        if not (response.get("meta") or {}).get("stale"):
+            cache.set(parts, key, payload)
+        return payload
+
+    @classmethod
+    def _refresh_entry(cls, cache: SharedCache, parts: tuple, key: str, load) -> None:
+        # Skip if another worker already holds the entry's lock to refresh it
+        with cache.lock(parts, key, blocking=False) as acquired:
+            if acquired:
+                cls._store(cache, parts, key, load())
+
+    @classmethod
+    def _record_change(
+        cls,
+        event: str,
+        _id: str | int,
+        response: Optional[Dict] = None,
+        relations_changed: bool = False,
+    ) -> None:
+        """
+        Brings the shared cache and every registered change listener up to date after a
+        create, update or delete of entry `_id`, whether made here or reported by a webhook.
+        """
+        attributes = ((response or {}).get("data") or {}).get("attributes")
+        get_negative_cache().discard(cls.model_path, _id)
+        cache = get_shared_cache()
+        if cache is not None:
+            apply_change(
+                cache, cls, list(class_registry.values()), event, _id, attributes, relations_changed
+            )
+        for listener in list(change_listeners):
+            try:
+                listener(cls, event, _id, attributes)
+            except Exception as e:
+                logger.error("Change listener %s failed for %s %s: %s", listener, cls.model_path, _id, e)
+
+    @classmethod
+    async def _arecord_change(
+        cls,
+        event: str,
+        _id: str | int,
+        response: Optional[Dict] = None,
+        relations_changed: bool = False,
+    ) -> None:
+        """
+        `_record_change` off the event loop: patching the cache waits on entry locks that a refill
+        holds for a whole Strapi call, and scans and parses the cached lists.
+        """
+        import asyncio
+
+        await asyncio.to_thread(cls._record_change, event, _id, response, relations_changed)
+
+    @classmethod
+    def _relations_in(cls, data: Dict) -> bool:
+        return any(name in data for name in cls._extract_relationships())
 
     @classmethod
     def create(cls, data: Dict, **kwargs) -> Dict:
-        logger.info(f"Creating entry in {cls.model_path} with data: {data}")
         # Replace relationships with their IDs
         cls._replace_relationships_with_ids(data)
-        response = cls.client.create_entry(plural_api_id=str(cls.model_path), data=data)
-        logger.debug(f"Created entry in {cls.model_path}: {response}")
+        logger.info(
+            "Creating entry in %s with data: %s", cls.model_path, Truncated(data),
+            extra={"model": cls.model_path, "event": CREATE},
+        )
+        response = get_upstream_guard().call(
+            cls.model_path,
+            lambda: cls.client.create_entry(plural_api_id=str(cls.model_path), data=data),
+        )
+        logger.debug("Created entry in %s: %s", cls.model_path, Truncated(response))
+        if response:
+            cls._record_change(CREATE, response["data"]["id"], response)
         return response
 
     @classmethod
@@ -322,99 +812,381 @@ class StrapiModelMixin:
                     if all(isinstance(item, dict) for item in data[rel_name]):
                         continue
                     data[rel_name] = [
-                        {"id": getattr(rel_obj, "id")} for rel_obj in data[rel_name]
+                        {"id": cls._saved_id(rel_name, rel_obj)} for rel_obj in data[rel_name]
                     ]
                 else:
                     # If it's a dict, then don't do anything
                     if isinstance(data[rel_name], dict):
                         continue
-                    data[rel_name] = {"id": getattr(data[rel_name], "id")}
+                    data[rel_name] = {"id": cls._saved_id(rel_name, data[rel_name])}
+
+    @classmethod
+    def _saved_id(cls, rel_name: str, rel_obj):
+        _id = getattr(rel_obj, "id", None)
+        if _id is None:
+            raise ValueError(
+                f"{cls.__name__}.{rel_name} refers to an unsaved {type(rel_obj).__name__}; "
+                "save it first or use upsert(cascade=True)"
+            )
+        return _id
 
     @classmethod
     def update(cls, _id: str | int, data: Dict, **kwargs) -> Dict:
+        document_id = cls._document_id(_id)
+        cls._replace_relationships_with_ids(data)
         logger.info(
-            f"Updating entry with ID {_id} in {cls.model_path} with data: {data}"
+            "Updating entry with ID %s in %s with data: %s", _id, cls.model_path, Truncated(data),
+            extra={"model": cls.model_path, "id": _id, "event": UPDATE},
         )
-        cls._replace_relationships_with_ids(data)
-        response = cls.client.update_entry(
-            plural_api_id=str(cls.model_path), document_id=int(_id), data=data
+        response = get_upstream_guard().call(
+            cls.model_path,
+            lambda: cls.client.update_entry(
+                plural_api_id=str(cls.model_path), document_id=document_id, data=data
+            ),
         )
-        logger.debug(f"Updated entry in {cls.model_path}: {response}")
+        logger.debug("Updated entry in %s: %s", cls.model_path, Truncated(response))
+        cls._record_change(UPDATE, _id, response, cls._relations_in(data))
         return response
 
     @classmethod
     def delete_one(cls, _id: str | int, **kwargs) -> Dict:
-        logger.info(f"Deleting entry with ID {_id} from {cls.model_path}")
-        response = cls.client.delete_entry(
-            plural_api_id=str(cls.model_path), document_id=int(_id)
+        document_id = cls._document_id(_id)
+        logger.info(
+            "Deleting entry with ID %s from %s", _id, cls.model_path,
+            extra={"model": cls.model_path, "id": _id, "event": DELETE},
         )
-        logger.debug(f"Deleted entry from {cls.model_path}: {response}")
+        response = get_upstream_guard().call(
+            cls.model_path,
+            lambda: cls.client.delete_entry(
+                plural_api_id=str(cls.model_path), document_id=document_id
+            ),
+        )
+        logger.debug("Deleted entry from %s: %s", cls.model_path, Truncated(response))
+        cls._record_change(DELETE, _id)
         return response
 
     @classmethod
     def fetch_all_route(cls):
         args = cls._extract_request_args()
-        return cls.fetch_all(**args)
+        return json_response(cls.fetch_all(raw=True, **args))
 
     @classmethod
     def fetch_one_route(cls, _id: str | int):
         args = cls._extract_request_args()
         args["_id"] = _id
-        return cls.fetch_one(**args)
+        try:
+            return json_response(cls.fetch_one(raw=True, **args))
+        except Exception as e:
+            if is_not_found(e):
+                return json_response(not_found_response(cls.model_path, _id), 404)
+            raise
 
     @classmethod
     def create_route(cls):
         args = cls._extract_request_args()
-        return cls.create(**args)
+        return json_response(cls.create(**args))
 
     @classmethod
     def update_route(cls, _id: str | int):
         args = cls._extract_request_args()
         args["_id"] = _id
-        return cls.update(**args)
+        try:
+            return json_response(cls.update(**args))
+        except Exception as e:
+            if is_not_found(e):
+                return json_response(not_found_response(cls.model_path, _id), 404)
+            raise
 
     @classmethod
     def delete_route(cls, _id: str | int):
         args = cls._extract_request_args()
         args["_id"] = _id
-        return cls.delete_one(**args)
+        try:
+            return json_response(cls.delete_one(**args))
+        except Exception as e:
+            if is_not_found(e):
+                return json_response(not_found_response(cls.model_path, _id), 404)
+            raise
 
     @classmethod
-    def add_routes(cls, app: Flask) -> None:
-        logger.info(f"Adding routes for {cls.model_path}")
-        class_registry[cls.__name__] = cls
-        model_name = cls.model_path
+    async def afetch_all(
+        cls,
+        sort: Optional[List[str]] = None,
+        filters: Optional[Union[dict, str, CompiledFilter]] = None,
+        populate: Optional[PopulationParameter] = None,
+        fields: Optional[List[str]] = None,
+        pagination: Optional[PaginationParameter] = None,
+        publication_state: Optional[Union[str, PublicationState]] = None,
+        get_all: bool = False,
+        batch_size: int = 100,
+        cursor: Optional[str] = None,
+        page_size: int = 100,
+        raw: bool = False,
+        **kwargs,
+    ) -> StrapiEntriesResponse:
+        if cursor is not None:
+            params, field, direction = keyset_params(
+                cursor, sort, as_compiled(filters).to_dict(), fields, page_size, load_settings()["max_limit"]
+            )
+            response = await cls.afetch_all(
+                populate=populate, publication_state=publication_state, **params
+            )
+            response = finish_page(response, field, direction, params["pagination"]["limit"])
+            return dumps(response) if raw else response
+
+        params = dict(
+            sort=sort,
+            filters=to_strapi_filters(filters),
+            populate=populate,
+            fields=fields,
+            pagination=pagination,
+            publication_state=publication_state,
+            get_all=bool(get_all),
+            batch_size=batch_size,
+        )
+        stale_key = cls._stale_key("all", params)
+
+        async def load():
+            logger.info("Fetching all entries from %s (async)", cls.model_path, extra={"model": cls.model_path})
+            return await get_upstream_guard().acall(
+                cls.model_path,
+                lambda: AsyncStrapiClient().get_entries(
+                    plural_api_id=str(cls.model_path), **params
+                ),
+                stale_key=stale_key,
+            )
+
+        return await cls._athrough_cache(
+            (cls.model_path, "all"), stale_key[2], load, raw=raw
+        )
+
+    @classmethod
+    async def afetch_one(
+        cls,
+        _id: str | int,
+        populate: Optional[PopulationParameter] = None,
+        fields: Optional[List[str]] = None,
+        raw: bool = False,
+        **kwargs,
+    ) -> StrapiEntryResponse:
+        document_id = cls._document_id(_id)
+        stale_key = cls._stale_key("one", dict(_id=_id, populate=populate, fields=fields))
+
+        async def load():
+            logger.info(
+                "Fetching entry with ID %s from %s (async)", _id, cls.model_path,
+                extra={"model": cls.model_path, "id": _id},
+            )
+            return await get_upstream_guard().acall(
+                cls.model_path,
+                lambda: AsyncStrapiClient().get_entry(
+                    plural_api_id=str(cls.model_path),
+                    document_id=document_id,
+                    populate=populate,
+                    fields=fields,
+                ),
+                stale_key=stale_key,
+            )
 
-        app.add_url_rule(
-            f"/{model_name}",
-            f"{model_name}_all",
-            partial(cls.fetch_all_route),
-            methods=["GET"],
+        misses = get_negative_cache()
+        error = misses.get(cls.model_path, _id)
+        if error is not None:
+            raise error
+        try:
+            return await cls._athrough_cache(
+                (cls.model_path, "one", str(_id)), stale_key[2], load, raw=raw
+            )
+        except Exception as e:
+            if is_not_found(e):
+                misses.add(cls.model_path, _id, e)
+            raise
+
+    @classmethod
+    async def _athrough_cache(cls, parts: tuple, key: str, load, raw: bool = False):
+        """Async `_through_cache`; misses are not serialized across workers to keep the loop free."""
+        import asyncio
+
+        cache = get_shared_cache()
+        entry = cache.get_entry(parts, key) if cache is not None else None
+        if entry is not None:
+            payload, expires_at = entry
+            if expires_at - time.time() < load_settings()["cache_refresh_ahead"]:
+                task = asyncio.get_running_loop().create_task(
+                    cls._arefresh_entry(cache, parts, key, load)
+                )
+                # The loop only keeps weak references to tasks
+                _background_tasks.add(task)
+                task.add_done_callback(_background_tasks.discard)
+            return payload if raw else loads(payload)
+        response = await load()
+        if cache is None:
+            return dumps(response) if raw else response
+        payload = cls._store(cache, parts, key, response)
+        return payload if raw else response
+
+    @classmethod
+    async def _arefresh_entry(cls, cache: SharedCache, parts: tuple, key: str, load) -> None:
+        with _refreshing_lock:
+            if (parts, key) in _refreshing:
+                return
+            _refreshing.add((parts, key))
+        try:
+            cls._store(cache, parts, key, await load())
+        except Exception as e:
+            logger.warning("Background refresh of %s failed: %s", "/".join(parts), e)
+        finally:
+            with _refreshing_lock:
+                _refreshing.discard((parts, key))
+
+    @classmethod
+    async def acreate(cls, data: Dict, **kwargs) -> Dict:
+        cls._replace_relationships_with_ids(data)
+        logger.info(
+            "Creating entry in %s with data: %s (async)", cls.model_path, Truncated(data),
+            extra={"model": cls.model_path, "event": CREATE},
         )
-        app.add_url_rule(
-            f"/{model_name}/<string:_id>",
-            f"{model_name}_one",
-            partial(cls.fetch_one_route),
-            methods=["GET"],
+        response = await get_upstream_guard().acall(
+            cls.model_path,
+            lambda: AsyncStrapiClient().create_entry(
+                plural_api_id=str(cls.model_path), data=data
+            ),
+        )
+        if response:
+            await cls._arecord_change(CREATE, response["data"]["id"], response)
+        return response
+
+    @classmethod
+    async def aupdate(cls, _id: str | int, data: Dict, **kwargs) -> Dict:
+        document_id = cls._document_id(_id)
+        cls._replace_relationships_with_ids(data)
+        logger.info(
+            "Updating entry with ID %s in %s with data: %s (async)", _id, cls.model_path, Truncated(data),
+            extra={"model": cls.model_path, "id": _id, "event": UPDATE},
         )
-        app.add_url_rule(
-            f"/{model_name}",
-            f"{model_name}_create",
-            partial(cls.create_route),
-            methods=["POST"],
+        response = await get_upstream_guard().acall(
+            cls.model_path,
+            lambda: AsyncStrapiClient().update_entry(
+                plural_api_id=str(cls.model_path), document_id=document_id, data=data
+            ),
         )
-        app.add_url_rule(
-            f"/{model_name}/<string:_id>",
-            f"{model_name}_update",
-            partial(cls.update_route),
-            methods=["PUT"],
+        await cls._arecord_change(UPDATE, _id, response, cls._relations_in(data))
+        return response
+
+    @classmethod
+    async def adelete_one(cls, _id: str | int, **kwargs) -> Dict:
+        document_id = cls._document_id(_id)
+        logger.info(
+            "Deleting entry with ID %s from %s (async)", _id, cls.model_path,
+            extra={"model": cls.model_path, "id": _id, "event": DELETE},
         )
-        app.add_url_rule(
-            f"/{model_name}/<string:_id>",
-            f"{model_name}_delete",
-            partial(cls.delete_route),
-            methods=["DELETE"],
+        response = await get_upstream_guard().acall(
+            cls.model_path,
+            lambda: AsyncStrapiClient().delete_entry(
+                plural_api_id=str(cls.model_path), document_id=document_id
+            ),
         )
+        await cls._arecord_change(DELETE, _id)
+        return response
+
+    @classmethod
+    async def aget_all(cls: Type[T], **kwargs) -> List[T]:
+        kwargs.setdefault("populate", "*")
+        responses = await cls.afetch_all(**kwargs)
+        if not responses:
+            return []
+        return [cls._from_entry(response) for response in responses["data"]]
+
+    @classmethod
+    async def afetch_all_route(cls, req):
+        args = cls._extract_request_args(req.args, await req.get_data())
+        return render(await cls.afetch_all(raw=True, **args), req.args)
+
+    @classmethod
+    async def afetch_one_route(cls, req, _id: str | int):
+        args = cls._extract_request_args(req.args, await req.get_data())
+        args["_id"] = _id
+        try:
+            return render(await cls.afetch_one(raw=True, **args), req.args)
+        except Exception as e:
+            if is_not_found(e):
+                return not_found_response(cls.model_path, _id), 404
+            raise
+
+    @classmethod
+    async def acreate_route(cls, req):
+        args = cls._extract_request_args(req.args, await req.get_data())
+        return render(await cls.acreate(**args), req.args)
+
+    @classmethod
+    async def aupdate_route(cls, req, _id: str | int):
+        args = cls._extract_request_args(req.args, await req.get_data())
+        args["_id"] = _id
+        try:
+            return render(await cls.aupdate(**args), req.args)
+        except Exception as e:
+            if is_not_found(e):
+                return not_found_response(cls.model_path, _id), 404
+            raise
+
+    @classmethod
+    async def adelete_route(cls, req, _id: str | int):
+        args = cls._extract_request_args(req.args, await req.get_data())
+        args["_id"] = _id
+        try:
+            return render(await cls.adelete_one(**args), req.args)
+        except Exception as e:
+            if is_not_found(e):
+                return not_found_response(cls.model_path, _id), 404
+            raise
+
+    @classmethod
+    def route_table(cls) -> List[Tuple[str, str, str, Callable, Callable]]:
+        """The model's routes as (rule, endpoint, method, Flask view, ASGI view), for both apps."""
+        model_name = cls.model_path
+        routes = [
+            (f"/{model_name}", f"{model_name}_all", "GET", cls.fetch_all_route, cls.afetch_all_route),
+            (
+                f"/{model_name}/export",
+                f"{model_name}_export",
+                "GET",
+                partial(export_route, cls),
+                partial(aexport_route, cls),
+            ),
+        ]
+        if cls.search_fields:
+            from search_index import asearch_route, search_route
+
+            routes.append(
+                (
+                    f"/{model_name}/search",
+                    f"{model_name}_search",
+                    "GET",
+                    partial(search_route, cls),
+                    partial(asearch_route, cls),
+                )
+            )
+        routes += [
+            (f"/{model_name}/<string:_id>", f"{model_name}_one", "GET", cls.fetch_one_route, cls.afetch_one_route),
+            (f"/{model_name}", f"{model_name}_create", "POST", cls.create_route, cls.acreate_route),
+            (f"/{model_name}/<string:_id>", f"{model_name}_update", "PUT", cls.update_route, cls.aupdate_route),
+            (f"/{model_name}/<string:_id>", f"{model_name}_delete", "DELETE", cls.delete_route, cls.adelete_route),
+        ]
+        return routes
+
+    @classmethod
+    def add_async_routes(cls, app) -> None:
+        """Register the async counterparts of `add_routes` on an `asgi.AsyncApp`."""
+        logger.info(f"Adding async routes for {cls.model_path}")
+        class_registry[cls.__name__] = cls.slotted() if load_settings()["slotted_models"] else cls
+        for rule, endpoint, method, _, view in cls.route_table():
+            app.add_url_rule(rule, endpoint, view, methods=[method])
+
+    @classmethod
+    def add_routes(cls, app: Flask) -> None:
+        logger.info(f"Adding routes for {cls.model_path}")
+        class_registry[cls.__name__] = cls.slotted() if load_settings()["slotted_models"] else cls
+        for rule, endpoint, method, view, _ in cls.route_table():
+            app.add_url_rule(rule, endpoint, view, methods=[method])
 
 
 # if __name__ == "__main__":
@@ -0,0 +1,93 @@
+"""
+Receiver for Strapi lifecycle webhooks, so changes made in the Strapi admin (or by other
+services) reach the shared cache and change listeners without waiting for TTLs to expire.
+
+In Strapi, add a webhook pointing at `/webhooks/strapi` with the header
+`Authorization: Bearer <STRAPI_WEBHOOK_SECRET>` and the entry events enabled. Strapi posts
+
+    {"event": "entry.update", "model": "message", "uid": "api::message.message",
+     "entry": {"id": 1, "content": "...", ...}}
+
+and the affected cached entries are patched or dropped (see cache_invalidation.py).
+"""
+import asyncio
+import hmac
+import json
+import logging
+from typing import Dict, Tuple
+
+from cache_invalidation import CREATE, DELETE, PUBLISH, UNPUBLISH, UPDATE
+from strapi_model_mixin import class_registry, load_settings
+
+logger = logging.getLogger(__name__)
+
+EVENTS = (CREATE, UPDATE, DELETE, PUBLISH, UNPUBLISH)
+
+
+def verify_secret(headers) -> bool:
+    """
+    Whether the request carries the shared secret, as `Authorization: Bearer <secret>` or
+    `X-Strapi-Webhook-Secret`. Always False when `STRAPI_WEBHOOK_SECRET` is not set.
+    """
+    secret = load_settings()["webhook_secret"]
+    if not secret:
+        return False
+    given = headers.get("X-Strapi-Webhook-Secret") or ""
+    authorization = headers.get("Authorization") or ""
+    if authorization.startswith("Bearer "):
+        given = authorization[len("Bearer "):]
+    return hmac.compare_digest(given.encode(), secret.encode())
+
+
+def resolve_model(payload: Dict):
+    """The registered model class for the payload's `model`/`uid`, or None."""
+    names = {payload.get("model"), (payload.get("uid") or "").rpartition(".")[2]} - {None, ""}
+    for cls in list(class_registry.values()):
+        path = cls.model_path
+        candidates = {path, path[:-1] if path.endswith("s") else path, cls.__name__.lower()}
+        if names & candidates:
+            return cls
+    return None
+
+
+def handle_event(payload: Dict) -> Tuple[Dict, int]:
+    """Applies one webhook payload. Returns the response body and status code."""
+    event = payload.get("event")
+    entry = payload.get("entry") or {}
+    if event not in EVENTS:
+        # Media and admin events are acknowledged but have nothing to invalidate
+        return {"ignored": event}, 202
+    if "id" not in entry:
+        return {"error": {"status": 400, "message": "Webhook payload has no entry id"}}, 400
+    cls = resolve_model(payload)
+    if cls is None:
+        logger.info(f"Ignoring {event} for unregistered model {payload.get('model')}")
+        return {"ignored": event}, 202
+
+    attributes = {k: v for k, v in entry.items() if k != "id"}
+    response = {"data": {"id": entry["id"], "attributes": attributes}}
+    relations_changed = event == UPDATE and cls._relations_in(attributes)
+    cls._record_change(event, entry["id"], response, relations_changed)
+    logger.info(f"Applied {event} for {cls.model_path} {entry['id']}")
+    return {"applied": event, "model": cls.model_path, "id": entry["id"]}, 200
+
+
+def strapi_webhook():
+    """Flask view for `POST /webhooks/strapi`."""
+    from flask import request
+
+    if not verify_secret(request.headers):
+        return {"error": {"status": 403, "message": "Invalid webhook secret"}}, 403
+    return handle_event(request.get_json(silent=True) or {})
+
+
+async def astrapi_webhook(req):
+    """`asgi.AsyncApp` view for `POST /webhooks/strapi`."""
+    if not verify_secret(req.headers):
+        return {"error": {"status": 403, "message": "Invalid webhook secret"}}, 403
+    try:
+        payload = json.loads(await req.get_data() or b"{}")
+    except ValueError:
+        payload = {}
+    # Applying the event can wait on cache entry locks; keep it off the event loop
+    return await asyncio.to_thread(handle_event, payload)
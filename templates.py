@@ -0,0 +1,20 @@
+profiles_template = """<html>
+    <head>
+        <title>LinkedIn Profiles</title>
+    </head>
+    <body>
+        <h1>LinkedIn Profiles</h1>
+        <ul>
+            {% for profile in profiles %}
+            <li>
+                {% if profile.profilePicture %}
+                <img src="{{ image_url(profile) }}" loading="lazy" />
+                {% endif %}
+                <a href="{{ profile.profileLink }}">{{ profile.firstName }} {{ profile.lastName }}</a>
+            </li>
+
+
+            {% endfor %}
+        </ul>
+    </body>
+</html>"""
@@ -0,0 +1,177 @@
+import asyncio
+import json
+
+import pytest
+
+import strapi_model_mixin
+from asgi import app
+from upstream_guard import AdaptiveLimiter, UpstreamGuard
+
+
+class FakeAsyncClient:
+    async def get_entries(self, plural_api_id, **kwargs):
+        await asyncio.sleep(0.01)
+        return {"data": [{"id": 1, "attributes": {"content": "Hello World!"}}]}
+
+    async def get_entry(self, plural_api_id, document_id, **kwargs):
+        await asyncio.sleep(0.01)
+        return {"data": {"id": document_id, "attributes": {"content": "Hello World!"}}}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    fake = FakeAsyncClient()
+    monkeypatch.setattr(
+        strapi_model_mixin.AsyncStrapiClient, "__new__", lambda cls: fake
+    )
+    monkeypatch.setattr(
+        strapi_model_mixin,
+        "_upstream_guard",
+        UpstreamGuard(limiter=AdaptiveLimiter(initial_limit=1000, max_limit=1000)),
+    )
+    return fake
+
+
+async def call(method, path, query_string=b""):
+    status, _, body = await respond(method, path, query_string)
+    return status, body
+
+
+async def respond(method, path, query_string=b"", headers=()):
+    """Status, headers and the whole body of the app's response."""
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    scope = {
+        "type": "http",
+        "method": method,
+        "path": path,
+        "query_string": query_string,
+        "headers": [(b"host", b"testserver"), *headers],
+    }
+    await app(scope, receive, send)
+    response_headers = {k.decode(): v.decode() for k, v in sent[0]["headers"]}
+    return sent[0]["status"], response_headers, b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_async_fetch_one(fake_client):
+    status, body = asyncio.run(call("GET", "/messages/1"))
+    assert status == 200
+    assert json.loads(body)["data"]["attributes"]["content"] == "Hello World!"
+
+
+def test_async_concurrent_requests(fake_client):
+    async def many():
+        return await asyncio.gather(*[call("GET", "/messages") for _ in range(200)])
+
+    results = asyncio.run(many())
+    assert all(status == 200 for status, _ in results)
+
+
+def test_async_unknown_route(fake_client):
+    status, _ = asyncio.run(call("GET", "/nope"))
+    assert status == 404
+
+
+def test_async_app_serves_the_same_model_routes():
+    from app import app as wsgi_app
+
+    def model_rules(url_map):
+        return {(r.rule, tuple(sorted(r.methods - {"HEAD", "OPTIONS"}))) for r in url_map.iter_rules() if r.endpoint != "static"}
+
+    assert model_rules(app.url_map) >= model_rules(wsgi_app.url_map) - {("/", ("GET",))}
+
+
+def test_async_export_and_search(monkeypatch):
+    from test_search_index import PROFILES, WritableCollectionClient
+    import search_index
+
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", WritableCollectionClient([dict(p) for p in PROFILES]))
+    monkeypatch.setattr(search_index, "_indexes", {})
+
+    status, headers, body = asyncio.run(respond("GET", "/linked-in-profiles/export", b"page_size=2"))
+    assert status == 200 and headers["content-type"].startswith("application/x-ndjson")
+    assert [json.loads(line)["id"] for line in body.splitlines()] == [1, 2, 3]
+    assert asyncio.run(call("GET", "/linked-in-profiles/export", b"format=xml"))[0] == 400
+
+    status, body = asyncio.run(call("GET", "/linked-in-profiles/search", b"q=lov"))
+    assert status == 200 and [hit["id"] for hit in json.loads(body)["data"]] == [1]
+
+
+def test_cors_preflight():
+    preflight = [(b"origin", b"https://example.com"), (b"access-control-request-method", b"PUT"), (b"access-control-request-headers", b"content-type")]
+    status, headers, _ = asyncio.run(respond("OPTIONS", "/messages/1", headers=preflight))
+    assert status == 200
+    assert headers["access-control-allow-origin"] == "*"
+    assert {"GET", "PUT", "DELETE"} <= set(headers["access-control-allow-methods"].split(", "))
+    assert headers["access-control-allow-headers"] == "content-type"
+    assert asyncio.run(respond("OPTIONS", "/nope"))[0] == 404
+
+
+def test_aget_all_hydrates_like_get_all(fake_client, monkeypatch):
+    from models.message import Message
+
+    monkeypatch.setenv("STRAPI_SLOTTED_MODELS", "true")
+    strapi_model_mixin.load_settings.cache_clear()
+    try:
+        messages = asyncio.run(Message.aget_all())
+    finally:
+        strapi_model_mixin.load_settings.cache_clear()
+    assert type(messages[0]) is Message.slotted() and messages[0].id == 1
+
+
+def test_async_writes_do_not_block_the_event_loop_on_cache_locks(fake_client, monkeypatch, tmp_path):
+    import threading
+    import time
+
+    from models.message import Message
+    from shared_cache import SharedCache
+
+    async def update_entry(plural_api_id, document_id, data):
+        return {"data": {"id": document_id, "attributes": data}}
+
+    fake_client.update_entry = update_entry
+    cache = SharedCache(str(tmp_path))
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", cache)
+    parts = ("messages", "one", "1")
+    cache.set(parts, "k", b'{"data": {"id": 1, "attributes": {"content": "old"}}}')
+
+    # A refill holding the entry's lock for the length of a slow Strapi call
+    locked, release = threading.Event(), threading.Event()
+
+    def refill():
+        with cache.lock(parts, "k"):
+            locked.set()
+            release.wait(2)
+
+    holder = threading.Thread(target=refill)
+    holder.start()
+    locked.wait(2)
+
+    async def main():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while not update.done():
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        update = asyncio.ensure_future(Message.aupdate(1, {"content": "new"}))
+        ticker = asyncio.ensure_future(tick())
+        await asyncio.sleep(0.2)
+        assert not update.done() and ticks >= 10
+        release.set()
+        await asyncio.wait_for(update, 2)
+        await ticker
+
+    started = time.monotonic()
+    asyncio.run(main())
+    holder.join()
+    assert time.monotonic() - started < 2
+    assert json.loads(cache.get(parts, "k"))["data"]["attributes"]["content"] == "new"
@@ -0,0 +1,116 @@
+import json
+import threading
+
+import pytest
+from pystrapi.errors import ValidationError
+
+import strapi_model_mixin
+from bulk_import import Checkpoint, iter_records, run_import
+from models.message import Message
+
+
+class RecordingClient:
+    def __init__(self):
+        self.created, self.updated = [], []
+        self.lock = threading.Lock()
+
+    def create_entry(self, plural_api_id, data):
+        if data["content"] == "bad":
+            raise ValidationError("content is invalid")
+        with self.lock:
+            self.created.append(data["content"])
+            return {"data": {"id": len(self.created), "attributes": data}, "meta": {}}
+
+    def update_entry(self, plural_api_id, document_id, data):
+        with self.lock:
+            self.updated.append(document_id)
+        return {"data": {"id": document_id, "attributes": data}, "meta": {}}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    client = RecordingClient()
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", client)
+    return client
+
+
+def write_ndjson(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records))
+    return str(path)
+
+
+@pytest.mark.parametrize("name", ["records.ndjson", "records.json", "records.csv"])
+def test_reads_every_format(tmp_path, name):
+    path = tmp_path / name
+    if name.endswith(".csv"):
+        path.write_text("id,content\n1,a\n,b\n")
+    elif name.endswith(".json"):
+        path.write_text(json.dumps([{"id": "1", "content": "a"}, {"content": "b, [x]"}], indent=2))
+    else:
+        write_ndjson(path, [{"id": "1", "content": "a"}, {"content": "b"}])
+    records = list(iter_records(str(path)))
+    assert len(records) == 2 and records[0]["content"] == "a"
+
+
+def test_creates_updates_and_records_errors(tmp_path, fake_client):
+    path = write_ndjson(
+        tmp_path / "messages.ndjson",
+        [{"content": f"m{i}", "unknown": 1} for i in range(20)]
+        + [{"content": "bad"}, {"id": 5, "attributes": {"content": "edited"}}],
+    )
+    lines = []
+    checkpoint = run_import(Message, path, concurrency=4, echo=lines.append)
+    assert sorted(fake_client.created) == sorted(f"m{i}" for i in range(20))
+    assert fake_client.updated == [5]
+    assert checkpoint.next == 22 and checkpoint.stats == {"created": 20, "failed": 1, "updated": 1}
+    errors = [json.loads(line) for line in open(f"{path}.errors.ndjson")]
+    assert errors == [{"index": 20, "error": "ValidationError: content is invalid", "record": {"content": "bad"}}]
+    assert "1 x ValidationError" in lines[-2]
+    assert checkpoint.failed == {20}
+
+
+def test_resumes_from_checkpoint(tmp_path, fake_client):
+    path = write_ndjson(tmp_path / "messages.ndjson", [{"content": f"m{i}"} for i in range(6)])
+    checkpoint = Checkpoint(f"{path}.checkpoint")
+    for index in (0, 1, 3):
+        checkpoint.mark(index, "created")
+    checkpoint.save()
+
+    run_import(Message, path, echo=lambda line: None)
+    assert sorted(fake_client.created) == ["m2", "m4", "m5"]
+    run_import(Message, path, echo=lambda line: None)
+    assert len(fake_client.created) == 3
+
+
+def test_failed_records_are_retried_on_the_next_run(tmp_path, fake_client):
+    path = write_ndjson(tmp_path / "messages.ndjson", [{"content": "a"}, {"content": "bad"}, {"content": "c"}])
+    checkpoint = run_import(Message, path, concurrency=1, echo=lambda line: None)
+    assert checkpoint.failed == {1} and checkpoint.next == 3
+
+    fake_client.created.clear()
+    original = fake_client.create_entry
+    fake_client.create_entry = lambda plural_api_id, data: original(plural_api_id, {"content": "fixed"})
+    checkpoint = run_import(Message, path, concurrency=1, echo=lambda line: None)
+    assert fake_client.created == ["fixed"]
+    assert checkpoint.failed == set() and checkpoint.stats == {"created": 3, "failed": 0}
+    assert Checkpoint(f"{path}.checkpoint").failed == set()
+
+
+def test_cli(tmp_path, fake_client):
+    from app import create_app
+
+    path = write_ndjson(tmp_path / "messages.ndjson", [{"content": "hello"}])
+    runner = create_app().test_cli_runner()
+    result = runner.invoke(args=["import", "messages", path])
+    assert result.exit_code == 0, result.output
+    assert "1 created" in result.output
+    assert fake_client.created == ["hello"]
+    assert runner.invoke(args=["import", "nothing", path]).exit_code != 0
+
+
+def test_bad_records_do_not_open_the_breaker(tmp_path, fake_client):
+    records = [{"id": "not-a-number", "content": "x"} for _ in range(10)] + [{"content": "ok"}]
+    checkpoint = run_import(Message, write_ndjson(tmp_path / "messages.ndjson", records), concurrency=1, echo=lambda *a: None)
+    assert checkpoint.stats["failed"] == 10
+    assert fake_client.created == ["ok"]
+    assert strapi_model_mixin.get_upstream_guard().breaker("messages").state == "closed"
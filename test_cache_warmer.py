@@ -0,0 +1,61 @@
+import time
+
+import pytest
+
+import cache_warmer
+import strapi_model_mixin
+from models.linkedin_profile import LinkedInProfile
+from models.message import Message
+from shared_cache import SharedCache
+from test_shared_cache import CountingClient
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path), default_ttl=60)
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def counting_client(monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", client)
+    return client
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    monkeypatch.setattr(cache_warmer, "class_registry", {"Message": Message, "LinkedInProfile": LinkedInProfile})
+
+
+def test_warm_up_preloads_hot_queries(cache, counting_client, registry):
+    assert cache_warmer.warm_up() == 3
+    calls = counting_client.calls
+    # The bare list route and get_all() for the profiles page are now hits
+    Message.fetch_all()
+    LinkedInProfile.fetch_all(populate="*")
+    assert counting_client.calls == calls
+
+
+def test_warm_queries_from_env(cache, counting_client, registry, monkeypatch):
+    settings = dict(strapi_model_mixin.load_settings())
+    settings["warm_queries"] = '{"messages": [{"sort": ["id"]}]}'
+    monkeypatch.setattr(cache_warmer, "load_settings", lambda: settings)
+    assert cache_warmer.warm_queries_for(Message) == [{"sort": ["id"]}]
+    assert cache_warmer.warm_queries_for(LinkedInProfile) == []
+
+
+def test_hits_near_expiry_refresh_in_background(cache, counting_client):
+    Message.fetch_one(1)
+    parts, key = ("messages", "one", "1"), Message._stale_key("one", dict(_id=1, populate=None, fields=None))[2]
+    payload, _ = cache.get_entry(parts, key)
+    cache.set(parts, key, payload, ttl=5)  # inside the default 10s refresh-ahead window
+
+    assert Message.fetch_one(1)["data"]["id"] == 1
+    deadline = time.time() + 2
+    while counting_client.calls < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert counting_client.calls == 2
+    time.sleep(0.05)
+    assert cache.get_entry(parts, key)[1] > time.time() + 30
@@ -0,0 +1,105 @@
+import threading
+import time
+
+import pytest
+from pystrapi.errors import ValidationError
+
+import strapi_model_mixin
+from models.author import Author
+from models.blog import Blog
+from models.message import Message
+from models.world import World
+
+
+class GraphClient:
+    """Assigns ids on create and records the data of every write."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.writes = []
+        self.in_flight = self.max_in_flight = 0
+        self.lock = threading.Lock()
+
+    def _write(self, plural_api_id, document_id, data):
+        with self.lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        time.sleep(self.delay)
+        with self.lock:
+            self.in_flight -= 1
+            document_id = document_id or len(self.writes) + 100
+            self.writes.append((plural_api_id, document_id, data))
+        return {"data": {"id": document_id, "attributes": {}}, "meta": {}}
+
+    def create_entry(self, plural_api_id, data):
+        return self._write(plural_api_id, None, data)
+
+    def update_entry(self, plural_api_id, document_id, data):
+        return self._write(plural_api_id, document_id, data)
+
+
+@pytest.fixture
+def registry(monkeypatch):
+    for model in (Message, World, Author, Blog):
+        monkeypatch.setitem(strapi_model_mixin.class_registry, model.__name__, model)
+
+
+def install(monkeypatch, client):
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", client)
+    return client
+
+
+def test_children_are_created_first_and_concurrently(registry, monkeypatch):
+    client = install(monkeypatch, GraphClient(delay=0.05))
+    author = Author(name="Ada")
+    world = World(
+        guid="w",
+        author=author,
+        blogs=[Blog(text="one", author=author), Blog(text="two")],
+        messages=[Message(content="hi"), Message(content="there")],
+    )
+    assert world.upsert(cascade=True)
+
+    order = [path for path, _, _ in client.writes]
+    assert order[-1] == "worlds"
+    assert order.index("authors") < min(i for i, path in enumerate(order) if path == "blogs" and client.writes[i][2]["text"] == "one")
+    assert client.max_in_flight >= 3
+    _, _, data = client.writes[-1]
+    assert data["author"] == {"id": author.id}
+    assert sorted(b["id"] for b in data["blogs"]) == sorted(b.id for b in world.blogs)
+    assert all(m.id is not None for m in world.messages)
+
+
+def test_saved_objects_are_only_rewritten_when_linked_to_new_ones(registry, monkeypatch):
+    client = install(monkeypatch, GraphClient())
+    saved_blog = Blog(id=7, text="kept")
+    relinked_blog = Blog(id=8, text="relinked", author=Author(name="New"))
+    World(id=1, blogs=[saved_blog, relinked_blog]).upsert(cascade=True)
+    assert [(path, _id) for path, _id, _ in client.writes] == [("authors", 100), ("blogs", 8), ("worlds", 1)]
+
+
+def test_cycles_and_unsaved_children_without_cascade(registry, monkeypatch):
+    install(monkeypatch, GraphClient())
+    world = World(guid="w")
+    blog = Blog(text="b", worlds=[world])
+    world.blogs = [blog]
+    with pytest.raises(ValueError, match="cycle"):
+        world.upsert(cascade=True)
+    with pytest.raises(ValueError, match="unsaved Author"):
+        Blog(text="b", author=Author(name="Ada")).upsert()
+
+
+def test_failure_stops_before_parents(registry, monkeypatch):
+    client = install(monkeypatch, GraphClient())
+    original = client.create_entry
+
+    def failing_create(plural_api_id, data):
+        if plural_api_id == "messages":
+            raise ValidationError("content is required")
+        return original(plural_api_id, data)
+
+    client.create_entry = failing_create
+    world = World(guid="w", author=Author(name="Ada"), messages=[Message(content="x")])
+    with pytest.raises(ValidationError):
+        world.upsert(cascade=True)
+    assert "worlds" not in [path for path, _, _ in client.writes]
@@ -0,0 +1,162 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+# Imported by the connector on first use; done here so the racing requests in the tests do not wait on it
+from pystrapi.help import requests_helpers  # noqa: F401
+
+import strapi_model_mixin
+from hedged_reads import DeadlineExceeded, HedgedConnector, deadline_scope, remaining, request_budget
+from negative_cache import NegativeCache
+
+
+class FakeResponse:
+    status_code = 200
+
+    def __init__(self, label):
+        self.label = label
+
+
+class SlowFirstSession:
+    """Answers the first GET after `first_delay` seconds and every later one at once."""
+
+    def __init__(self, first_delay):
+        self.first_delay = first_delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **reqargs):
+        with self.lock:
+            self.calls.append(reqargs)
+            number = len(self.calls)
+        if number == 1:
+            time.sleep(self.first_delay)
+        return FakeResponse(number)
+
+
+def warmed(connector, latency=0.01):
+    for _ in range(20):
+        connector._observe(latency)
+    return connector
+
+
+def test_request_budget():
+    assert request_budget({}, 25) == 25
+    assert request_budget({"X-Request-Timeout": "2.5"}, 25) == 2.5
+    assert request_budget({"X-Request-Timeout": "60"}, 25) == 25
+    assert request_budget({"X-Request-Timeout": "soon"}, 0) is None
+
+
+def test_deadline_scopes_nest():
+    assert remaining() is None
+    with deadline_scope(5):
+        with deadline_scope(60):
+            assert 4 < remaining() <= 5
+        with deadline_scope(1):
+            assert remaining() <= 1
+            with deadline_scope(None):
+                assert remaining() is None
+            assert remaining() <= 1
+    assert remaining() is None
+
+
+@pytest.fixture
+def slow_first_server():
+    """A local HTTP server answering its first GET after half a second and every later one at once."""
+    calls = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            calls.append(threading.current_thread())
+            if len(calls) == 1:
+                time.sleep(0.5)
+            body = str(len(calls)).encode()
+            try:
+                self.send_response(200)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            except OSError:
+                pass
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}", calls
+    server.shutdown()
+    server.server_close()
+
+
+def test_slow_reads_are_hedged(slow_first_server):
+    url, calls = slow_first_server
+    connector = warmed(HedgedConnector(hedge=True, min_delay=0.01))
+    started = time.monotonic()
+    response = connector.request("GET", f"{url}/api/worlds/1")
+    # The hedge answered and cut off the first copy, which was still waiting on the caller's thread
+    assert response.text == "2"
+    assert time.monotonic() - started < 0.3
+    assert len(calls) == 2
+    assert connector.stats == {"reads": 1, "hedged": 1, "hedge_wins": 1, "deadline_exceeded": 0}
+
+
+def test_fast_reads_and_writes_are_not_hedged():
+    connector = warmed(HedgedConnector(hedge=True, min_delay=0.2))
+    session = SlowFirstSession(first_delay=0.05)
+    assert connector.request("GET", "http://strapi/api/worlds/1", session=session).label == 1
+    connector.request("POST", "http://strapi/api/worlds", session=session)
+    assert len(session.calls) == 2
+    assert connector.stats["hedged"] == 0 and connector.stats["reads"] == 1
+    # Reads answered in time never go through the pool
+    assert connector._pool is None
+
+
+def test_deadline_becomes_the_timeout():
+    connector = HedgedConnector()
+    session = SlowFirstSession(first_delay=0)
+    with deadline_scope(2):
+        connector.request("GET", "http://strapi/api/worlds/1", session=session)
+    assert 1.5 < session.calls[0]["timeout"] <= 2
+    with deadline_scope(-1), pytest.raises(DeadlineExceeded) as error:
+        connector.request("GET", "http://strapi/api/worlds/1", session=session)
+    assert not error.value.sent and len(session.calls) == 1
+
+    class TimingOutSession:
+        def request(self, method, url, **reqargs):
+            raise requests.ReadTimeout("read timed out")
+
+    with deadline_scope(1), pytest.raises(DeadlineExceeded) as error:
+        connector.request("GET", "http://strapi/api/worlds/1", session=TimingOutSession())
+    assert error.value.sent and connector.stats["deadline_exceeded"] == 2
+
+
+class DeadlineClient:
+    def __init__(self):
+        self.remaining = []
+
+    def get_entry(self, plural_api_id, document_id, **kwargs):
+        self.remaining.append(remaining())
+        if document_id == 2:
+            raise DeadlineExceeded("Request deadline passed before sending GET")
+        return {"data": {"id": document_id, "attributes": {"guid": "w"}}, "meta": {}}
+
+
+def test_routes_propagate_the_request_deadline(monkeypatch):
+    from app import app
+
+    fake = DeadlineClient()
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", fake)
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", None)
+    monkeypatch.setattr(strapi_model_mixin, "_negative_cache", NegativeCache())
+    client = app.test_client()
+
+    assert client.get("/worlds/1", headers={"X-Request-Timeout": "2"}).status_code == 200
+    assert 0 < fake.remaining[0] <= 2
+    response = client.get("/worlds/2")
+    assert response.status_code == 504
+    assert response.get_json()["error"]["name"] == "DeadlineExceeded"
+    assert remaining() is None
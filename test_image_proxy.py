@@ -0,0 +1,191 @@
+import asyncio
+import io
+import os
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import image_proxy
+import strapi_model_mixin
+from image_proxy import ThumbnailCache, image_url, version
+from models.linkedin_profile import LinkedInProfile
+from negative_cache import NegativeCache
+
+PICTURES = {1: "https://media.licdn.com/ada.jpg", 2: "https://media.licdn.com/alan.jpg", 3: None}
+
+
+class ProfileClient:
+    def get_entry(self, plural_api_id, document_id, **kwargs):
+        return {"data": {"id": document_id, "attributes": {"profilePicture": PICTURES[document_id]}}, "meta": {}}
+
+
+@pytest.fixture
+def proxy(monkeypatch, tmp_path):
+    downloads = []
+
+    def download(url, allowed_hosts=None):
+        downloads.append(url)
+        return b"same picture bytes", "image/jpeg"
+
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", ProfileClient())
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", None)
+    monkeypatch.setattr(strapi_model_mixin, "_negative_cache", NegativeCache())
+    monkeypatch.setattr(image_proxy, "download", download)
+    monkeypatch.setattr(image_proxy, "thumbnail", lambda body, content_type, size: (body, content_type))
+    monkeypatch.setattr(image_proxy, "_thumbnail_cache", ThumbnailCache(str(tmp_path), 1024, 64))
+    return downloads
+
+
+def test_route_fetches_once_and_serves_from_disk(proxy):
+    from app import app
+
+    client = app.test_client()
+    url = image_url(LinkedInProfile(id=1, profilePicture=PICTURES[1]))
+    assert url == f"/img/1?v={version(PICTURES[1])}"
+
+    first = client.get(url)
+    assert first.data == b"same picture bytes" and first.content_type == "image/jpeg"
+    assert first.headers["Cache-Control"] == image_proxy.CACHE_CONTROL_VERSIONED
+    second = client.get("/img/1")
+    assert second.data == first.data
+    assert second.headers["Cache-Control"] == image_proxy.CACHE_CONTROL
+    assert proxy == [PICTURES[1]]
+
+    assert client.get("/img/1", headers={"If-None-Match": first.headers["ETag"]}).status_code == 304
+    assert client.get("/img/3").status_code == 404
+
+
+def test_async_route(proxy):
+    from test_asgi import call
+
+    status, body = asyncio.run(call("GET", "/img/2"))
+    assert status == 200 and body == b"same picture bytes"
+    assert asyncio.run(call("GET", "/img/3"))[0] == 404
+
+
+def test_blobs_are_content_addressed_and_evicted(proxy, tmp_path):
+    cache = image_proxy.get_thumbnail_cache()
+    first = cache.fetch(PICTURES[1])
+    assert cache.fetch(PICTURES[2])[2] == first[2]
+    blobs = [name for _, _, names in os.walk(tmp_path / "blobs") for name in names]
+    assert blobs == [first[2]]
+
+    os.utime(cache._blob_path(first[2]), (0, 0))
+    cache.put("https://media.licdn.com/big.jpg", b"x" * 1010, "image/jpeg")
+    assert cache.get(PICTURES[1]) is None
+    assert cache.get("https://media.licdn.com/big.jpg")[0] == b"x" * 1010
+
+
+def test_profiles_page_links_to_the_proxy():
+    from jinja2 import Template
+
+    from templates import profiles_template
+
+    profiles = [LinkedInProfile(id=1, firstName="Ada", profilePicture=PICTURES[1]), LinkedInProfile(id=3, firstName="Grace")]
+    html = Template(profiles_template).render(profiles=profiles, image_url=image_url)
+    assert f'src="/img/1?v={version(PICTURES[1])}"' in html
+    assert "licdn" not in html and html.count("<img") == 1
+
+
+def test_thumbnails_fit_the_size():
+    Image = pytest.importorskip("PIL.Image")
+    source = io.BytesIO()
+    Image.new("RGB", (800, 400), "white").save(source, "JPEG")
+    body, content_type = image_proxy.thumbnail(source.getvalue(), "image/jpeg", 128)
+    assert content_type == "image/jpeg"
+    assert Image.open(io.BytesIO(body)).size == (128, 64)
+
+
+def resolving_to(address):
+    """A fake `getaddrinfo` resolving every name to `address`, and addresses to themselves."""
+    resolve = socket.getaddrinfo
+
+    def getaddrinfo(host, port, *args, **kwargs):
+        if host[0].isdigit():
+            return resolve(host, port, *args, **kwargs)
+        return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", (address, port))]
+
+    return getaddrinfo
+
+
+def test_internal_addresses_are_not_fetched(monkeypatch):
+    for url in ("http://127.0.0.1/a.jpg", "http://169.254.169.254/latest/meta-data", "http://[::1]/a.jpg", "file:///etc/passwd"):
+        with pytest.raises(ValueError):
+            image_proxy.check_url(url)
+    monkeypatch.setattr(socket, "getaddrinfo", resolving_to("10.0.0.5"))
+    with pytest.raises(ValueError, match="non-public"):
+        image_proxy.check_url("https://pictures.example.com/a.jpg")
+
+    monkeypatch.setattr(socket, "getaddrinfo", resolving_to("13.107.42.14"))
+    image_proxy.check_url("https://media.licdn.com/a.jpg", ["licdn.com"])
+    with pytest.raises(ValueError, match="IMAGE_ALLOWED_HOSTS"):
+        image_proxy.check_url("https://pictures.example.com/a.jpg", ["licdn.com"])
+
+
+class RedirectResponse:
+    is_redirect = True
+
+    def __init__(self, location):
+        self.headers = {"Location": location}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+def test_redirects_are_checked_hop_by_hop(monkeypatch):
+    requested = []
+
+    class Session:
+        def __init__(self, address):
+            self.address = address
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            pass
+
+        def get(self, url, **kwargs):
+            requested.append((url, self.address, kwargs["allow_redirects"]))
+            return RedirectResponse("http://169.254.169.254/latest/meta-data")
+
+    monkeypatch.setattr(socket, "getaddrinfo", resolving_to("13.107.42.14"))
+    monkeypatch.setattr(image_proxy, "_pinned_session", Session)
+    with pytest.raises(ValueError, match="non-public"):
+        image_proxy.download("https://media.licdn.com/a.jpg")
+    assert requested == [("https://media.licdn.com/a.jpg", "13.107.42.14", False)]
+
+
+def test_connections_go_to_the_checked_address(monkeypatch):
+    hosts = []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            hosts.append(self.headers["Host"])
+            self.send_response(200)
+            self.send_header("Content-Type", "image/png")
+            self.send_header("Content-Length", "3")
+            self.end_headers()
+            self.wfile.write(b"png")
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        port = server.server_address[1]
+        # Resolving the name again would fail: only the pinned address is connected to
+        monkeypatch.setattr(socket, "getaddrinfo", resolving_to("192.0.2.1"))
+        with image_proxy._pinned_session("127.0.0.1") as session:
+            response = session.get(f"http://pictures.example.com:{port}/a.png", timeout=5)
+        assert response.content == b"png"
+        assert hosts == [f"pictures.example.com:{port}"]
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,65 @@
+import io
+import json
+import logging
+
+import pytest
+
+import log_config
+from log_config import JsonFormatter, SamplingFilter, Truncated, configure_logging
+
+
+def record(name="strapi_model_mixin", level=logging.INFO, msg="Fetching %s", args=("messages",), **extra):
+    rec = logging.LogRecord(name, level, __file__, 1, msg, args, None)
+    rec.__dict__.update(extra)
+    return rec
+
+
+def test_truncated_formats_lazily_and_cuts_long_payloads():
+    class Exploding:
+        def __repr__(self):
+            raise AssertionError("formatted eagerly")
+
+    Truncated(Exploding())  # nothing happens until the record is written
+    assert str(Truncated({"a": 1})) == "{'a': 1}"
+    assert str(Truncated("x" * 500, limit=10)) == "xxxxxxxxxx... (500 chars)"
+
+
+def test_sampling_only_drops_hot_path_info():
+    never = SamplingFilter(0.0)
+    assert not never.filter(record())
+    assert never.filter(record(level=logging.WARNING))
+    assert never.filter(record(name="werkzeug"))
+    assert SamplingFilter(1.0).filter(record())
+
+
+def test_json_formatter_includes_extra_fields():
+    line = JsonFormatter().format(record(model="messages", id=3))
+    entry = json.loads(line)
+    assert entry["msg"] == "Fetching messages"
+    assert entry["logger"] == "strapi_model_mixin"
+    assert entry["model"] == "messages" and entry["id"] == 3
+
+
+@pytest.fixture
+def queued_logging(monkeypatch):
+    monkeypatch.setattr(log_config, "_listener", None)
+    root = logging.getLogger()
+    handlers, level = root.handlers[:], root.level
+    monkeypatch.setenv("LOG_FORMAT", "json")
+    stream = io.StringIO()
+    configure_logging(stream)
+    yield stream
+    log_config._stop()
+    root.handlers[:] = handlers
+    root.setLevel(level)
+
+
+def test_records_go_through_the_queue(queued_logging):
+    logging.getLogger("strapi_model_mixin").info(
+        "Creating entry in %s with data: %s", "messages", Truncated({"content": "x" * 1000}),
+        extra={"model": "messages"},
+    )
+    log_config._stop()  # drains the queue
+    entry = json.loads(queued_logging.getvalue().splitlines()[-1])
+    assert entry["model"] == "messages"
+    assert entry["msg"].endswith("chars)") and len(entry["msg"]) < 300
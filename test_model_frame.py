@@ -0,0 +1,82 @@
+import pytest
+
+import strapi_model_mixin
+from model_frame import ModelFrame
+from models.linkedin_profile import LinkedInProfile
+
+ENTRIES = [
+    {
+        "id": i,
+        "attributes": {
+            "firstName": first,
+            "lastName": last,
+            "entityUrn": f"urn:li:fs_salesProfile:(ACw{i},NAME_SEARCH,x)",
+            "createdAt": f"2023-0{i}-01T00:00:00.000Z",
+            "rawLinkedInField": "x" * 1000,
+        },
+    }
+    for i, (first, last) in enumerate([("Ada", "Lovelace"), ("Alan", "Turing"), ("Grace", None)], start=1)
+]
+
+
+class FakeClient:
+    def get_entries(self, plural_api_id, **kwargs):
+        return {"data": ENTRIES, "meta": {}}
+
+
+@pytest.fixture
+def frame(monkeypatch):
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", FakeClient())
+    return LinkedInProfile.get_all(as_frame=True)
+
+
+def test_get_all_as_frame_keeps_annotated_fields(frame):
+    assert isinstance(frame, ModelFrame)
+    assert len(frame) == 3
+    assert frame.fields[0] == "id" and "rawLinkedInField" not in frame.fields
+    assert frame["firstName"] == ["Ada", "Alan", "Grace"]
+    assert frame[0].profileLink == "https://www.linkedin.com/sales/lead/ACw1,NAME_SEARCH,x"
+    assert frame[-1].lastName is None
+    with pytest.raises(AttributeError):
+        frame[0].rawLinkedInField
+
+
+def test_filter_sort_select(frame):
+    assert frame.filter({"firstName": {"$startsWith": "A"}})["id"] == [1, 2]
+    assert frame.filter("lastName='Turing'")["id"] == [2]
+    assert frame.filter({"$or": [{"id": {"$eq": 3}}, {"lastName": {"$null": True}}]})["id"] == [3]
+    assert frame.filter([True, False, True])["id"] == [1, 3]
+    assert frame.filter(lambda row: row.id > 1)["id"] == [2, 3]
+
+    assert frame.sort("lastName", reverse=True)["id"] == [2, 1, 3]
+    assert frame[1:]["id"] == [2, 3]
+    assert frame.select("id", "firstName").records()[0] == {"id": 1, "firstName": "Ada"}
+
+
+def test_rows_hydrate_to_objects(frame):
+    profile = frame[1].to_object()
+    assert isinstance(profile, LinkedInProfile)
+    assert profile.id == 2 and profile.lastName == "Turing"
+    assert [p.id for p in frame.to_objects()] == [1, 2, 3]
+
+
+def test_to_numpy_converts_numeric_columns(frame):
+    numpy = pytest.importorskip("numpy")
+    converted = frame.to_numpy()
+    assert isinstance(converted["id"], numpy.ndarray)
+    assert converted.filter({"id": {"$gt": 1}})["firstName"] == ["Alan", "Grace"]
+
+
+def test_whole_collection_frames_are_built_page_by_page(monkeypatch):
+    from test_strapi_cursor import FakeCollectionClient
+
+    rows = [{"id": i, "attributes": {"firstName": f"name {i % 3}", "rawLinkedInField": "x"}} for i in range(1, 251)]
+    fake = FakeCollectionClient(rows)
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", fake)
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", None)
+
+    frame = LinkedInProfile.get_all(get_all=True, as_frame=True)
+    assert frame["id"] == list(range(1, 251))
+    assert frame["firstName"][:3] == ["name 1", "name 2", "name 0"]
+    assert [call["pagination"]["limit"] for call in fake.calls] == [100, 100, 100]
+    assert frame.next_cursor is None
@@ -0,0 +1,75 @@
+import pytest
+from pystrapi.errors import NotFoundError
+
+import strapi_model_mixin
+from models.world import World
+from negative_cache import NegativeCache
+
+
+class SparseClient:
+    """Knows only the ids in `entries`; every other id is a 404."""
+
+    def __init__(self):
+        self.entries = {1: {"guid": "w1"}}
+        self.calls = 0
+
+    def get_entry(self, plural_api_id, document_id, **kwargs):
+        self.calls += 1
+        if document_id not in self.entries:
+            raise NotFoundError("Not Found")
+        return {"data": {"id": document_id, "attributes": self.entries[document_id]}, "meta": {}}
+
+    def create_entry(self, plural_api_id, data):
+        document_id = max(self.entries) + 1
+        self.entries[document_id] = data
+        return {"data": {"id": document_id, "attributes": data}, "meta": {}}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    fake = SparseClient()
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", fake)
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", None)
+    monkeypatch.setattr(strapi_model_mixin, "_negative_cache", NegativeCache(ttl=60))
+    return fake
+
+
+def test_misses_are_remembered_until_created(fake_client):
+    assert World.get_one(2) is None
+    assert World.get_one(2) is None
+    with pytest.raises(NotFoundError):
+        World.fetch_one(2)
+    assert fake_client.calls == 1
+
+    World.create({"guid": "w2"})
+    assert World.get_one(2).guid == "w2"
+    assert fake_client.calls == 2
+    assert World.get_one(1).guid == "w1"
+
+
+def test_detail_route_answers_404_from_memory(fake_client):
+    from app import app
+
+    client = app.test_client()
+    for _ in range(3):
+        response = client.get("/worlds/12345")
+        assert response.status_code == 404
+        assert response.get_json()["error"]["name"] == "NotFoundError"
+    assert fake_client.calls == 1
+    assert strapi_model_mixin.get_negative_cache().hits == 2
+
+
+def test_entries_expire_and_are_bounded(monkeypatch):
+    clock = [0.0]
+    monkeypatch.setattr("negative_cache.time.monotonic", lambda: clock[0])
+    cache = NegativeCache(ttl=5, max_entries=2)
+    for _id in (1, 2, 3):
+        cache.add("worlds", _id, NotFoundError("Not Found"))
+    assert len(cache) == 2 and cache.get("worlds", 1) is None
+    assert isinstance(cache.get("worlds", "2"), NotFoundError)
+
+    clock[0] = 6
+    assert cache.get("worlds", 2) is None
+    disabled = NegativeCache(ttl=0)
+    disabled.add("worlds", 1, NotFoundError())
+    assert len(disabled) == 0
@@ -0,0 +1,80 @@
+import gzip
+import json
+
+import pytest
+
+import response_format
+import strapi_model_mixin
+from response_format import compact, compact_entry, dumps, loads, use_encoder
+
+BLOG = {
+    "id": 5,
+    "attributes": {
+        "text": "Notes",
+        "summary": None,
+        "seo": {"title": "Notes", "image": None},
+        "author": {"data": {"id": 9, "attributes": {"name": "Ada", "email": None, "worlds": {"data": [{"id": 3, "attributes": {}}]}}}},
+        "worlds": {"data": [{"id": 3, "attributes": {"guid": "w3"}}, {"id": 4, "attributes": {"guid": "w4"}}]},
+        "cover": {"data": None},
+    },
+}
+
+
+class BlogClient:
+    def get_entries(self, plural_api_id, **kwargs):
+        return {"data": [dict(BLOG, id=i) for i in range(1, 41)], "meta": {"pagination": {"total": 40}}}
+
+    def get_entry(self, plural_api_id, document_id, **kwargs):
+        return {"data": dict(BLOG, id=document_id), "meta": {}}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from app import app
+
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", BlogClient())
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", None)
+    return app.test_client()
+
+
+def test_compact_entry_flattens_relations_and_drops_nulls():
+    assert compact_entry(BLOG) == {"id": 5, "text": "Notes", "seo": {"title": "Notes"}, "author": 9, "worlds": [3, 4]}
+    inlined = compact_entry(BLOG, inline=True)
+    assert inlined["author"] == {"id": 9, "name": "Ada", "worlds": [3]}
+    assert inlined["worlds"] == [{"id": 3, "guid": "w3"}, {"id": 4, "guid": "w4"}]
+    assert "cover" not in inlined
+
+
+def test_compact_keeps_non_empty_meta():
+    assert compact({"data": [BLOG], "meta": {}}) == {"data": [compact_entry(BLOG)]}
+    assert compact({"data": None, "meta": {"next_cursor": None, "stale": True}})["meta"]["stale"]
+
+
+@pytest.mark.parametrize("name", sorted(response_format.ENCODERS))
+def test_encoders_round_trip(name, monkeypatch):
+    # Restored after the test
+    monkeypatch.setattr(response_format, "_dumps", response_format._dumps)
+    monkeypatch.setattr(response_format, "_loads", response_format._loads)
+    use_encoder(name)
+    assert loads(dumps(BLOG)) == BLOG
+    with pytest.raises(ValueError):
+        use_encoder("yaml")
+
+
+def test_routes_serve_compact_and_compressed(client):
+    strapi = client.get("/blogs")
+    assert strapi.get_json()["data"][0]["attributes"]["text"] == "Notes"
+    assert "Content-Encoding" not in strapi.headers
+
+    compact_body = client.get("/blogs/7?format=compact&relations=inline").get_json()
+    assert compact_body == {"data": compact_entry(dict(BLOG, id=7), inline=True)}
+
+    zipped = client.get("/blogs?format=compact", headers={"Accept-Encoding": "gzip, br"})
+    assert zipped.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in zipped.headers["Vary"]
+    body = json.loads(gzip.decompress(zipped.data))
+    assert body["data"][0] == {"id": 1, "text": "Notes", "seo": {"title": "Notes"}, "author": 9, "worlds": [3, 4]}
+    assert body["meta"]["pagination"]["total"] == 40
+
+    assert client.get("/blogs?format=xml").status_code == 400
+    assert client.get("/blogs?format=compact&relations=all").status_code == 400
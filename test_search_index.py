@@ -0,0 +1,145 @@
+import asyncio
+import time
+
+import pytest
+
+import search_index
+import strapi_model_mixin
+from models.linkedin_profile import LinkedInProfile
+from search_index import get_index, tokenize
+from test_strapi_cursor import FakeCollectionClient
+
+PROFILES = [
+    {"id": 1, "attributes": {"firstName": "Ada", "lastName": "Lovelace", "summary": "Mathematician and writer", "profileLink": "x"}},
+    {"id": 2, "attributes": {"firstName": "Alan", "lastName": "Turing", "summary": "Mathematician, computer scientist", "profileLink": "x"}},
+    {"id": 3, "attributes": {"firstName": "Grace", "lastName": "Hopper", "summary": "Computer scientist and Navy admiral", "profileLink": "x"}},
+]
+
+
+class WritableCollectionClient(FakeCollectionClient):
+    def update_entry(self, plural_api_id, document_id, data):
+        return {"data": {"id": document_id, "attributes": data}, "meta": {}}
+
+    def delete_entry(self, plural_api_id, document_id):
+        return {"data": {"id": document_id, "attributes": {}}, "meta": {}}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    fake = WritableCollectionClient([dict(p) for p in PROFILES])
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", fake)
+    monkeypatch.setattr(search_index, "_indexes", {})
+    return fake
+
+
+def ids(hits):
+    return [hit["id"] for hit in hits]
+
+
+def built_index(model):
+    index = get_index(model)
+    assert index.wait_until_ready(2)
+    return index
+
+
+def test_tokenize_folds_case_and_accents():
+    assert tokenize("Émile Zola, l'Assommoir!") == ["emile", "zola", "l", "assommoir"]
+
+
+def test_ranks_with_bm25_and_prefixes(fake_client):
+    index = built_index(LinkedInProfile)
+    hits, total = index.search("mathematician")
+    assert set(ids(hits)) == {1, 2} and total == 2
+    assert set(ids(index.search("computer scientist")[0])) == {2, 3}
+    assert ids(index.search("lov")[0]) == [1]
+    assert ids(index.search("hopper navy")[0]) == [3]
+    assert index.search("")[0] == []
+    assert len(fake_client.calls) == 1
+    assert get_index(LinkedInProfile) is index
+
+
+def test_writes_update_the_index(fake_client):
+    index = built_index(LinkedInProfile)
+    LinkedInProfile.update(1, {"summary": "Poet"})
+    assert ids(index.search("poet")[0]) == [1]
+    assert 1 not in ids(index.search("mathematician")[0])
+    assert ids(index.search("lovelace")[0]) == [1]
+
+    LinkedInProfile.delete_one(2)
+    assert index.search("turing")[0] == []
+
+
+def test_search_route(fake_client):
+    from app import app
+
+    built_index(LinkedInProfile)
+    body = app.test_client().get("/linked-in-profiles/search?q=grace&limit=5").get_json()
+    assert ids(body["data"]) == [3]
+    assert body["data"][0]["attributes"]["lastName"] == "Hopper"
+    assert body["meta"]["total"] == 1
+    assert app.test_client().get("/linked-in-profiles/search?q=grace&limit=five").status_code == 400
+
+
+def test_only_models_with_search_fields_get_the_route():
+    from app import app
+
+    rules = {rule.rule for rule in app.url_map.iter_rules()}
+    assert {"/blogs/search", "/linked-in-profiles/search"} <= rules
+    assert "/messages/search" not in rules
+
+
+def test_index_build_ignores_the_request_deadline(monkeypatch):
+    from app import app
+    from test_strapi_export import SlowCollectionClient
+
+    rows = [dict(p, id=i) for i in range(1, 601) for p in PROFILES[:1]]
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", SlowCollectionClient(rows, 0.05))
+    monkeypatch.setattr(search_index, "_indexes", {})
+    client = app.test_client()
+    response = client.get("/linked-in-profiles/search?q=ada", headers={"X-Request-Timeout": "0.1"})
+    assert response.status_code == 503 and response.headers["Retry-After"] == "5"
+    assert response.get_json()["error"]["name"] == "IndexNotReady"
+
+    assert search_index._indexes["linked-in-profiles"].wait_until_ready(5)
+    response = client.get("/linked-in-profiles/search?q=ada", headers={"X-Request-Timeout": "0.1"})
+    assert response.status_code == 200
+    assert response.get_json()["meta"]["total"] == 600
+
+
+def test_indexes_build_in_the_background_per_model(monkeypatch):
+    from models.blog import Blog
+    from test_asgi import respond
+    from test_strapi_export import SlowCollectionClient
+
+    class SplitClient:
+        """Profiles answer slowly, blogs at once."""
+
+        def __init__(self):
+            self.profiles = SlowCollectionClient([dict(p) for p in PROFILES], 0.5)
+            self.blogs = WritableCollectionClient([{"id": 1, "attributes": {"text": "Notes on engines"}}])
+
+        def get_entries(self, plural_api_id, **kwargs):
+            client = self.profiles if plural_api_id == "linked-in-profiles" else self.blogs
+            return client.get_entries(plural_api_id, **kwargs)
+
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", SplitClient())
+    monkeypatch.setattr(search_index, "_indexes", {})
+    started = time.monotonic()
+    status, headers, _ = asyncio.run(respond("GET", "/linked-in-profiles/search", b"q=ada"))
+    assert status == 503 and headers["retry-after"] == "5"
+    assert built_index(Blog).search("engine")[0][0]["id"] == 1
+    assert time.monotonic() - started < 0.4
+    assert built_index(LinkedInProfile).search("ada")[1] == 1
+
+
+def test_failed_builds_are_retried(monkeypatch):
+    class BrokenClient:
+        def get_entries(self, plural_api_id, **kwargs):
+            raise ValueError("bad response")
+
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", BrokenClient())
+    monkeypatch.setattr(search_index, "_indexes", {})
+    index = get_index(LinkedInProfile)
+    assert not index.wait_until_ready(0.2)
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", WritableCollectionClient([dict(p) for p in PROFILES]))
+    assert get_index(LinkedInProfile) is index and index.wait_until_ready(2)
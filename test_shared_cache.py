@@ -0,0 +1,185 @@
+import json
+import multiprocessing
+import os
+import threading
+import time
+
+import pytest
+
+import strapi_model_mixin
+from models.message import Message
+from cache_invalidation import UPDATE, _patch_entry, apply_change
+from models.author import Author
+from models.blog import Blog
+from shared_cache import SharedCache
+
+
+class CountingClient:
+    def __init__(self):
+        self.calls = 0
+
+    def get_entries(self, plural_api_id, **kwargs):
+        self.calls += 1
+        return {"data": [{"id": 1, "attributes": {"content": "Hello World!"}}], "meta": {}}
+
+    def get_entry(self, plural_api_id, document_id, **kwargs):
+        self.calls += 1
+        return {"data": {"id": document_id, "attributes": {"content": "Hello World!"}}, "meta": {}}
+
+    def update_entry(self, plural_api_id, document_id, data):
+        self.calls += 1
+        return {"data": {"id": document_id, "attributes": data}, "meta": {}}
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path), default_ttl=60)
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def counting_client(monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", client)
+    return client
+
+
+def test_set_get_expire_delete(tmp_path):
+    cache = SharedCache(str(tmp_path))
+    cache.set(("worlds", "one", "1"), "k", b'{"a": 1}', ttl=0.05)
+    assert cache.get(("worlds", "one", "1"), "k") == b'{"a": 1}'
+    time.sleep(0.06)
+    assert cache.get(("worlds", "one", "1"), "k") is None
+
+    cache.set(("worlds", "one", "1"), "k", b"x")
+    cache.set(("worlds", "one", "2"), "k", b"y")
+    cache.delete(("worlds", "one", "1"))
+    assert cache.get(("worlds", "one", "1"), "k") is None
+    assert cache.get(("worlds", "one", "2"), "k") == b"y"
+
+
+def test_path_parts_stay_inside_directory(tmp_path):
+    cache = SharedCache(str(tmp_path / "cache"))
+    cache.set(("..", "one", "../../etc"), "k", b"x")
+    assert not (tmp_path / "etc").exists()
+    assert cache.get(("..", "one", "../../etc"), "k") == b"x"
+
+
+def test_fetches_hit_the_cache(cache, counting_client):
+    first = Message.fetch_all(sort=["id"])
+    second = Message.fetch_all(sort=["id"])
+    assert first == second
+    assert counting_client.calls == 1
+
+    raw = Message.fetch_one(1, raw=True)
+    assert json.loads(raw)["data"]["id"] == 1
+    assert Message.fetch_one(1, raw=True) == raw
+    assert counting_client.calls == 2
+
+
+def test_updates_patch_cached_entries(cache, counting_client):
+    Message.fetch_all()
+    Message.fetch_one(1)
+    Message.update(1, {"content": "changed"})
+    assert Message.fetch_all()["data"][0]["attributes"]["content"] == "changed"
+    assert Message.fetch_one(1)["data"]["attributes"]["content"] == "changed"
+    assert counting_client.calls == 3
+
+
+def _fetch_in_child(directory, queue):
+    strapi_model_mixin._shared_cache = SharedCache(directory)
+    client = CountingClient()
+    strapi_model_mixin.StrapiModelMixin.client = client
+    Message.fetch_all(sort=["content"])
+    queue.put(client.calls)
+
+
+def test_entries_are_shared_across_processes(tmp_path, cache, counting_client):
+    ctx = multiprocessing.get_context("fork")
+    queue = ctx.Queue()
+    child = ctx.Process(target=_fetch_in_child, args=(str(tmp_path), queue))
+    child.start()
+    child.join()
+    assert queue.get() == 1
+    Message.fetch_all(sort=["content"])
+    assert counting_client.calls == 0
+
+
+def test_route_serves_cached_bytes(cache, counting_client):
+    from app import app
+
+    client = app.test_client()
+    first = client.get("/messages/1")
+    second = client.get("/messages/1")
+    assert first.data == second.data
+    assert second.mimetype == "application/json"
+    assert counting_client.calls == 1
+
+
+def test_prune_drops_expired_entries_and_unused_locks(tmp_path):
+    cache = SharedCache(str(tmp_path))
+    cache.set(("worlds", "one", "1"), "old", b"x", ttl=-1)
+    cache.set(("worlds", "one", "1"), "new", b"y")
+    with cache.lock(("worlds", "all"), "held"):
+        with cache.lock(("worlds", "all"), "free"):
+            pass
+        removed = cache.prune()
+        assert removed["expired"] == 1 and removed["locks"] == 1
+        assert (tmp_path / "worlds" / "all").exists()
+        assert len(list((tmp_path / "worlds" / "all").glob("*.lock"))) == 1
+    assert cache.get(("worlds", "one", "1"), "new") == b"y"
+
+
+def test_prune_keeps_the_cache_within_its_budget(tmp_path):
+    cache = SharedCache(str(tmp_path), max_bytes=3000)
+    for number in range(5):
+        cache.set(("worlds", "one", str(number)), "k", b"x" * 1000)
+        os.utime(cache._path(("worlds", "one", str(number)), "k"), (number, number))
+    assert cache.prune()["evicted"] == 3
+    assert [cache.get(("worlds", "one", str(n)), "k") is not None for n in range(5)] == [False, False, False, True, True]
+
+
+def test_lock_survives_its_file_being_pruned(tmp_path):
+    cache = SharedCache(str(tmp_path))
+    with cache.lock(("worlds", "all"), "k"):
+        pass
+    cache.prune()
+    with cache.lock(("worlds", "all"), "k") as acquired:
+        assert acquired
+        with cache.lock(("worlds", "all"), "k", blocking=False) as again:
+            assert not again
+
+
+def test_writes_start_pruning_in_the_background(tmp_path):
+    cache = SharedCache(str(tmp_path), prune_interval=0)
+    cache.set(("worlds", "one", "1"), "old", b"x", ttl=-1)
+    cache.set(("worlds", "one", "1"), "new", b"y")
+    deadline = time.monotonic() + 2
+    while len(list(cache.entry_paths(("worlds", "one", "1")))) > 1:
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+
+def test_related_entries_are_dropped_with_slotted_models(tmp_path, monkeypatch):
+    for model in (Author, Blog):
+        monkeypatch.setitem(strapi_model_mixin.class_registry, model.__name__, model.slotted())
+    cache = SharedCache(str(tmp_path))
+    blog = {"data": {"id": 3, "attributes": {"text": "Notes", "author": {"data": {"id": 9, "attributes": {"name": "Ada"}}}}}}
+    cache.set(("blogs", "one", "3"), "k", json.dumps(blog).encode())
+    apply_change(cache, Author, [Blog.slotted(), Author.slotted()], UPDATE, 9, {"name": "Ada L."})
+    assert cache.get(("blogs", "one", "3"), "k") is None
+
+
+def test_patches_wait_for_the_entry_lock(tmp_path):
+    cache = SharedCache(str(tmp_path))
+    cache.set(("messages", "one", "1"), "k", b'{"data": {"id": 1, "attributes": {"content": "old"}}}')
+    path = cache._path(("messages", "one", "1"), "k")
+    with cache.lock(("messages", "one", "1"), "k"):
+        patch = threading.Thread(target=_patch_entry, args=(cache, path, "1", {"content": "new"}))
+        patch.start()
+        patch.join(0.1)
+        assert patch.is_alive()
+        cache.set(("messages", "one", "1"), "k", b'{"data": {"id": 1, "attributes": {"content": "refilled"}}}')
+    patch.join(2)
+    assert json.loads(cache.get(("messages", "one", "1"), "k"))["data"]["attributes"]["content"] == "new"
@@ -0,0 +1,82 @@
+import pytest
+
+import strapi_model_mixin
+from models.author import Author
+from models.blog import Blog
+from models.linkedin_profile import LinkedInProfile
+from models.message import Message
+from models.world import World
+
+BLOG = {
+    "id": 3,
+    "attributes": {
+        "text": "Notes",
+        "author": {"data": {"id": 9, "attributes": {"name": "Ada"}}},
+        "worlds": {"data": [{"id": 1, "attributes": {"guid": "w1"}}]},
+    },
+}
+
+
+class FakeClient:
+    def get_entries(self, plural_api_id, **kwargs):
+        return {"data": [BLOG], "meta": {}}
+
+
+@pytest.fixture
+def slotted(monkeypatch):
+    monkeypatch.setenv("STRAPI_SLOTTED_MODELS", "true")
+    strapi_model_mixin.load_settings.cache_clear()
+    for model in (Message, World, Author, Blog):
+        monkeypatch.setitem(strapi_model_mixin.class_registry, model.__name__, model.slotted())
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", FakeClient())
+    yield
+    strapi_model_mixin.load_settings.cache_clear()
+
+
+def test_slotted_class_mirrors_the_model():
+    cls = World.slotted()
+    assert cls is World.slotted() and cls.slotted() is cls
+    assert cls.__name__ == "World" and cls.model_path == "worlds"
+    world = cls(id=1, guid="g")
+    assert not hasattr(world, "__dict__")
+    assert world.blogs == [] and world.blogs is not cls().blogs
+    assert world == cls(id=1, guid="g")
+
+
+def test_unknown_attributes_go_to_extra():
+    profile = LinkedInProfile.slotted()(id=1, entityUrn="urn:li:fs_salesProfile:(ACw1,NAME_SEARCH,x)", headline="CEO")
+    assert profile.profileLink == "https://www.linkedin.com/sales/lead/ACw1,NAME_SEARCH,x"
+    assert profile.extra == {"entityUrn": "urn:li:fs_salesProfile:(ACw1,NAME_SEARCH,x)", "headline": "CEO"}
+    assert Message.slotted()(content="hi").extra is None
+    with pytest.raises(AttributeError):
+        profile.headline
+
+
+def test_get_all_hydrates_slotted_objects(slotted):
+    blog = Blog.get_all()[0]
+    assert type(blog) is Blog.slotted()
+    assert type(blog.author) is Author.slotted() and blog.author.name == "Ada"
+    assert [type(w) for w in blog.worlds] == [World.slotted()]
+
+
+def test_upsert_keeps_undeclared_fields_in_extra(monkeypatch):
+    class WritingClient:
+        def create_entry(self, plural_api_id, data):
+            data.pop("id", None)
+            attributes = {**data, "entityUrn": "urn:li:fs_salesProfile:(ACw1,NAME_SEARCH,x)", "locale": "en"}
+            return {"data": {"id": 7, "attributes": attributes}, "meta": {}}
+
+        def update_entry(self, plural_api_id, document_id, data):
+            return {"data": {"id": document_id, "attributes": {**data, "locale": "fr"}}, "meta": {}}
+
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", WritingClient())
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", None)
+    profile = LinkedInProfile.slotted()(firstName="Ada")
+    assert profile.upsert()
+    assert profile.id == 7 and profile.firstName == "Ada"
+    assert profile.extra == {"entityUrn": "urn:li:fs_salesProfile:(ACw1,NAME_SEARCH,x)", "locale": "en"}
+
+    profile.lastName = "Lovelace"
+    assert profile.upsert()
+    assert profile.lastName == "Lovelace" and profile.extra["locale"] == "fr"
+    assert profile.extra["entityUrn"].startswith("urn:li")
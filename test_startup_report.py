@@ -0,0 +1,47 @@
+import subprocess
+
+from click.testing import CliRunner
+
+import startup_report
+from startup_report import group_by_package, parse_importtime
+
+IMPORTTIME = """import time: self [us] | cumulative | imported package
+import time:       120 |        120 |   flask.json
+import time:       300 |        420 | flask
+import time:       500 |        500 |     pystrapi.errors
+import time:       250 |        750 |   pystrapi.strapi
+import time:      1000 |       1750 | pystrapi
+"""
+PROBE_OUTPUT = "import app: 12.0 ms\ncreate_app(): 30.5 ms\nfirst Strapi client: 4.2 ms\n"
+
+
+def run_with(monkeypatch, returncode, stdout="", stderr=""):
+    def run(args, **kwargs):
+        assert args[1:3] == ["-X", "importtime"]
+        return subprocess.CompletedProcess(args, returncode, stdout, stderr)
+
+    monkeypatch.setattr(startup_report.subprocess, "run", run)
+    return CliRunner().invoke(startup_report.startup_report, ["--top", "1"])
+
+
+def test_parse_importtime_and_group():
+    rows = parse_importtime(IMPORTTIME)
+    assert rows[0] == ("flask.json", 120, 120, 1)
+    assert rows[-1] == ("pystrapi", 1000, 1750, 0)
+    assert group_by_package(rows) == {"flask": 420, "pystrapi": 1750}
+
+
+def test_report_shows_steps_and_top_imports(monkeypatch):
+    result = run_with(monkeypatch, 0, PROBE_OUTPUT, IMPORTTIME)
+    assert result.exit_code == 0
+    assert "create_app(): 30.5 ms" in result.output
+    assert "modules imported: 5" in result.output
+    assert "1.8 ms  pystrapi" in result.output and "flask" not in result.output.split("Top 1 top-level")[1]
+
+
+def test_report_fails_with_the_probe_error(monkeypatch):
+    result = run_with(monkeypatch, 1, stderr=IMPORTTIME + "Traceback (most recent call last):\nModuleNotFoundError: No module named 'flask_cors'\n")
+    assert result.exit_code == 1
+    assert "No module named 'flask_cors'" in result.output
+
+    assert "probe exited with status 1" in run_with(monkeypatch, 1).output
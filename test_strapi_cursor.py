@@ -0,0 +1,110 @@
+import pytest
+
+import strapi_model_mixin
+from models.message import Message
+from strapi_cursor import CursorError, CursorPage, decode_cursor, encode_cursor
+from strapi_filters import compile_spec
+
+
+class FakeCollectionClient:
+    """
+    Serves get_entries from an in-memory collection, applying filters, sort and start/limit,
+    with the limit capped at `max_limit` like Strapi's `api.rest.maxLimit`.
+    """
+
+    def __init__(self, rows, max_limit=100):
+        self.rows = rows
+        self.max_limit = max_limit
+        self.calls = []
+
+    def get_entries(self, plural_api_id, sort=None, filters=None, pagination=None, **kwargs):
+        self.calls.append(dict(sort=sort, filters=filters, pagination=pagination))
+        rows = compile_spec(filters).filter(self.rows)
+        for key in reversed(sort or []):
+            field, _, direction = key.partition(":")
+            rows.sort(
+                key=lambda r: r["id"] if field == "id" else r["attributes"][field],
+                reverse=direction == "desc",
+            )
+        start = pagination["start"]
+        return {"data": rows[start : start + min(pagination["limit"], self.max_limit)], "meta": {}}
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    rows = [
+        {"id": i, "attributes": {"content": f"message {i % 7}", "createdAt": f"2023-01-{1 + i % 5:02d}"}}
+        for i in range(1, 251)
+    ]
+    fake = FakeCollectionClient(rows)
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", fake)
+    return fake
+
+
+def walk(**kwargs):
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = Message.get_all(cursor=cursor, page_size=40, **kwargs)
+        assert isinstance(page, CursorPage)
+        seen.extend(page)
+        cursor = page.next_cursor
+    return seen
+
+
+def test_walks_collection_by_id(fake_client):
+    seen = walk()
+    assert [m.id for m in seen] == list(range(1, 251))
+    assert all(call["pagination"]["start"] == 0 for call in fake_client.calls)
+    assert len(fake_client.calls) == 7
+
+
+def test_walks_with_ties_on_sort_field(fake_client):
+    seen = walk(sort=["createdAt:desc"])
+    assert len(seen) == len({m.id for m in seen}) == 250
+    keys = [(m.createdAt, m.id) for m in seen]
+    assert keys == sorted(keys, reverse=True)
+
+
+def test_combines_with_filters(fake_client):
+    seen = walk(filters={"content": {"$eq": "message 3"}})
+    assert [m.id for m in seen] == [i for i in range(1, 251) if i % 7 == 3]
+
+
+def test_cursor_must_match_sort():
+    cursor = encode_cursor("createdAt", "asc", "2023-01-01", 4)
+    assert decode_cursor(cursor, "createdAt", "asc") == ("2023-01-01", 4)
+    with pytest.raises(CursorError):
+        decode_cursor(cursor, "id", "asc")
+    with pytest.raises(CursorError):
+        decode_cursor("not-a-cursor", "id", "asc")
+
+
+def test_cursor_route(fake_client):
+    from app import app
+
+    client = app.test_client()
+    first = client.get("/messages?cursor=&page_size=100").get_json()
+    assert len(first["data"]) == 100
+    second = client.get(f"/messages?cursor={first['meta']['next_cursor']}&page_size=100").get_json()
+    assert second["data"][0]["id"] == 101
+    assert client.get("/messages?cursor=garbage").status_code == 400
+    assert client.get("/messages?cursor=&page_size=ten").status_code == 400
+    assert client.get("/messages?cursor=&page_size=0").get_json()["error"]["name"] == "CursorError"
+
+
+def test_pages_stay_within_strapis_max_limit(fake_client):
+    page = Message.get_all(cursor="")
+    assert len(page) == 100 and page.next_cursor is not None
+    assert len(walk()) == 250
+
+    seen, cursor = [], ""
+    while cursor is not None:
+        page = Message.get_all(cursor=cursor, page_size=500)
+        seen.extend(page)
+        cursor = page.next_cursor
+    assert [m.id for m in seen] == list(range(1, 251))
+    assert all(call["pagination"]["limit"] == 100 for call in fake_client.calls[-3:])
+
+    # A collection ending on a page boundary costs one more, empty, page
+    fake_client.rows = fake_client.rows[:200]
+    assert len(walk()) == 200 and len(Message.get_all(cursor="", page_size=200)) == 100
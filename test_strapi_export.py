@@ -0,0 +1,134 @@
+import csv
+import gzip
+import io
+import json
+import time
+
+import pytest
+from pystrapi.errors import ValidationError
+
+import strapi_model_mixin
+from hedged_reads import DeadlineExceeded, remaining
+from strapi_export import flatten_entry
+from test_strapi_cursor import FakeCollectionClient
+
+
+@pytest.fixture
+def fake_client(monkeypatch):
+    rows = [
+        {"id": i, "attributes": {"content": f"message {i % 7}", "createdAt": f"2023-01-{1 + i % 5:02d}"}}
+        for i in range(1, 251)
+    ]
+    fake = FakeCollectionClient(rows)
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", fake)
+    return fake
+
+
+@pytest.fixture
+def client():
+    from app import app
+
+    return app.test_client()
+
+
+def test_flatten_entry():
+    entry = {
+        "id": 3,
+        "attributes": {
+            "text": "Notes",
+            "author": {"data": {"id": 9, "attributes": {"name": "Ada"}}},
+            "worlds": {"data": [{"id": 1, "attributes": {}}, {"id": 2, "attributes": {}}]},
+            "cover": {"data": None},
+            "seo": {"title": "T", "image": {"url": "/a.png"}},
+        },
+    }
+    assert flatten_entry(entry) == {
+        "id": 3,
+        "text": "Notes",
+        "author.id": 9,
+        "author.name": "Ada",
+        "worlds": [1, 2],
+        "cover": None,
+        "seo.title": "T",
+        "seo.image.url": "/a.png",
+    }
+
+
+def test_ndjson_export_streams_every_page(client, fake_client):
+    response = client.get("/messages/export?page_size=100")
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.data.splitlines()]
+    assert [row["id"] for row in rows] == list(range(1, 251))
+    assert rows[0] == {"id": 1, "content": "message 1", "createdAt": "2023-01-02"}
+    assert len(fake_client.calls) == 3
+    assert all(call["pagination"]["limit"] == 100 for call in fake_client.calls)
+
+
+@pytest.mark.parametrize("query", ["", "?page_size=1000"])
+def test_export_is_not_truncated_at_strapis_max_limit(client, fake_client, query):
+    fake_client.rows += [{"id": i, "attributes": {"content": "more"}} for i in range(251, 351)]
+    rows = [json.loads(line) for line in client.get(f"/messages/export{query}").data.splitlines()]
+    assert [row["id"] for row in rows] == list(range(1, 351))
+
+
+def test_csv_export_with_fields_filters_and_gzip(client, fake_client):
+    response = client.get(
+        "/messages/export?format=csv&fields=content&filters[content][$eq]=message 3&sort=createdAt:desc",
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert response.headers["Content-Encoding"] == "gzip"
+    rows = list(csv.DictReader(io.StringIO(gzip.decompress(response.data).decode())))
+    assert set(rows[0]) == {"id", "content"}
+    assert len(rows) == len([i for i in range(1, 251) if i % 7 == 3])
+    assert all(row["content"] == "message 3" for row in rows)
+
+
+def test_export_rejects_bad_requests(client, fake_client):
+    assert client.get("/messages/export?format=xml").status_code == 400
+    assert client.get("/messages/export?sort=id:sideways").status_code == 400
+
+
+class SlowCollectionClient(FakeCollectionClient):
+    """Takes `delay` per page and, like HedgedConnector, refuses to call once the deadline passed."""
+
+    def __init__(self, rows, delay):
+        super().__init__(rows)
+        self.delay = delay
+
+    def get_entries(self, plural_api_id, **kwargs):
+        left = remaining()
+        if left is not None and left <= 0:
+            raise DeadlineExceeded("Request deadline passed before sending GET")
+        time.sleep(self.delay)
+        return super().get_entries(plural_api_id, **kwargs)
+
+
+def test_long_export_is_not_cut_off_by_the_request_deadline(client, monkeypatch):
+    rows = [{"id": i, "attributes": {"content": f"message {i}"}} for i in range(1, 501)]
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", SlowCollectionClient(rows, 0.05))
+    response = client.get("/messages/export?page_size=50", headers={"X-Request-Timeout": "0.1"})
+    assert response.status_code == 200
+    assert len(response.data.splitlines()) == 500
+
+
+class FailingCollectionClient(FakeCollectionClient):
+    """Fails on the second page."""
+
+    def get_entries(self, plural_api_id, **kwargs):
+        if self.calls:
+            raise ValidationError("Strapi went away")
+        return super().get_entries(plural_api_id, **kwargs)
+
+
+def test_failed_export_is_marked_incomplete(client, monkeypatch):
+    rows = [{"id": i, "attributes": {"content": f"message {i}"}} for i in range(1, 201)]
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", FailingCollectionClient(rows))
+
+    response = client.get("/messages/export?page_size=100", headers={"Accept-Encoding": "gzip"})
+    lines = [json.loads(line) for line in gzip.decompress(response.data).splitlines()]
+    assert len(lines) == 101
+    assert lines[-1] == {"error": {"name": "ValidationError", "message": "Strapi went away"}}
+
+    # No trailer fits a CSV file: the stream is aborted instead
+    with pytest.raises(ValidationError):
+        client.get("/messages/export?format=csv&page_size=100").data
@@ -0,0 +1,103 @@
+import pytest
+from werkzeug.datastructures import MultiDict
+
+from models.author import Author
+from models.blog import Blog
+from models.message import Message
+from strapi_filters import (
+    FilterError,
+    compile_filters,
+    compile_request_filters,
+    to_strapi_filters,
+)
+
+
+def test_json_filters_render_for_strapi():
+    f = compile_filters('{"content": {"$eq": "Hello World!"}}')
+    assert f.to_dict() == {"content": {"$eq": "Hello World!"}}
+    assert f.to_strapi() == {"content": {"$eq": "Hello World!"}}
+
+
+def test_compiled_filters_are_cached():
+    assert compile_filters('{"id": {"$gt": 3}}') is compile_filters('{"id": {"$gt": 3}}')
+
+
+def test_shorthand_and_bare_values_mean_eq():
+    assert compile_filters("content='Hello'").to_dict() == {"content": {"$eq": "Hello"}}
+    assert compile_filters('{"content": "Hello"}').to_dict() == {"content": {"$eq": "Hello"}}
+
+
+def test_lists_become_index_maps():
+    f = compile_filters('{"$or": [{"id": {"$in": [1, 2]}}, {"content": {"$null": true}}]}')
+    assert f.to_strapi() == {
+        "$or": {
+            "0": {"id": {"$in": {"0": 1, "1": 2}}},
+            "1": {"content": {"$null": "true"}},
+        }
+    }
+
+
+def test_bracket_query_params():
+    args = MultiDict(
+        [
+            ("filters[$or][0][content][$containsi]", "hello"),
+            ("filters[$or][1][id][$in]", "1"),
+            ("filters[$or][1][id][$in]", "2"),
+        ]
+    )
+    f = compile_request_filters(args)
+    assert f.to_dict() == {
+        "$or": [{"content": {"$containsi": "hello"}}, {"id": {"$in": ["1", "2"]}}]
+    }
+
+
+@pytest.mark.parametrize(
+    "filter_str",
+    [
+        '{"content": {"$like": "x"}}',
+        '{"$eq": "x"}',
+        '{"content": {"$between": [1]}}',
+        '{"bad field": {"$eq": 1}}',
+        "{not json",
+    ],
+)
+def test_invalid_filters(filter_str):
+    with pytest.raises(FilterError):
+        compile_filters(filter_str)
+
+
+def test_to_strapi_filters_accepts_dicts_and_strings():
+    assert to_strapi_filters(None) is None
+    assert to_strapi_filters({"id": {"$in": [1]}}) == {"id": {"$in": {"0": 1}}}
+    assert to_strapi_filters('{"id": 1}') == {"id": {"$eq": 1}}
+
+
+def test_local_evaluation_on_hydrated_objects():
+    ada = Author(id=1, name="Ada Lovelace")
+    blogs = [
+        Blog(id=1, text="Notes on the engine", author=ada),
+        Blog(id=2, text="Hello", author=Author(id=2, name="Bob")),
+        Blog(id=3, text=None, author=None),
+    ]
+    f = compile_filters('{"author": {"name": {"$containsi": "ada"}}}')
+    assert [b.id for b in f.filter(blogs)] == [1]
+
+    f = compile_filters('{"$or": [{"text": {"$null": true}}, {"id": {"$gte": "2"}}]}')
+    assert [b.id for b in f.filter(blogs)] == [2, 3]
+
+    f = compile_filters('{"$not": {"text": {"$startsWith": "Note"}}}')
+    assert [b.id for b in f.filter(blogs)] == [2, 3]
+
+
+def test_local_evaluation_on_raw_entries():
+    entry = {
+        "id": 4,
+        "attributes": {
+            "content": "Hi",
+            "worlds": {"data": [{"id": 7, "attributes": {"guid": "abc"}}]},
+        },
+    }
+    assert compile_filters('{"worlds": {"guid": {"$eq": "abc"}}}').matches(entry)
+    assert compile_filters('{"id": {"$in": ["4"]}}').matches(entry)
+    assert not compile_filters('{"content": {"$ne": "Hi"}}').matches(entry)
+    assert compile_filters('{"id": {"$between": [1, 5]}}').matches(Message(id=4))
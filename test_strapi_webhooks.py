@@ -0,0 +1,105 @@
+import json
+
+import pytest
+
+import strapi_model_mixin
+from app import create_app
+from models.author import Author
+from models.blog import Blog
+from models.message import Message
+from models.world import World
+from shared_cache import SharedCache
+from test_shared_cache import CountingClient
+
+SECRET = "s3cret"
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    cache = SharedCache(str(tmp_path), default_ttl=60)
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", cache)
+    return cache
+
+
+@pytest.fixture
+def counting_client(monkeypatch):
+    client = CountingClient()
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", client)
+    return client
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setenv("STRAPI_WEBHOOK_SECRET", SECRET)
+    strapi_model_mixin.load_settings.cache_clear()
+    for model in (Message, Author, Blog, World):
+        monkeypatch.setitem(strapi_model_mixin.class_registry, model.__name__, model)
+    yield create_app().test_client()
+    strapi_model_mixin.load_settings.cache_clear()
+
+
+def post(client, payload, secret=SECRET):
+    return client.post(
+        "/webhooks/strapi", json=payload, headers={"Authorization": f"Bearer {secret}"}
+    )
+
+
+def test_rejects_wrong_or_missing_secret(client, monkeypatch):
+    payload = {"event": "entry.update", "model": "message", "entry": {"id": 1}}
+    assert post(client, payload, secret="wrong").status_code == 403
+    monkeypatch.delenv("STRAPI_WEBHOOK_SECRET")
+    strapi_model_mixin.load_settings.cache_clear()
+    assert post(client, payload).status_code == 403
+
+
+def test_update_patches_cached_entries(client, cache, counting_client):
+    Message.fetch_all()
+    Message.fetch_one(1)
+    payload = {
+        "event": "entry.update",
+        "model": "message",
+        "uid": "api::message.message",
+        "entry": {"id": 1, "content": "Edited in the admin"},
+    }
+    assert post(client, payload).status_code == 200
+    assert Message.fetch_all()["data"][0]["attributes"]["content"] == "Edited in the admin"
+    assert Message.fetch_one(1)["data"]["attributes"]["content"] == "Edited in the admin"
+    assert counting_client.calls == 2
+
+
+def test_update_drops_filtered_lists(client, cache, counting_client):
+    Message.fetch_all(filters={"content": {"$eq": "Hello World!"}})
+    Message.fetch_all(sort=["id"])
+    post(client, {"event": "entry.update", "model": "message", "entry": {"id": 2, "content": "x"}})
+    Message.fetch_all(filters={"content": {"$eq": "Hello World!"}})
+    Message.fetch_all(sort=["id"])
+    assert counting_client.calls == 3
+
+
+def test_create_and_delete_drop_lists(client, cache, counting_client):
+    Message.fetch_all()
+    Message.fetch_one(1)
+    post(client, {"event": "entry.create", "model": "message", "entry": {"id": 7, "content": "new"}})
+    Message.fetch_all()
+    Message.fetch_one(1)
+    assert counting_client.calls == 3
+
+    post(client, {"event": "entry.delete", "model": "message", "entry": {"id": 1}})
+    Message.fetch_all()
+    Message.fetch_one(1)
+    assert counting_client.calls == 5
+
+
+def test_update_drops_entries_embedding_the_row(client, cache):
+    embedding = {"data": [{"id": 3, "attributes": {"author": {"data": {"id": 9, "attributes": {}}}}}]}
+    other = {"data": [{"id": 4, "attributes": {"author": {"data": {"id": 10, "attributes": {}}}}}]}
+    cache.set(("blogs", "all"), "embedding", json.dumps(embedding).encode())
+    cache.set(("blogs", "all"), "other", json.dumps(other).encode())
+    post(client, {"event": "entry.update", "model": "author", "entry": {"id": 9, "name": "x"}})
+    assert cache.get(("blogs", "all"), "embedding") is None
+    assert cache.get(("blogs", "all"), "other") is not None
+
+
+def test_unknown_models_and_events_are_acknowledged(client, cache):
+    assert post(client, {"event": "media.create", "media": {"id": 1}}).status_code == 202
+    assert post(client, {"event": "entry.update", "model": "unknown", "entry": {"id": 1}}).status_code == 202
@@ -0,0 +1,142 @@
+import time
+
+import pytest
+from pystrapi.errors import NotFoundError, RatelimitError, StrapiError
+
+from hedged_reads import DeadlineExceeded
+from upstream_guard import AdaptiveLimiter, CircuitBreaker, UpstreamGuard, UpstreamUnavailable, is_upstream_failure
+
+
+def fail():
+    raise StrapiError("connection refused")
+
+
+def test_limiter_grows_on_fast_calls_and_backs_off_on_slow_ones():
+    limiter = AdaptiveLimiter(initial_limit=4, max_limit=8, target_latency=0.5)
+    for _ in range(20):
+        assert limiter.try_acquire()
+        limiter.release(0.01)
+    assert limiter.limit > 5
+
+    grown = limiter.limit
+    assert limiter.try_acquire()
+    limiter.release(2.0)
+    assert limiter.limit < grown
+
+
+def test_limiter_sheds_above_limit():
+    limiter = AdaptiveLimiter(initial_limit=2)
+    assert limiter.try_acquire() and limiter.try_acquire()
+    assert not limiter.try_acquire()
+
+
+def test_breaker_opens_and_half_opens():
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.allow()
+    breaker.record_failure()
+    assert not breaker.allow()
+    time.sleep(0.06)
+    assert breaker.allow()
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    breaker.record_success()
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+def test_guard_fails_fast_once_open():
+    guard = UpstreamGuard(failure_threshold=2, reset_timeout=60)
+    calls = []
+    for _ in range(2):
+        with pytest.raises(UpstreamUnavailable):
+            guard.call("worlds", lambda: calls.append(1) or fail())
+    with pytest.raises(UpstreamUnavailable) as exc:
+        guard.call("worlds", lambda: calls.append(1))
+    assert len(calls) == 2
+    assert exc.value.retry_after > 1
+    # Other models have their own breaker
+    assert guard.call("messages", lambda: {"data": []}) == {"data": []}
+
+
+def test_guard_ignores_client_errors():
+    guard = UpstreamGuard(failure_threshold=1)
+
+    def not_found():
+        raise NotFoundError("404")
+
+    with pytest.raises(NotFoundError):
+        guard.call("worlds", not_found)
+    assert guard.breaker("worlds").state == CircuitBreaker.CLOSED
+
+    def unauthorized():
+        raise StrapiError("Unable to send GET to /api/worlds, status code: 401, response: {}")
+
+    with pytest.raises(StrapiError):
+        guard.call("worlds", unauthorized)
+    assert guard.breaker("worlds").state == CircuitBreaker.CLOSED
+    assert is_upstream_failure(StrapiError("Unable to send GET, status code: 502, response: {}"))
+    assert is_upstream_failure(RatelimitError("Unable to send GET, status code: 429, response: {}"))
+
+
+def test_guard_passes_through_errors_raised_around_the_call():
+    guard = UpstreamGuard(failure_threshold=1, reset_timeout=0)
+    error = ValueError("invalid literal for int()")
+
+    def bug():
+        raise error
+
+    with pytest.raises(ValueError) as raised:
+        guard.call("worlds", bug)
+    assert raised.value is error
+    assert guard.breaker("worlds").state == CircuitBreaker.CLOSED
+
+    # A half-open breaker's trial that never reached Strapi leaves it open, without closing it
+    with pytest.raises(UpstreamUnavailable):
+        guard.call("worlds", fail)
+    with pytest.raises(ValueError):
+        guard.call("worlds", bug)
+    assert guard.breaker("worlds").state == CircuitBreaker.OPEN
+
+
+def test_unsent_deadline_leaves_a_half_open_breaker_open():
+    guard = UpstreamGuard(failure_threshold=1, reset_timeout=0)
+    with pytest.raises(UpstreamUnavailable):
+        guard.call("worlds", fail)
+
+    def out_of_time():
+        raise DeadlineExceeded("Request deadline passed before sending GET")
+
+    with pytest.raises(DeadlineExceeded):
+        guard.call("worlds", out_of_time)
+    assert guard.breaker("worlds").state == CircuitBreaker.OPEN
+
+
+def test_malformed_ids_do_not_open_the_breaker(monkeypatch):
+    import strapi_model_mixin
+    from app import app
+    from negative_cache import NegativeCache
+
+    class Client:
+        def get_entry(self, plural_api_id, document_id, **kwargs):
+            return {"data": {"id": document_id, "attributes": {"content": "hi"}}, "meta": {}}
+
+    monkeypatch.setattr(strapi_model_mixin.StrapiModelMixin, "client", Client())
+    monkeypatch.setattr(strapi_model_mixin, "_shared_cache", None)
+    monkeypatch.setattr(strapi_model_mixin, "_negative_cache", NegativeCache())
+    client = app.test_client()
+    for _ in range(10):
+        assert client.get("/messages/abc").status_code == 404
+    assert client.put("/messages/abc", json={"content": "x"}).status_code == 404
+    assert client.get("/messages/1").status_code == 200
+
+
+def test_guard_serves_stale_reads():
+    guard = UpstreamGuard(failure_threshold=1, serve_stale=True)
+    good = {"data": [{"id": 1}], "meta": {}}
+    assert guard.call("worlds", lambda: good, stale_key="k") == good
+
+    stale = guard.call("worlds", fail, stale_key="k")
+    assert stale["data"] == good["data"]
+    assert stale["meta"]["stale"] is True
+    assert "stale" not in good["meta"]
+    with pytest.raises(UpstreamUnavailable):
+        guard.call("worlds", fail, stale_key="other")
@@ -0,0 +1,277 @@
+"""
+Protects the app from a slow or failing Strapi host.
+
+Every client call made by `StrapiModelMixin` goes through an `UpstreamGuard`, which
+- caps the calls in flight with an AIMD limit driven by observed latency,
+- keeps a circuit breaker per model_path that opens after consecutive upstream failures,
+- fails fast with `UpstreamUnavailable` (served as a 503) instead of queueing, and
+- optionally answers reads with the last good response while the upstream is unavailable.
+"""
+import copy
+import json
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+
+from hedged_reads import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# pystrapi raises a bare StrapiError for statuses it has no class for (401, 405, 409, ...)
+_STATUS_CODE = re.compile(r"status code: (\d{3})")
+
+
+class UpstreamUnavailable(Exception):
+    """Raised instead of calling Strapi when the guard sheds the request."""
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def upstream_unavailable_response(error: UpstreamUnavailable):
+    """Flask error handler turning `UpstreamUnavailable` into a 503."""
+    body = {"data": None, "error": {"status": 503, "name": "UpstreamUnavailable", "message": str(error)}}
+    return json.dumps(body), 503, {"Content-Type": "application/json", "Retry-After": str(error.retry_after)}
+
+
+def is_upstream_failure(error: Exception) -> bool:
+    """
+    Only errors from the transport layer count: a `StrapiError` for a connection failure, a
+    5xx or a 429, and a deadline that passed while the call was in flight. Client errors (other
+    4xx, e.g. a bad token's 401), calls never sent and bugs or bad input in the calling code
+    say nothing about the health of Strapi and must not trip the breaker.
+    """
+    from pystrapi.errors import ForbiddenError, NotFoundError, RatelimitError, StrapiError, ValidationError
+
+    if isinstance(error, DeadlineExceeded):
+        return error.sent
+    if not isinstance(error, StrapiError) or isinstance(error, (NotFoundError, ValidationError, ForbiddenError)):
+        return False
+    if not isinstance(error, RatelimitError):
+        match = _STATUS_CODE.search(str(error))
+        if match and 400 <= int(match.group(1)) < 500 and match.group(1) != "429":
+            return False
+    return True
+
+
+def is_upstream_response(error: Exception) -> bool:
+    """Whether `error` is Strapi's answer to the call, as opposed to one raised before or around it."""
+    from pystrapi.errors import StrapiError
+
+    return isinstance(error, StrapiError)
+
+
+class AdaptiveLimiter:
+    """
+    Additive-increase/multiplicative-decrease limit on concurrent upstream calls.
+
+    A call finishing under the target latency grows the limit by 1/limit (about +1 per
+    window of calls); a slow or failed call shrinks it by `backoff`.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 16,
+        min_limit: float = 1,
+        max_limit: float = 64,
+        target_latency: float = 1.0,
+        backoff: float = 0.7,
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.target_latency = target_latency
+        self.backoff = backoff
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            if self.in_flight >= int(self.limit):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self, latency: float, ok: bool = True) -> None:
+        with self._lock:
+            self.in_flight -= 1
+            if ok and latency <= self.target_latency:
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            else:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+
+
+class CircuitBreaker:
+    """
+    Closed -> open after `failure_threshold` consecutive failures; after `reset_timeout`
+    seconds a single trial call is let through (half-open) and its outcome decides.
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                return True
+            return False
+
+    def retry_after(self) -> int:
+        remaining = self.reset_timeout - (time.monotonic() - self.opened_at)
+        return max(1, int(remaining + 0.5))
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.state = self.CLOSED
+            self.failures = 0
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Re-open a half-open breaker whose trial call ended without a verdict."""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self.state = self.OPEN
+
+
+class UpstreamGuard:
+    def __init__(
+        self,
+        limiter: Optional[AdaptiveLimiter] = None,
+        failure_threshold: int = 5,
+        reset_timeout: float = 30.0,
+        serve_stale: bool = False,
+        stale_max_entries: int = 1024,
+    ):
+        self.limiter = limiter or AdaptiveLimiter()
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.serve_stale = serve_stale
+        self.stale_max_entries = stale_max_entries
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self._stale: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, settings: Dict) -> "UpstreamGuard":
+        return cls(
+            limiter=AdaptiveLimiter(
+                initial_limit=settings["guard_initial_limit"],
+                max_limit=settings["guard_max_limit"],
+                target_latency=settings["guard_target_latency"],
+            ),
+            failure_threshold=settings["breaker_failure_threshold"],
+            reset_timeout=settings["breaker_reset_timeout"],
+            serve_stale=settings["serve_stale"],
+        )
+
+    def breaker(self, model_path: str) -> CircuitBreaker:
+        with self._lock:
+            if model_path not in self.breakers:
+                self.breakers[model_path] = CircuitBreaker(self.failure_threshold, self.reset_timeout)
+            return self.breakers[model_path]
+
+    def call(self, model_path: str, fn: Callable[[], Any], stale_key: Optional[Hashable] = None) -> Any:
+        """
+        Runs `fn` (a blocking Strapi client call) under the breaker and the concurrency limit.
+        Pass `stale_key` for reads whose last good response may be served while shedding.
+        """
+        breaker = self._admit(model_path, stale_key)
+        if breaker is None:
+            return self._stale_or_raise(model_path, stale_key)
+        start = time.monotonic()
+        try:
+            result = fn()
+        except Exception as e:
+            return self._on_error(model_path, breaker, stale_key, e, time.monotonic() - start)
+        self._on_success(breaker, stale_key, result, time.monotonic() - start)
+        return result
+
+    async def acall(
+        self, model_path: str, fn: Callable[[], Awaitable[Any]], stale_key: Optional[Hashable] = None
+    ) -> Any:
+        """Async counterpart of `call`; `fn` returns the awaitable to run."""
+        breaker = self._admit(model_path, stale_key)
+        if breaker is None:
+            return self._stale_or_raise(model_path, stale_key)
+        start = time.monotonic()
+        try:
+            result = await fn()
+        except Exception as e:
+            return self._on_error(model_path, breaker, stale_key, e, time.monotonic() - start)
+        self._on_success(breaker, stale_key, result, time.monotonic() - start)
+        return result
+
+    def _admit(self, model_path: str, stale_key: Optional[Hashable]) -> Optional[CircuitBreaker]:
+        breaker = self.breaker(model_path)
+        if not breaker.allow():
+            return None
+        if not self.limiter.try_acquire():
+            breaker.release_trial()
+            return None
+        return breaker
+
+    def _on_success(self, breaker: CircuitBreaker, stale_key, result, latency: float) -> None:
+        self.limiter.release(latency, ok=True)
+        breaker.record_success()
+        if self.serve_stale and stale_key is not None and result:
+            with self._lock:
+                self._stale[stale_key] = result
+                self._stale.move_to_end(stale_key)
+                while len(self._stale) > self.stale_max_entries:
+                    self._stale.popitem(last=False)
+
+    def _on_error(self, model_path: str, breaker: CircuitBreaker, stale_key, error: Exception, latency: float):
+        if not is_upstream_failure(error):
+            self.limiter.release(latency, ok=True)
+            if is_upstream_response(error):
+                breaker.record_success()
+            else:
+                # Strapi did not answer this call, so it is no verdict on a half-open breaker
+                breaker.release_trial()
+            raise error
+        self.limiter.release(latency, ok=False)
+        breaker.record_failure()
+        logger.warning(
+            "Upstream call for %s failed after %.3fs: %s", model_path, latency, error,
+            extra={"model": model_path, "latency_ms": round(latency * 1000, 1)},
+        )
+        return self._stale_or_raise(model_path, stale_key, error)
+
+    def _stale_or_raise(self, model_path: str, stale_key, error: Optional[Exception] = None):
+        if self.serve_stale and stale_key is not None:
+            with self._lock:
+                stale = self._stale.get(stale_key)
+            if stale is not None:
+                logger.warning("Serving last good response for %s while upstream is unavailable", model_path)
+                stale = copy.deepcopy(stale)
+                if isinstance(stale, dict):
+                    stale.setdefault("meta", {})["stale"] = True
+                return stale
+        breaker = self.breaker(model_path)
+        if breaker.state != CircuitBreaker.CLOSED:
+            raise UpstreamUnavailable(
+                f"Circuit open for {model_path}", retry_after=breaker.retry_after()
+            ) from error
+        raise UpstreamUnavailable(
+            f"Upstream for {model_path} unavailable" if error else "Too many requests in flight to Strapi"
+        ) from error